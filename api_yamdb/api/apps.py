@@ -5,3 +5,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     """Конфигурация приложения 'api'."""
     name = "api"
+
+    def ready(self):
+        """Подключение сигналов сброса кэша."""
+        from . import signals  # noqa: F401
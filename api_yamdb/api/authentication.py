@@ -0,0 +1,181 @@
+"""Аутентификация приложения 'api'.
+
+JWTAuthentication из simplejwt читает строку пользователя на каждый запрос.
+Здесь два более дешёвых режима, включаемых настройкой JWT_AUTHENTICATION:
+
+- CachedJWTAuthentication — пользователь берётся из LRU-кэша процесса
+  с ограниченным временем жизни записей;
+- ClaimsJWTAuthentication — пользователь собирается из утверждений токена
+  (роль, is_superuser), БД не читается совсем.
+
+О смене роли, удалении и блокировке пользователя оба режима узнают по
+метке отзыва в общем кэше Django (settings требуют его для этих
+режимов). Если метку не удаётся прочитать, запрос отклоняется.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import (
+    JWTAuthentication, JWTTokenUserAuthentication)
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+REVOKED_KEY = 'auth:revoked:{user_id}'
+
+
+def access_token_for(user):
+    """Токен доступа с ролью и правами пользователя в утверждениях."""
+    token = AccessToken.for_user(user)
+    # Дробные секунды: токен, выпущенный сразу после смены роли,
+    # не должен совпасть с отметкой смены по времени.
+    token['iat'] = time.time()
+    token['username'] = user.username
+    token['role'] = user.role
+    token['is_superuser'] = user.is_superuser
+    return token
+
+
+def revoke_tokens(user_id):
+    """Отмечает смену роли или прав, удаление или блокировку пользователя:
+    токены, выпущенные раньше, отклоняются в режиме claims, а кэши
+    пользователей всех процессов перечитывают его из БД."""
+    cache.set(
+        REVOKED_KEY.format(user_id=user_id),
+        time.time(),
+        api_settings.ACCESS_TOKEN_LIFETIME.total_seconds(),
+    )
+
+
+def revoked_at(user_id):
+    """Время последнего отзыва токенов пользователя или None."""
+    try:
+        return cache.get(REVOKED_KEY.format(user_id=user_id))
+    except Exception:
+        # Без метки отзыв не проверить: отклоняем, а не пропускаем.
+        raise AuthenticationFailed(
+            'Не удалось проверить токен, повторите запрос позже.',
+            code='revocation_unavailable',
+        )
+
+
+class UserCache:
+    """LRU-кэш пользователей процесса с временем жизни записей."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, loaded_after=None):
+        """Пользователь из кэша; запись, загруженная раньше loaded_after
+        (время отзыва), считается устаревшей."""
+        with self._lock:
+            item = self._items.get(user_id)
+            if item is None:
+                return None
+            user, expires, loaded = item
+            if expires < time.monotonic() or (
+                    loaded_after is not None and loaded <= loaded_after):
+                del self._items[user_id]
+                return None
+            self._items.move_to_end(user_id)
+            return copy.copy(user)
+
+    def set(self, user):
+        with self._lock:
+            self._items[user.pk] = (copy.copy(user),
+                                    time.monotonic() + self.ttl,
+                                    time.time())
+            self._items.move_to_end(user.pk)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._items.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+user_cache = UserCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация с пользователем из LRU-кэша процесса."""
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = user_cache.get(user_id, loaded_after=revoked_at(user_id))
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user)
+        return user
+
+
+class ClaimsUser(TokenUser):
+    """Пользователь из утверждений токена, без строки в БД."""
+
+    def __str__(self):
+        return self.username
+
+    @cached_property
+    def role(self):
+        return self.token.get('role', 'user')
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    @property
+    def is_moderator(self):
+        return self.role == 'moderator'
+
+    @property
+    def is_user(self):
+        return self.role == 'user'
+
+    def as_model(self):
+        """Экземпляр модели пользователя для внешних ключей без запроса."""
+        return get_user_model()(pk=self.pk, username=self.username,
+                                role=self.role,
+                                is_superuser=self.is_superuser)
+
+
+class ClaimsJWTAuthentication(JWTTokenUserAuthentication):
+    """JWT-аутентификация, решающая права только по утверждениям токена.
+
+    Токены без утверждения 'role' (выпущенные до включения режима)
+    обслуживаются через кэш пользователей.
+    """
+
+    def get_user(self, validated_token):
+        if 'role' not in validated_token:
+            return CachedJWTAuthentication().get_user(validated_token)
+        user = super().get_user(validated_token)
+        revoked = revoked_at(user.id)
+        if revoked is not None and validated_token.get('iat', 0) < revoked:
+            raise AuthenticationFailed(
+                'Токен отозван: роль или статус пользователя изменились, '
+                'получите новый токен.',
+                code='token_revoked',
+            )
+        return user
+
+
+def request_user_model(request):
+    """Пользователь запроса как экземпляр модели без повторного запроса."""
+    user = request.user
+    if isinstance(user, ClaimsUser):
+        return user.as_model()
+    return user
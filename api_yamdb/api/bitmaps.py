@@ -0,0 +1,242 @@
+"""Битовые карты произведений по жанрам и категориям.
+
+Процесс держит для каждого жанра и категории множество id произведений
+в виде целого числа Python: бит n установлен, если в множестве есть
+произведение с id n. Фильтр по нескольким жанрам сводится к & и | этих
+чисел, число результатов — к подсчёту битов, а страница — к одному
+запросу id__in без соединения с таблицей связей.
+
+Изменения этого процесса применяются к картам на месте после фиксации
+транзакции. Остальные процессы узнают о них по версии в общем кэше и
+перестраивают карты целиком при следующем запросе, поэтому settings
+включают карты (TITLE_BITMAPS) только с общим кэшем. Загрузки в обход
+сигналов (fill_db, generate_data) видны не позже TITLE_BITMAPS_TTL.
+"""
+import threading
+import time
+from functools import reduce
+from operator import and_, or_
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from reviews.models import Categories, Genres, GenreTitle, Title
+
+from .caching import bump_version, get_version
+
+NAMESPACE = 'title-bitmaps'
+
+# Размер блока байтов, биты которого считаются разом при пропуске
+# начала карты.
+BLOCK_SIZE = 512
+
+
+def to_bitmap(ids):
+    """Битовая карта из последовательности id."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    buffer = bytearray(max(ids) // 8 + 1)
+    for pk in ids:
+        buffer[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def bit_count(bitmap):
+    """Число установленных битов."""
+    return bin(bitmap).count('1')
+
+
+def slice_ids(bitmap, start, stop):
+    """id с порядковыми номерами [start, stop) по возрастанию."""
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    skip = start
+    first = 0
+    while first < len(data):
+        count = bit_count(int.from_bytes(data[first:first + BLOCK_SIZE],
+                                         'little'))
+        if skip < count:
+            break
+        skip -= count
+        first += BLOCK_SIZE
+    ids = []
+    wanted = stop - start
+    for index in range(first, len(data)):
+        byte = data[index]
+        while byte and len(ids) < wanted:
+            lowest = byte & -byte
+            byte ^= lowest
+            if skip:
+                skip -= 1
+            else:
+                ids.append(index * 8 + lowest.bit_length() - 1)
+        if len(ids) >= wanted:
+            break
+    return ids
+
+
+class TitleBitmaps:
+    """Битовые карты процесса с проверкой версии при каждом запросе."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Сбрасывает карты: они перестроятся при следующем запросе."""
+        self.version = None
+        self.built = 0
+        self.genres = {}
+        self.categories = {}
+        self.genre_slugs = {}
+        self.category_slugs = {}
+
+    def refresh(self):
+        """Перестраивает карты, если изменилась версия или истёк срок."""
+        version = get_version(NAMESPACE)
+        with self.lock:
+            expired = (time.monotonic() - self.built
+                       > settings.TITLE_BITMAPS_TTL)
+            if version != self.version or expired:
+                self.build(version)
+
+    def build(self, version):
+        # Карты читаются с основной БД: построенные по отстающей реплике,
+        # они считались бы актуальными до следующей смены версии.
+        links = GenreTitle.objects.using(DEFAULT_DB_ALIAS)
+        titles = Title.objects.using(DEFAULT_DB_ALIAS)
+        genres = {}
+        for genre_id, title_id in links.values_list(
+                'genre_id_id', 'title_id_id').iterator():
+            genres.setdefault(genre_id, []).append(title_id)
+        categories = {}
+        for category_id, title_id in titles.filter(
+                category__isnull=False).values_list(
+                'category_id', 'id').iterator():
+            categories.setdefault(category_id, []).append(title_id)
+        self.genres = {pk: to_bitmap(ids) for pk, ids in genres.items()}
+        self.categories = {pk: to_bitmap(ids)
+                           for pk, ids in categories.items()}
+        self.genre_slugs = dict(Genres.objects.using(
+            DEFAULT_DB_ALIAS).values_list('slug', 'id'))
+        self.category_slugs = dict(Categories.objects.using(
+            DEFAULT_DB_ALIAS).values_list('slug', 'id'))
+        self.version = version
+        self.built = time.monotonic()
+
+    def select(self, genres, match_all=False, category=None):
+        """Карта произведений со всеми (match_all) или любым из жанров
+        genres и, если задана, категорией category (слаги)."""
+        self.refresh()
+        with self.lock:
+            bitmaps = [self.genres.get(self.genre_slugs.get(slug), 0)
+                       for slug in genres]
+            bitmap = reduce(and_ if match_all else or_, bitmaps)
+            if category is not None:
+                bitmap &= self.categories.get(
+                    self.category_slugs.get(category), 0)
+        return bitmap
+
+    def facet_counts(self, bitmap, kind):
+        """Пары (слаг, число произведений карты bitmap) по категориям
+        (kind='categories') или жанрам ('genres') без нулевых."""
+        with self.lock:
+            bitmaps = getattr(self, kind)
+            slugs = (self.category_slugs if kind == 'categories'
+                     else self.genre_slugs)
+            counts = [(slug, bit_count(bitmap & bitmaps.get(pk, 0)))
+                      for slug, pk in sorted(slugs.items())]
+        return [(slug, count) for slug, count in counts if count]
+
+    def apply(self, change, *args):
+        """Применяет изменение этого процесса и сдвигает общую версию.
+
+        Если версию успел сдвинуть другой процесс, изменения которого здесь
+        не видны, карты перестраиваются при следующем запросе.
+        """
+        version = bump_version(NAMESPACE)
+        with self.lock:
+            if self.version is None or version != self.version + 1:
+                self.version = None
+                return
+            change(*args)
+            self.version = version
+
+    def link(self, title_id, genre_id):
+        self.genres[genre_id] = self.genres.get(genre_id, 0) | 1 << title_id
+
+    def unlink(self, title_id, genre_id):
+        if genre_id in self.genres:
+            self.genres[genre_id] &= ~(1 << title_id)
+
+    def move(self, title_id, category_id):
+        mask = ~(1 << title_id)
+        for pk in self.categories:
+            self.categories[pk] &= mask
+        if category_id is not None:
+            self.categories[category_id] = (
+                self.categories.get(category_id, 0) | 1 << title_id)
+
+    def remove(self, title_id):
+        self.move(title_id, None)
+        mask = ~(1 << title_id)
+        for pk in self.genres:
+            self.genres[pk] &= mask
+
+    def on_commit(self, change, *args):
+        """Применяет изменение после фиксации текущей транзакции."""
+        transaction.on_commit(lambda: self.apply(change, *args))
+
+    def invalidate(self):
+        """Перестраивает карты во всех процессах после фиксации."""
+        transaction.on_commit(lambda: bump_version(NAMESPACE))
+
+
+title_bitmaps = TitleBitmaps()
+
+
+class BitmapQuerySet:
+    """Результат фильтра по битовой карте для постраничной пагинации.
+
+    count() считает биты карты, срез выбирает id страницы из карты и
+    читает её одним запросом id__in к base (сортировка base — по id).
+    Методы, меняющие только поля и связи, применяются к запросу страницы;
+    остальные (курсорная пагинация, сортировка) получают обычный queryset
+    fallback с тем же фильтром в SQL.
+    """
+    shape_methods = frozenset((
+        'only', 'defer', 'values', 'select_related', 'prefetch_related'))
+
+    def __init__(self, bitmap, base, fallback):
+        self.bitmap = bitmap
+        self.base = base
+        self.fallback = fallback
+
+    def __getattr__(self, name):
+        if name not in self.shape_methods:
+            return getattr(self.fallback, name)
+
+        def method(*args, **kwargs):
+            return BitmapQuerySet(
+                self.bitmap, getattr(self.base, name)(*args, **kwargs),
+                getattr(self.fallback, name)(*args, **kwargs))
+        return method
+
+    @property
+    def ordered(self):
+        return self.base.ordered
+
+    def count(self):
+        return bit_count(self.bitmap)
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return iter(self.fallback)
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice) or item.step is not None:
+            return self.fallback[item]
+        start = item.start or 0
+        stop = self.count() if item.stop is None else item.stop
+        return self.base.filter(id__in=slice_ids(self.bitmap, start, stop))
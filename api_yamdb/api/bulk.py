@@ -0,0 +1,218 @@
+"""Пакетная загрузка произведений и отзывов.
+
+Пакет проверяется целиком: справочники и существующие записи читаются
+несколькими запросами на весь пакет, а не на каждый элемент, прошедшие
+проверку элементы пишутся через bulk_create в одной транзакции.
+Для каждого элемента возвращается свой результат.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from rest_framework import serializers, status
+from rest_framework.exceptions import ValidationError
+from reviews.aggregates import apply_rating_delta
+from reviews.feed import add_reviews
+from reviews.models import Categories, Genres, GenreTitle, Review, Title
+
+from .bitmaps import title_bitmaps
+from .purge import purge, review_paths, title_paths
+from .serializers import ReviewSerializer, TitleSerializer
+
+User = get_user_model()
+
+
+class TitleBulkSerializer(TitleSerializer):
+    """Элемент пакета произведений: слаги проверяются пакетом, не здесь."""
+    category = serializers.SlugField()
+    genre = serializers.ListField(child=serializers.SlugField())
+
+    class Meta(TitleSerializer.Meta):
+        validators = []
+
+
+class ReviewBulkSerializer(ReviewSerializer):
+    """Элемент пакета отзывов: автор задаётся именем пользователя."""
+    author = serializers.CharField(max_length=150)
+
+    class Meta(ReviewSerializer.Meta):
+        validators = []
+
+
+class BulkImport:
+    """Проверка и запись пакета элементов.
+
+    Наследники задают item_serializer_class, check() — проверки пакета
+    по БД, build() — объект модели по данным элемента, save() — запись
+    и represent() — представление созданного объекта.
+    """
+    item_serializer_class = None
+
+    def __init__(self, items, context):
+        if not isinstance(items, list):
+            raise ValidationError('Ожидается список объектов.')
+        if len(items) > settings.BULK_MAX_ITEMS:
+            raise ValidationError(
+                f'В пакете больше {settings.BULK_MAX_ITEMS} объектов.')
+        self.items = items
+        self.context = context
+        self.results = [None] * len(items)
+
+    def reject(self, index, errors):
+        self.results[index] = {'status': status.HTTP_400_BAD_REQUEST,
+                               'errors': errors}
+
+    def validate(self):
+        valid = []
+        for index, item in enumerate(self.items):
+            serializer = self.item_serializer_class(data=item,
+                                                    context=self.context)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                self.reject(index, serializer.errors)
+        return valid
+
+    def run(self):
+        """Возвращает статус ответа и результаты по элементам."""
+        valid = self.check(self.validate())
+        objects = [(index, self.build(data)) for index, data in valid]
+        if objects:
+            try:
+                with transaction.atomic():
+                    self.save(objects)
+            except IntegrityError:
+                raise ValidationError(
+                    'Пакет пересёкся с параллельной записью, повторите.')
+        for index, obj in objects:
+            self.results[index] = {'status': status.HTTP_201_CREATED,
+                                   'data': self.represent(obj)}
+        if len(objects) == len(self.items):
+            return status.HTTP_201_CREATED, self.results
+        if objects:
+            return status.HTTP_207_MULTI_STATUS, self.results
+        return status.HTTP_400_BAD_REQUEST, self.results
+
+
+class TitleBulkImport(BulkImport):
+    item_serializer_class = TitleBulkSerializer
+
+    def check(self, valid):
+        categories = dict(Categories.objects.filter(
+            slug__in={data['category'] for _, data in valid}
+        ).values_list('slug', 'id'))
+        genres = dict(Genres.objects.filter(
+            slug__in={slug for _, data in valid for slug in data['genre']}
+        ).values_list('slug', 'id'))
+        existing = set(Title.objects.filter(
+            name__in={data['name'] for _, data in valid}
+        ).values_list('name', 'year', 'category_id'))
+        checked = []
+        for index, data in valid:
+            errors = {}
+            category_id = categories.get(data['category'])
+            if category_id is None:
+                errors['category'] = ['Категория не найдена.']
+            missing = [slug for slug in data['genre'] if slug not in genres]
+            if missing:
+                errors['genre'] = [f'Жанры не найдены: {", ".join(missing)}.']
+            key = (data['name'], data['year'], category_id)
+            if not errors and key in existing:
+                errors['non_field_errors'] = ['Произведение уже существует!']
+            if errors:
+                self.reject(index, errors)
+                continue
+            existing.add(key)
+            data['category_id'] = category_id
+            data['genre_ids'] = [genres[slug] for slug in data['genre']]
+            checked.append((index, data))
+        return checked
+
+    def build(self, data):
+        title = Title(name=data['name'], year=data['year'],
+                      description=data.get('description'),
+                      category_id=data['category_id'])
+        title.bulk_data = data
+        return title
+
+    def save(self, objects):
+        titles = Title.objects.bulk_create(obj for _, obj in objects)
+        if any(title.pk is None for title in titles):
+            # Бэкенд не вернул ключи (SQLite): находим их по уникальному
+            # сочетанию полей.
+            ids = {
+                (name, year, category_id): pk
+                for pk, name, year, category_id in Title.objects.filter(
+                    name__in={title.name for title in titles}
+                ).values_list('id', 'name', 'year', 'category_id')
+            }
+            for title in titles:
+                title.pk = ids[(title.name, title.year, title.category_id)]
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title_id_id=title.pk, genre_id_id=genre_id)
+            for title in titles for genre_id in title.bulk_data['genre_ids']
+        )
+        # bulk_create не вызывает сигналы, обновляющие битовые карты и
+        # кэш nginx.
+        title_bitmaps.invalidate()
+        purge([path for title in titles for path in title_paths(title.pk)])
+
+    def represent(self, title):
+        data = title.bulk_data
+        return {'id': title.pk, 'name': title.name, 'year': title.year,
+                'description': title.description, 'genre': data['genre'],
+                'category': data['category']}
+
+
+class ReviewBulkImport(BulkImport):
+    item_serializer_class = ReviewBulkSerializer
+
+    def __init__(self, items, context, title_id):
+        super().__init__(items, context)
+        self.title_id = title_id
+
+    def check(self, valid):
+        users = {user.username: user for user in User.objects.filter(
+            username__in={data['author'] for _, data in valid})}
+        reviewed = set(Review.objects.filter(
+            title_id=self.title_id,
+            author_id__in=[user.pk for user in users.values()],
+        ).values_list('author_id', flat=True))
+        checked = []
+        for index, data in valid:
+            user = users.get(data['author'])
+            if user is None:
+                self.reject(index, {'author': ['Пользователь не найден.']})
+            elif user.pk in reviewed:
+                self.reject(index,
+                            {'non_field_errors': ['Ревью уже существует!']})
+            else:
+                reviewed.add(user.pk)
+                data['author'] = user
+                checked.append((index, data))
+        return checked
+
+    def build(self, data):
+        return Review(title_id=self.title_id, author=data['author'],
+                      text=data['text'], score=data['score'])
+
+    def save(self, objects):
+        reviews = Review.objects.bulk_create(obj for _, obj in objects)
+        if any(review.pk is None for review in reviews):
+            ids = dict(Review.objects.filter(
+                title_id=self.title_id,
+                author_id__in=[review.author_id for review in reviews],
+            ).values_list('author_id', 'id'))
+            for review in reviews:
+                review.pk = ids[review.author_id]
+        # bulk_create не вызывает сигналы: рейтинг сдвигаем одним UPDATE,
+        # ленты авторов — одной вставкой на таблицу.
+        apply_rating_delta(self.title_id,
+                           sum(review.score for review in reviews),
+                           len(reviews))
+        add_reviews(self.title_id, [(review.author_id, review.score)
+                                    for review in reviews])
+        purge([path for review in reviews
+               for path in review_paths(self.title_id, review.pk)])
+
+    def represent(self, review):
+        return ReviewSerializer(review, context=self.context).data
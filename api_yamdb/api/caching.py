@@ -0,0 +1,236 @@
+"""Кэширование ответов приложения 'api'."""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .replicas import primary_reads
+
+VERSION_KEY = 'api:version:{namespace}'
+BUMPED_KEY = 'api:version:bumped:{namespace}'
+LIST_KEY = 'api:list:{namespace}:{version}:{digest}'
+
+
+def get_version(namespace):
+    """Текущая версия пространства ключей кэша.
+
+    Начальная версия берётся от времени, а не 1: если ключ версии вытеснен
+    из кэша, новая версия не совпадёт с версией старых записей.
+    """
+    key = VERSION_KEY.format(namespace=namespace)
+    version = cache.get(key)
+    if version is not None:
+        return version
+    cache.add(key, int(time.time() * 1000), timeout=None)
+    return cache.get(key)
+
+
+def bump_version(namespace):
+    """Сдвигает версию пространства: все его записи становятся
+    недоступными и вытесняются по таймауту.
+
+    Возвращает новую версию или None, если ключ версии был вытеснен.
+    При репликах версия на REPLICA_STICKY_SECONDS отмечается свежей:
+    реплики могут ещё не видеть изменений, под которые она сдвинута.
+    """
+    if settings.DATABASE_REPLICAS:
+        cache.set(BUMPED_KEY.format(namespace=namespace), True,
+                  settings.REPLICA_STICKY_SECONDS)
+    key = VERSION_KEY.format(namespace=namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        return None
+
+
+def recently_bumped(namespaces):
+    """Сдвигалась ли версия одного из пространств в пределах отставания
+    реплик."""
+    if not (namespaces and settings.DATABASE_REPLICAS):
+        return False
+    return bool(cache.get_many(
+        [BUMPED_KEY.format(namespace=namespace) for namespace in namespaces]))
+
+
+def make_etag(data):
+    """ETag по содержимому ответа: совпадает во всех процессах."""
+    content = json.dumps(data, cls=JSONEncoder, sort_keys=True,
+                         ensure_ascii=False)
+    return quote_etag(hashlib.md5(content.encode()).hexdigest())
+
+
+def request_digest(request):
+    """Отпечаток пути и параметров запроса без учёта их порядка."""
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    )
+    return hashlib.md5(
+        json.dumps([request.path, params]).encode()).hexdigest()
+
+
+class CachedListMixin:
+    """Кэширует ответы list() под версией пространства cache_namespace.
+
+    Версия сдвигается сигналами при изменении данных, поэтому записи не
+    нужно удалять поштучно. Ответ содержит ETag, на If-None-Match
+    с совпадающим ETag возвращается 304 без запросов к БД. Запись
+    заполняется из основной БД: отстающая реплика сохранила бы под новой
+    версией старые данные.
+    """
+    cache_namespace = None
+
+    def get_list_cache_key(self, request):
+        return LIST_KEY.format(
+            namespace=self.cache_namespace,
+            version=get_version(self.cache_namespace),
+            digest=request_digest(request),
+        )
+
+    def list(self, request, *args, **kwargs):
+        key = self.get_list_cache_key(request)
+        cached = cache.get(key)
+        if cached is None:
+            with primary_reads():
+                response = super().list(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            cached = {'data': response.data,
+                      'etag': make_etag(response.data)}
+            cache.set(key, cached, settings.LIST_CACHE_TIMEOUT)
+        not_modified = get_conditional_response(request, etag=cached['etag'])
+        if not_modified is not None:
+            return not_modified
+        response = Response(cached['data'])
+        response['ETag'] = cached['etag']
+        return response
+
+
+class ConditionalGetMixin:
+    """Валидаторы ETag и Last-Modified для list() и retrieve().
+
+    get_last_modified() возвращает время последнего изменения данных
+    ответа, прочитанное дешёвым запросом (сигналы сдвигают его при
+    изменении данных). Если оно не изменилось с If-None-Match или
+    If-Modified-Since клиента, ответ 304 отдаётся без запроса списка и
+    без сериализации. При last_modified_field retrieve() без условных
+    заголовков берёт время из самого объекта, без отдельного запроса.
+    ETag учитывает также параметры запроса, формат ответа и версии
+    пространств кэша conditional_namespaces. Сразу после сдвига одной
+    из этих версий запрос читает основную БД, чтобы ETag новой версии
+    не достался данным отстающей реплики.
+    """
+    conditional_namespaces = ()
+    last_modified_field = None
+
+    def get_last_modified(self):
+        """Время последнего изменения данных ответа (aware datetime) или
+        None — тогда ответ отдаётся без валидаторов и без 304.
+        По умолчанию условные запросы не обрабатываются."""
+
+    def get_validators(self, last_modified):
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        content = json.dumps([
+            last_modified.isoformat(),
+            [get_version(namespace)
+             for namespace in self.conditional_namespaces],
+            getattr(renderer, 'format', None),
+            request_digest(self.request),
+        ])
+        etag = 'W/' + quote_etag(hashlib.md5(content.encode()).hexdigest())
+        # Last-Modified точен до секунды, поэтому ETag в приоритете.
+        return etag, int(last_modified.timestamp())
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # Выборочные поля (only()) не должны откладывать время изменения.
+        loaded, deferred = queryset.query.deferred_loading
+        if not (self.last_modified_field and loaded) or deferred:
+            return queryset
+        return queryset.only(*loaded, self.last_modified_field)
+
+    def get_object(self):
+        obj = super().get_object()
+        self._conditional_object = obj
+        return obj
+
+    def conditional(self, handler, request, *args, **kwargs):
+        from_object = (self.action == 'retrieve'
+                       and self.last_modified_field is not None)
+        conditional = ('HTTP_IF_NONE_MATCH' in request.META
+                       or 'HTTP_IF_MODIFIED_SINCE' in request.META)
+        validators = None
+        # Время изменения читается до данных: если данные изменятся между
+        # запросами, клиент получит устаревший ETag и просто новый ответ.
+        if conditional or not from_object:
+            last_modified = self.get_last_modified()
+            if last_modified is not None:
+                validators = self.get_validators(last_modified)
+                etag, timestamp = validators
+                not_modified = get_conditional_response(
+                    request, etag=etag, last_modified=timestamp)
+                if not_modified is not None:
+                    return not_modified
+        response = handler(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        if validators is None and from_object:
+            obj = getattr(self, '_conditional_object', None)
+            if obj is not None:
+                validators = self.get_validators(
+                    getattr(obj, self.last_modified_field))
+        if validators is not None:
+            etag, timestamp = validators
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(timestamp)
+        return response
+
+    def conditional_on_fresh_data(self, handler, request, *args, **kwargs):
+        if not recently_bumped(self.conditional_namespaces):
+            return self.conditional(handler, request, *args, **kwargs)
+        with primary_reads():
+            return self.conditional(handler, request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_on_fresh_data(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_on_fresh_data(
+            super().retrieve, request, *args, **kwargs)
+
+
+class CacheControlMixin:
+    """Заголовок Cache-Control ответов на безопасные запросы.
+
+    Анонимные ответы 200 и 304 разрешено хранить общим кэшам (микрокэш
+    nginx) cache_max_age секунд и ещё cache_stale_seconds отдавать
+    устаревшими, пока ответ обновляется. Ответы на запросы с Authorization
+    кэширует только клиент, перепроверяя их по ETag.
+    """
+    cache_max_age = 0
+    cache_stale_seconds = 0
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+        if (request.method not in SAFE_METHODS
+                or response.status_code not in (200, 304)
+                or response.has_header('Cache-Control')):
+            return response
+        if 'HTTP_AUTHORIZATION' in request.META or not self.cache_max_age:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(
+                response, public=True, max_age=self.cache_max_age,
+                stale_while_revalidate=self.cache_stale_seconds)
+        return response
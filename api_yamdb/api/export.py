@@ -0,0 +1,66 @@
+"""Выгрузка каталога и отзывов в NDJSON, сжатом gzip.
+
+Строки читаются итератором порциями по chunk_size (на PostgreSQL — через
+серверный курсор), каждая порция сразу собирается в строки JSON и
+сжимается, поэтому память не растёт с размером выгрузки.
+"""
+import zlib
+from itertools import islice
+
+from reviews.models import Comments, Review, Title
+
+from .fastpath import FastJSONRenderer, ReviewValues, TitleValues
+
+# wbits=31: поток в формате gzip, а не «голый» zlib.
+GZIP_WBITS = 31
+
+
+class ReviewExportValues(ReviewValues):
+    """Отзыв в выгрузке: поля ReviewSerializer и id произведения."""
+    columns = dict(ReviewValues.columns, title=('title',))
+
+
+class CommentExportValues(ReviewValues):
+    """Комментарий в выгрузке: поля CommentSerializer и id отзыва."""
+    columns = {
+        'id': ('id',),
+        'review': ('review_id',),
+        'text': ('text',),
+        'author': ('author__username',),
+        'pub_date': ('pub_date',),
+    }
+
+    def get_review(self, row):
+        return row['review_id']
+
+
+EXPORTS = {
+    'titles': (Title, TitleValues),
+    'reviews': (Review, ReviewExportValues),
+    'comments': (Comments, CommentExportValues),
+}
+
+
+def export_rows(kind, chunk_size):
+    """Порции строк выгрузки kind."""
+    model, values_class = EXPORTS[kind]
+    values = values_class()
+    rows = model.objects.order_by('id').values(*values.fields).iterator(
+        chunk_size=chunk_size)
+    while True:
+        page = list(islice(rows, chunk_size))
+        if not page:
+            return
+        yield values.rows(page)
+
+
+def ndjson_gzip(chunks):
+    """Сжатый gzip поток NDJSON из порций строк."""
+    renderer = FastJSONRenderer()
+    compressor = zlib.compressobj(6, zlib.DEFLATED, GZIP_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(
+            b''.join(renderer.render(row) + b'\n' for row in chunk))
+        if data:
+            yield data
+    yield compressor.flush()
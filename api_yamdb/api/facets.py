@@ -0,0 +1,98 @@
+"""Счётчики фасетов списка (?facets=).
+
+Счётчики считаются по тому же набору фильтров, что и страница, одним
+сгруппированным запросом на фасет. Если список выбран по битовым картам
+(api.bitmaps), счётчики категорий и жанров берутся из карт без запросов.
+"""
+from django.db.models import Count, F
+from rest_framework.exceptions import ValidationError
+from reviews.models import GenreTitle, Title
+
+from .bitmaps import BitmapQuerySet, title_bitmaps
+
+
+def facet_titles(queryset):
+    """Произведения списка без сортировки, выбранных полей и аннотаций."""
+    if not queryset.query.where:
+        return Title.objects.all()
+    return Title.objects.filter(pk__in=queryset.order_by().values('pk'))
+
+
+def slug_counts(rows):
+    return [{'slug': slug, 'count': count} for slug, count in rows]
+
+
+def category_facet(queryset):
+    if isinstance(queryset, BitmapQuerySet):
+        return slug_counts(title_bitmaps.facet_counts(
+            queryset.bitmap, 'categories'))
+    return slug_counts(facet_titles(queryset).filter(
+        category__isnull=False).values_list('category__slug').annotate(
+        count=Count('id')).order_by('category__slug'))
+
+
+def genre_facet(queryset):
+    if isinstance(queryset, BitmapQuerySet):
+        return slug_counts(title_bitmaps.facet_counts(
+            queryset.bitmap, 'genres'))
+    links = GenreTitle.objects.all()
+    if queryset.query.where:
+        links = links.filter(
+            title_id__in=queryset.order_by().values('pk'))
+    return slug_counts(links.values_list('genre_id__slug').annotate(
+        count=Count('id')).order_by('genre_id__slug'))
+
+
+def year_facet(queryset):
+    """Число произведений по десятилетиям года выпуска."""
+    rows = facet_titles(queryset).annotate(
+        decade=F('year') / 10 * 10).values_list('decade').annotate(
+        count=Count('id')).order_by('decade')
+    return [{'decade': decade, 'count': count} for decade, count in rows]
+
+
+TITLE_FACETS = {
+    'category': category_facet,
+    'genre': genre_facet,
+    'year': year_facet,
+}
+
+
+class FacetsMixin:
+    """Поддержка ?facets=a,b для list(): счётчики добавляются в ответ
+    пагинации ключом 'facets'.
+
+    available_facets сопоставляет имени фасета функцию, которая получает
+    отфильтрованный queryset списка и возвращает список счётчиков.
+    """
+    facets_param = 'facets'
+    available_facets = {}
+
+    def get_requested_facets(self):
+        value = self.request.query_params.get(self.facets_param)
+        if value is None or self.action != 'list':
+            return ()
+        requested = {name.strip() for name in value.split(',')} - {''}
+        unknown = sorted(requested - set(self.available_facets))
+        if unknown or not requested:
+            raise ValidationError({self.facets_param: [
+                'Неизвестные фасеты: {}. Доступны: {}.'.format(
+                    ', '.join(unknown) or '-',
+                    ', '.join(self.available_facets))
+            ]})
+        return [name for name in self.available_facets if name in requested]
+
+    def paginate_queryset(self, queryset):
+        self.get_requested_facets()
+        self._facet_queryset = queryset
+        return super().paginate_queryset(queryset)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        names = self.get_requested_facets()
+        if names:
+            queryset = self._facet_queryset
+            response.data['facets'] = {
+                name: self.available_facets[name](queryset)
+                for name in names}
+        return response
@@ -0,0 +1,181 @@
+"""Списки без сериализаторов.
+
+ModelSerializer создаёт поля и вызывает to_representation для каждого
+объекта страницы, а на длинных списках это основная часть времени запроса.
+Здесь страница читается через values() и собирается в словари теми же
+преобразованиями, что делают поля сериализаторов, поэтому JSON ответа
+совпадает с ответом сериализатора байт в байт.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from reviews.models import GenreTitle
+
+from .performance import serializer_timer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
+
+_datetime = serializers.DateTimeField()
+
+
+def _date(value):
+    return None if value is None else _datetime.to_representation(value)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson, если он установлен и включены быстрые списки.
+
+    Вывод совпадает с JSONRenderer: компактный JSON в UTF-8 с экранированными
+    U+2028 и U+2029. Запросы с отступами (indent в Accept) и установки без
+    orjson обслуживает JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (orjson is None or not settings.FAST_LIST_RESPONSES
+                or self.get_indent(
+                    accepted_media_type or '', renderer_context or {})):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        encoder = self.encoder_class()
+        content = orjson.dumps(data, default=encoder.default)
+        return content.replace(
+            '\u2028'.encode(), b'\\u2028').replace(
+            '\u2029'.encode(), b'\\u2029')
+
+
+class Values:
+    """Сборка строк ответа из строк values().
+
+    columns задаёт для каждого поля ответа столбцы values(), required —
+    столбцы, нужные всегда (например, ключ курсорной пагинации). Поле без
+    метода get_<поле> берётся из одноимённого столбца как есть.
+    """
+    columns = {}
+    required = ('id',)
+
+    def __init__(self, fields=None):
+        self.output = tuple(fields or self.columns)
+        self.getters = [
+            (name, getattr(self, f'get_{name}', None)) for name in self.output
+        ]
+
+    @property
+    def fields(self):
+        """Столбцы values() для выбранных полей ответа."""
+        names = dict.fromkeys(self.required)
+        for name in self.output:
+            names.update(dict.fromkeys(self.columns[name]))
+        return tuple(names)
+
+    def prepare(self, page):
+        """Данные страницы, общие для всех строк."""
+
+    def rows(self, page):
+        self.prepare(page)
+        return [{
+            name: row[name] if getter is None else getter(row)
+            for name, getter in self.getters
+        } for row in page]
+
+
+class TitleValues(Values):
+    """Строки списка произведений как в TitleROSerializer."""
+    columns = {
+        'id': ('id',),
+        'name': ('name',),
+        'year': ('year',),
+        'rating': ('rating',),
+        'reviews_count': ('rating_count',),
+        'description': ('description',),
+        'genre': (),
+        'category': ('category__name', 'category__slug'),
+    }
+
+    def prepare(self, page):
+        self.genres = defaultdict(list)
+        if 'genre' not in self.output or not page:
+            return
+        for title_id, name, slug in GenreTitle.objects.filter(
+            title_id__in=[row['id'] for row in page]
+        ).order_by('genre_id').values_list(
+                'title_id', 'genre_id__name', 'genre_id__slug'):
+            self.genres[title_id].append({'name': name, 'slug': slug})
+
+    def get_rating(self, row):
+        return None if row['rating'] is None else int(row['rating'])
+
+    def get_reviews_count(self, row):
+        return row['rating_count']
+
+    def get_genre(self, row):
+        return self.genres[row['id']]
+
+    def get_category(self, row):
+        if row['category__slug'] is None:
+            return None
+        return {'name': row['category__name'],
+                'slug': row['category__slug']}
+
+
+class ReviewValues(Values):
+    """Строки списка отзывов как в ReviewSerializer."""
+    columns = {
+        'id': ('id',),
+        'text': ('text',),
+        'author': ('author__username',),
+        'score': ('score',),
+        'pub_date': ('pub_date',),
+        'comments_count': ('comments_count',),
+    }
+    required = ('id', 'pub_date')
+
+    def get_author(self, row):
+        return row['author__username']
+
+    def get_pub_date(self, row):
+        return _date(row['pub_date'])
+
+
+class CommentValues(ReviewValues):
+    """Строки списка комментариев как в CommentSerializer."""
+    columns = {
+        'id': ('id',),
+        'text': ('text',),
+        'author': ('author__username',),
+        'pub_date': ('pub_date',),
+    }
+
+
+class ValuesListMixin:
+    """list() через values() и values_class вместо сериализатора.
+
+    Включается для представления атрибутом values_class и глобально
+    настройкой FAST_LIST_RESPONSES.
+    """
+    values_class = None
+
+    def get_values(self):
+        return self.values_class()
+
+    def list(self, request, *args, **kwargs):
+        if self.values_class is None or not settings.FAST_LIST_RESPONSES:
+            return super().list(request, *args, **kwargs)
+        values = self.get_values()
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(
+            None).values(*values.fields)
+        page = self.paginate_queryset(queryset)
+        # Запрос списка выполняется до замера сериализации.
+        items = list(queryset) if page is None else page
+        with serializer_timer():
+            rows = values.rows(items)
+        if page is not None:
+            return self.get_paginated_response(rows)
+        return Response(rows)
@@ -1,16 +1,83 @@
 """Фильтрация приложения 'api'."""
 import django_filters as filters
-from reviews.models import Title
+from django.conf import settings
+from django_filters.constants import EMPTY_VALUES
+from reviews.models import GenreTitle, Title
+from reviews.search import search_titles
+
+from .bitmaps import BitmapQuerySet, title_bitmaps
+
+GENRE_MODES = (('or', 'Любой из жанров'), ('and', 'Все жанры'))
+
+# Фильтры, которые вычисляются по битовым картам без SQL.
+BITMAP_FILTERS = ('genre', 'genre_mode', 'category')
+
+
+def split_slugs(value):
+    """Слаги из значения вида 'drama,comedy' без повторов."""
+    return list(dict.fromkeys(
+        slug.strip() for slug in value.split(',') if slug.strip()))
 
 
 class TitleFilter(filters.FilterSet):
-    """Класс фильтраций."""
+    """Класс фильтраций.
+
+    genre принимает несколько слагов через запятую; genre_mode=and
+    оставляет произведения со всеми жанрами, or (по умолчанию) — с любым.
+    Если заданы только жанры и категория, результат берётся из битовых
+    карт процесса (api.bitmaps), иначе жанры проверяются подзапросом.
+    """
     name = filters.CharFilter(field_name='name', lookup_expr='contains')
     year = filters.NumberFilter(field_name='year', lookup_expr='exact')
     category = filters.CharFilter(field_name='category__slug',
                                   lookup_expr='exact')
-    genre = filters.CharFilter(field_name='genre__slug', lookup_expr='exact')
+    genre = filters.CharFilter(method='filter_genre')
+    genre_mode = filters.ChoiceFilter(choices=GENRE_MODES,
+                                      method='filter_genre_mode')
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
         fields = ['name', 'year', 'category', 'genre']
+
+    def match_all(self):
+        return self.form.cleaned_data.get('genre_mode') == 'and'
+
+    def filter_genre(self, queryset, name, value):
+        """Произведения с любым или всеми жанрами из списка.
+
+        Подзапрос по связям не размножает строки произведений, как
+        соединение с таблицей связей.
+        """
+        slugs = split_slugs(value)
+        if not slugs:
+            return queryset
+        links = GenreTitle.objects.values('title_id')
+        if not self.match_all():
+            return queryset.filter(
+                id__in=links.filter(genre_id__slug__in=slugs))
+        for slug in slugs:
+            queryset = queryset.filter(
+                id__in=links.filter(genre_id__slug=slug))
+        return queryset
+
+    def filter_genre_mode(self, queryset, name, value):
+        """Режим учитывается в filter_genre."""
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию с ранжированием."""
+        return search_titles(queryset, value)
+
+    def filter_queryset(self, queryset):
+        filtered = super().filter_queryset(queryset)
+        data = self.form.cleaned_data
+        slugs = split_slugs(data.get('genre') or '')
+        other = [name for name, value in data.items()
+                 if name not in BITMAP_FILTERS
+                 and value not in EMPTY_VALUES]
+        if not settings.TITLE_BITMAPS or not slugs or other:
+            return filtered
+        bitmap = title_bitmaps.select(slugs, self.match_all(),
+                                      data.get('category') or None)
+        return BitmapQuerySet(bitmap, queryset, filtered)
@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from reviews.models import Comments, Review
+
+
+class Command(BaseCommand):
+    help = ('Сравнение процессорного времени списков с сериализаторами '
+            'и без них')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'urls',
+            nargs='*',
+            help='Адреса списков; по умолчанию произведения, отзывы и '
+                 'комментарии первых записей в БД',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Число замеряемых запросов на адрес и режим',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=20,
+            help='Число запросов прогрева перед замером',
+        )
+
+    def default_urls(self):
+        urls = ['/api/v1/titles/']
+        review = Review.objects.order_by('id').first()
+        if review is not None:
+            urls.append(f'/api/v1/titles/{review.title_id}/reviews/')
+        comment = Comments.objects.select_related('review_id').order_by(
+            'id').first()
+        if comment is not None:
+            urls.append(f'/api/v1/titles/{comment.review_id.title_id}/'
+                        f'reviews/{comment.review_id_id}/comments/')
+        return urls
+
+    def measure(self, client, url, requests, warmup):
+        """Процессорное время на запрос (мс) и тело ответа."""
+        for _ in range(warmup):
+            response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: ответ {response.status_code}')
+        started = time.process_time()
+        for _ in range(requests):
+            client.get(url)
+        elapsed = time.process_time() - started
+        return elapsed * 1000 / requests, response.content
+
+    def handle(self, *args, **options):
+        client = Client()
+        for url in options['urls'] or self.default_urls():
+            timings = {}
+            for fast in (False, True):
+                with override_settings(FAST_LIST_RESPONSES=fast):
+                    timings[fast] = self.measure(
+                        client, url, options['requests'],
+                        max(options['warmup'], 1))
+            (before, expected), (after, actual) = timings[False], timings[True]
+            same = 'совпадает' if expected == actual else 'ОТЛИЧАЕТСЯ'
+            self.stdout.write(
+                f'{url}: {before:.2f} мс -> {after:.2f} мс CPU на запрос '
+                f'(x{before / after:.2f}), ответ {same}'
+            )
@@ -0,0 +1,39 @@
+import os
+
+from api.export import EXPORTS, export_rows, ndjson_gzip
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Выгрузка произведений, отзывов и комментариев в NDJSON (gzip)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'kinds',
+            nargs='*',
+            help=f'Что выгрузить: {", ".join(EXPORTS)}; по умолчанию всё',
+        )
+        parser.add_argument(
+            '--output-dir',
+            default='.',
+            help='Каталог для файлов <вид>.ndjson.gz',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.EXPORT_CHUNK_SIZE,
+            help='Число строк, читаемых из БД за раз',
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['kinds']) - set(EXPORTS)
+        if unknown:
+            raise CommandError(f'Неизвестные выгрузки: {", ".join(unknown)}')
+        for kind in options['kinds'] or EXPORTS:
+            path = os.path.join(options['output_dir'], f'{kind}.ndjson.gz')
+            with open(path, 'wb') as file:
+                for data in ndjson_gzip(
+                        export_rows(kind, options['chunk_size'])):
+                    file.write(data)
+            self.stdout.write(f'Выгрузка {kind} сохранена в {path}')
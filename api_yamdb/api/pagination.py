@@ -0,0 +1,373 @@
+"""Пагинация приложения 'api'."""
+import hashlib
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       LimitOffsetPagination,
+                                       PageNumberPagination,
+                                       replace_query_param)
+
+COUNT_KEY = 'api:count:{digest}'
+COUNT_MODES = ('exact', 'cached', 'estimate', 'none')
+
+
+class KeysetPagination(CursorPagination):
+    """Курсорная пагинация по уникальному составному ключу.
+
+    Страница выбирается условием на ключ сортировки, а не OFFSET, поэтому
+    стоимость запроса не зависит от глубины страницы. Последний элемент
+    ключа должен быть уникальным (обычно 'id').
+    """
+    ordering = ('id',)
+
+    def _get_position_from_instance(self, instance, ordering):
+        """Позиция элемента — JSON-список значений полей ключа."""
+        position = []
+        for field in ordering:
+            name = field.lstrip('-')
+            if isinstance(instance, dict):
+                value = instance[name]
+            else:
+                value = getattr(instance, name)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            position.append(value)
+        return json.dumps(position)
+
+    def get_keyset_filter(self, position, reverse):
+        """Условие «ключ строго после позиции» для составного ключа."""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if reverse != field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        queryset = self.get_keyset_queryset(
+            queryset, reverse, current_position)
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering)
+        if reverse:
+            self.page = list(reversed(self.page))
+        self.set_positions(reverse, offset, current_position,
+                           following_position)
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_keyset_queryset(self, queryset, reverse, current_position):
+        """Сортировка по ключу и отсечение всего, что до позиции курсора."""
+        if reverse:
+            queryset = queryset.order_by(
+                *[self._invert(field) for field in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is None:
+            return queryset
+        try:
+            return queryset.filter(
+                self.get_keyset_filter(current_position, reverse))
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def set_positions(self, reverse, offset, current_position,
+                      following_position):
+        """Позиции соседних страниц, как в CursorPagination."""
+        has_current = (current_position is not None) or (offset > 0)
+        has_following = following_position is not None
+        if reverse:
+            self.has_next, self.has_previous = has_current, has_following
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next, self.has_previous = has_following, has_current
+            self.next_position = following_position
+            self.previous_position = current_position
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+
+class TitleKeysetPagination(KeysetPagination):
+    """Курсорная пагинация произведений по 'id'."""
+    ordering = ('id',)
+
+
+class PublicationKeysetPagination(KeysetPagination):
+    """Курсорная пагинация отзывов и комментариев по (pub_date, id)."""
+    ordering = ('pub_date', 'id')
+
+
+def cached_count(queryset):
+    """Точное число объектов, кэшируемое на PAGINATION_COUNT_CACHE_TTL.
+
+    Ключ — текст запроса подсчёта с параметрами, поэтому одинаковые
+    фильтры разных представлений и путей ответа делят одну запись.
+    """
+    if not isinstance(queryset, QuerySet):
+        return queryset.count()
+    query = queryset.order_by().values('pk').query
+    sql, params = query.get_compiler(queryset.db).as_sql()
+    digest = hashlib.md5(
+        repr((queryset.db, sql, params)).encode()).hexdigest()
+    key = COUNT_KEY.format(digest=digest)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TTL)
+    return count
+
+
+def estimated_count(queryset):
+    """Оценка числа строк таблицы из статистики планировщика PostgreSQL.
+
+    Оценка есть только у списков без фильтров; для остальных, для других
+    БД и ещё не проанализированных таблиц берётся cached_count().
+    """
+    if isinstance(queryset, QuerySet) and not (
+            queryset.query.where or queryset.query.distinct):
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class '
+                    'WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] > 0:
+                return row[0]
+    return cached_count(queryset)
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator с числом объектов из cached_count()."""
+
+    @cached_property
+    def count(self):
+        return cached_count(self.object_list)
+
+
+class CountlessPage(Page):
+    """Страница, у которой наличие следующей известно по лишней строке,
+    а не по общему числу объектов."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class CountModeMixin:
+    """Режим подсчёта общего числа объектов по параметру count.
+
+    exact — COUNT(*) на каждый запрос; cached — тот же COUNT(*) из кэша
+    на PAGINATION_COUNT_CACHE_TTL секунд; estimate — оценка по статистике
+    PostgreSQL для списков без фильтров; none — без подсчёта, count
+    равен null. В режимах estimate и none страница читается с одной
+    лишней строкой, по которой определяется ссылка next. По умолчанию
+    режим задаёт PAGINATION_COUNT_MODE.
+    """
+    count_query_param = 'count'
+    count_mode = 'exact'
+
+    def get_count_mode(self, request):
+        mode = request.query_params.get(
+            self.count_query_param, settings.PAGINATION_COUNT_MODE)
+        if mode not in COUNT_MODES:
+            raise serializers.ValidationError({self.count_query_param: [
+                'Неизвестный режим подсчёта. Доступны: {}.'.format(
+                    ', '.join(COUNT_MODES))
+            ]})
+        return mode
+
+    def get_countless_count(self, queryset):
+        if self.count_mode == 'estimate':
+            return estimated_count(queryset)
+        return None
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [{
+            'name': self.count_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Режим подсчёта: exact, cached, estimate, none.',
+            'schema': {'type': 'string', 'enum': list(COUNT_MODES)},
+        }]
+
+
+class CountModePageNumberPagination(CountModeMixin, PageNumberPagination):
+    """Пагинация по номеру страницы с выбором режима подсчёта."""
+
+    @property
+    def django_paginator_class(self):
+        if self.count_mode == 'cached':
+            return CachedCountPaginator
+        return Paginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_mode = self.get_count_mode(request)
+        if self.count_mode in ('exact', 'cached'):
+            return super().paginate_queryset(queryset, request, view)
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        try:
+            number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            number = 0
+        if number < 1:
+            raise NotFound(self.invalid_page_message)
+        offset = (number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        if not rows and number > 1:
+            raise NotFound(self.invalid_page_message)
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = self.get_countless_count(queryset)
+        self.page = CountlessPage(rows[:page_size], number, paginator,
+                                  len(rows) > page_size)
+        self.request = request
+        return list(self.page)
+
+
+class CountModeLimitOffsetPagination(CountModeMixin, LimitOffsetPagination):
+    """Пагинация limit/offset с выбором режима подсчёта."""
+
+    def get_count(self, queryset):
+        if self.count_mode == 'cached':
+            return cached_count(queryset)
+        return super().get_count(queryset)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_mode = self.get_count_mode(request)
+        if self.count_mode in ('exact', 'cached'):
+            return super().paginate_queryset(queryset, request, view)
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.request = request
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        self.count = self.get_countless_count(queryset)
+        return rows[:self.limit]
+
+    def get_next_link(self):
+        if self.count_mode in ('exact', 'cached'):
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param,
+                                   self.offset + self.limit)
+
+
+class OptionalCursorPagination(BasePagination):
+    """Пагинация с курсорным режимом по запросу.
+
+    Если в запросе есть параметр 'cursor' (для первой страницы — пустой),
+    страница выбирается курсорной пагинацией, иначе — прежней пагинацией
+    по номеру страницы или смещению.
+    """
+    fallback_class = CountModePageNumberPagination
+    cursor_class = TitleKeysetPagination
+
+    def __init__(self):
+        self.fallback = self.fallback_class()
+        self.cursor = self.cursor_class()
+        self.active = self.fallback
+
+    @property
+    def display_page_controls(self):
+        return self.active.display_page_controls
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor.cursor_query_param in request.query_params:
+            self.active = self.cursor
+        else:
+            self.active = self.fallback
+        return self.active.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.active.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.active.get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.active.to_html()
+
+    def get_results(self, data):
+        return self.active.get_results(data)
+
+    def get_schema_fields(self, view):
+        return (self.fallback.get_schema_fields(view)
+                + self.cursor.get_schema_fields(view))
+
+    def get_schema_operation_parameters(self, view):
+        return (self.fallback.get_schema_operation_parameters(view)
+                + self.cursor.get_schema_operation_parameters(view))
+
+
+class TitlePagination(OptionalCursorPagination):
+    """Пагинация произведений: номер страницы или курсор по 'id'."""
+    fallback_class = CountModePageNumberPagination
+    cursor_class = TitleKeysetPagination
+
+
+class ReviewPagination(OptionalCursorPagination):
+    """Пагинация отзывов: номер страницы или курсор по (pub_date, id)."""
+    fallback_class = CountModePageNumberPagination
+    cursor_class = PublicationKeysetPagination
+
+
+class CommentPagination(OptionalCursorPagination):
+    """Пагинация комментариев: limit/offset или курсор по (pub_date, id)."""
+    fallback_class = CountModeLimitOffsetPagination
+    cursor_class = PublicationKeysetPagination
@@ -0,0 +1,191 @@
+"""Замеры производительности запросов.
+
+PerformanceMiddleware считает для каждого запроса число SQL-запросов,
+время в БД, время сериализации и общее время, отдаёт их в заголовке
+Server-Timing, пишет в журнал медленные запросы вместе с самыми долгими
+SQL и копит по маршрутам выборки для перцентилей. При выключенной
+настройке PERF_INSTRUMENTATION middleware не подключается совсем.
+"""
+import heapq
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('api.performance')
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Замеры одного запроса; служит и обёрткой выполнения SQL."""
+
+    def __init__(self, slow_queries):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.slow_queries = slow_queries
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += duration
+            item = (duration, self.queries, sql)
+            if len(self.slowest) < self.slow_queries:
+                heapq.heappush(self.slowest, item)
+            elif self.slowest and duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, item)
+
+
+@contextmanager
+def serializer_timer():
+    """Относит время блока к сериализации текущего запроса.
+
+    Вложенные блоки (вложенные сериализаторы) не считаются повторно, а
+    SQL, выполненный внутри блока (ленивые связи), остаётся во времени БД.
+    """
+    timings = _current.get()
+    if timings is None or timings.serializer_depth:
+        yield
+        return
+    timings.serializer_depth += 1
+    started = time.perf_counter()
+    db_started = timings.db_time
+    try:
+        yield
+    finally:
+        timings.serializer_time += (time.perf_counter() - started
+                                    - (timings.db_time - db_started))
+        timings.serializer_depth -= 1
+
+
+class TimedSerializerMixin:
+    """Сериализатор, время to_representation которого попадает в замеры."""
+
+    def to_representation(self, instance):
+        if _current.get() is None:
+            return super().to_representation(instance)
+        with serializer_timer():
+            return super().to_representation(instance)
+
+
+def percentile(ordered, share):
+    """Перцентиль по отсортированной выборке (ближайший ранг)."""
+    index = max(0, min(len(ordered) - 1,
+                       int(round(share * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class RouteStats:
+    """Последние замеры по маршрутам для отладочного эндпойнта."""
+
+    def __init__(self, samples):
+        self.samples = samples
+        self._routes = defaultdict(lambda: deque(maxlen=self.samples))
+        self._lock = threading.Lock()
+
+    def add(self, route, total, db_time, queries):
+        with self._lock:
+            self._routes[route].append((total, db_time, queries))
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+    def summary(self):
+        with self._lock:
+            routes = {route: list(samples)
+                      for route, samples in self._routes.items()}
+        result = {}
+        for route, samples in sorted(routes.items()):
+            totals, db_times, queries = (sorted(column)
+                                         for column in zip(*samples))
+            result[route] = {
+                'count': len(samples),
+                'total_ms': self._percentiles(totals),
+                'db_ms': self._percentiles(db_times),
+                'queries': {'p50': percentile(queries, 0.5),
+                            'max': queries[-1]},
+            }
+        return result
+
+    @staticmethod
+    def _percentiles(ordered):
+        return {name: round(percentile(ordered, share) * 1000, 2)
+                for name, share in (('p50', 0.5), ('p95', 0.95),
+                                    ('p99', 0.99))}
+
+
+route_stats = RouteStats(settings.PERF_ROUTE_SAMPLES)
+
+
+def route_name(request):
+    """Маршрут запроса: класс представления и действие DRF или имя URL."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None:
+        return match.view_name or match.func.__name__
+    actions = getattr(match.func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f'{view_class.__name__}.{action}'
+
+
+class PerformanceMiddleware:
+    """Замеры запроса, заголовок Server-Timing и журнал медленных запросов."""
+
+    def __init__(self, get_response):
+        if not settings.PERF_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings(settings.PERF_SLOW_QUERIES)
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+        route = route_name(request)
+        route_stats.add(route, total, timings.db_time, timings.queries)
+        response['Server-Timing'] = (
+            f'db;dur={timings.db_time * 1000:.2f};'
+            f'desc="{timings.queries} queries", '
+            f'ser;dur={timings.serializer_time * 1000:.2f}, '
+            f'total;dur={total * 1000:.2f}'
+        )
+        if total * 1000 >= settings.PERF_SLOW_REQUEST_MS:
+            self.log_slow(request, route, total, timings)
+        return response
+
+    @staticmethod
+    def log_slow(request, route, total, timings):
+        statements = '\n'.join(
+            f'  {duration * 1000:.2f} мс: {sql[:500]}'
+            for duration, _, sql in sorted(timings.slowest, reverse=True)
+        )
+        logger.warning(
+            'Медленный запрос %s %s (%s): %.2f мс, SQL: %d за %.2f мс, '
+            'сериализация %.2f мс\n%s',
+            request.method, request.get_full_path(), route, total * 1000,
+            timings.queries, timings.db_time * 1000,
+            timings.serializer_time * 1000, statements,
+        )
@@ -32,7 +32,7 @@ class AuthorOrReadOnly(permissions.BasePermission):
         if (request.user.is_superuser or request.user.is_admin
                 or request.user.is_moderator):
             return True
-        if obj.author == request.user:
+        if obj.author_id == request.user.id:
             return True
         return False
 
@@ -0,0 +1,101 @@
+"""Обновление микрокэша nginx после изменения данных.
+
+nginx без коммерческих модулей не умеет удалять записи кэша, поэтому
+служебный сервер nginx (NGINX_PURGE_URL, порт не публикуется наружу)
+запрашивает адрес в обход кэша и сохраняет свежий ответ поверх старого.
+Запросы отправляются после фиксации транзакции в фоновом потоке и не
+задерживают ответ; адреса с другими параметрами запроса устаревают
+сами по истечении короткого времени жизни кэша.
+"""
+import logging
+import threading
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.db import transaction
+from reviews.models import Review
+
+logger = logging.getLogger('api.purge')
+
+REFRESH_HEADER = 'X-Cache-Refresh'
+
+
+def refresh(paths):
+    """Запрашивает адреса у служебного сервера nginx."""
+    base = settings.NGINX_PURGE_URL.rstrip('/')
+    timeout = settings.NGINX_PURGE_TIMEOUT
+    for path in paths:
+        request = Request(f'{base}{path}', headers={
+            'Accept': 'application/json', REFRESH_HEADER: '1'})
+        try:
+            with urlopen(request, timeout=timeout) as response:
+                response.read()
+        except HTTPError as error:
+            # 404 удалённого объекта тоже заменяет запись кэша.
+            if error.code != 404:
+                logger.warning('Не удалось обновить кэш nginx для %s: %s',
+                               path, error)
+        except OSError as error:
+            logger.warning('Не удалось обновить кэш nginx для %s: %s',
+                           path, error)
+
+
+_pending = threading.local()
+
+
+def _pending_state():
+    if not hasattr(_pending, 'paths'):
+        _pending.paths = set()
+        _pending.comments = set()
+    return _pending
+
+
+def purge(paths=(), comments=()):
+    """Обновляет адреса в кэше nginx после фиксации транзакции.
+
+    comments — пары (id отзыва, id комментария): адреса комментариев
+    строятся при отправке одним запросом за произведениями отзывов.
+    Адреса всех изменений транзакции отправляются одним потоком.
+    """
+    if not settings.NGINX_PURGE_URL:
+        return
+    state = _pending_state()
+    state.paths.update(paths)
+    state.comments.update(comments)
+    transaction.on_commit(flush)
+
+
+def flush():
+    """Отправляет накопленные адреса в фоновом потоке."""
+    state = _pending_state()
+    paths, comments = state.paths, state.comments
+    if not paths and not comments:
+        return
+    state.paths, state.comments = set(), set()
+    if comments:
+        titles = dict(Review.objects.filter(
+            pk__in={review_id for review_id, _ in comments}).values_list(
+            'id', 'title_id'))
+        for review_id, comment_id in comments:
+            if review_id in titles:
+                paths.update(comment_paths(titles[review_id], review_id,
+                                           comment_id))
+    threading.Thread(target=refresh, args=(sorted(paths),),
+                     daemon=True).start()
+
+
+def title_paths(title_id):
+    return ['/api/v1/titles/', f'/api/v1/titles/{title_id}/']
+
+
+def review_paths(title_id, review_id):
+    reviews = f'/api/v1/titles/{title_id}/reviews/'
+    return [*title_paths(title_id), reviews, f'{reviews}{review_id}/']
+
+
+def comment_paths(title_id, review_id, comment_id):
+    reviews = f'/api/v1/titles/{title_id}/reviews/'
+    comments = f'{reviews}{review_id}/comments/'
+    return [reviews, f'{reviews}{review_id}/', comments,
+            f'{comments}{comment_id}/']
@@ -0,0 +1,93 @@
+"""Чтение с реплик БД.
+
+ReplicaMiddleware разрешает чтение с реплик только безопасным запросам
+к представлениям API, ReplicaRouter на время такого запроса отправляет
+чтения на одну из реплик DATABASE_REPLICAS. После изменяющего запроса
+клиент на REPLICA_STICKY_SECONDS закрепляется за основной БД, чтобы сразу
+видеть свои изменения несмотря на отставание реплик. Клиент определяется
+по заголовку Authorization, метка хранится в кэше Django и при общем
+кэше действует во всех процессах. Без реплик middleware не подключается.
+
+Реплика выбирается один раз на запрос: COUNT, страница и подгрузка
+связей читаются из одного снимка. Чтения, которые заполняют общий кэш
+или опираются на его версии, выполняются в primary_reads().
+"""
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.views import APIView
+
+STICKY_KEY = 'api:replica:sticky:{digest}'
+
+_replica = ContextVar('replica', default=None)
+
+
+def sticky_key(request):
+    """Ключ метки закрепления клиента или None для анонимного запроса."""
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    digest = hashlib.sha256(authorization.encode()).hexdigest()
+    return STICKY_KEY.format(digest=digest)
+
+
+@contextmanager
+def primary_reads():
+    """Чтения внутри блока идут в основную БД, даже если запрос читает
+    с реплики."""
+    token = _replica.set(None)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+class ReplicaRouter:
+    """Чтения разрешённых запросов — на реплику, остальное — в default."""
+
+    def db_for_read(self, model, **hints):
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная БД.
+        return True
+
+
+class ReplicaMiddleware:
+    """Решает, можно ли читать запросу с реплик, и закрепляет писавших
+    клиентов за основной БД."""
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._replica_reads = False
+        key = sticky_key(request)
+        if request.method in SAFE_METHODS:
+            # Обновление кэша nginx после записи читает основную БД.
+            request._replica_reads = (
+                'HTTP_X_CACHE_REFRESH' not in request.META
+                and (key is None or not cache.get(key)))
+        elif key is not None:
+            cache.set(key, True, settings.REPLICA_STICKY_SECONDS)
+        try:
+            return self.get_response(request)
+        finally:
+            _replica.set(None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None)
+        if (request._replica_reads and view_class is not None
+                and issubclass(view_class, APIView)):
+            _replica.set(random.choice(settings.DATABASE_REPLICAS))
@@ -3,16 +3,16 @@ from datetime import datetime
 
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
-from rest_framework.exceptions import ValidationError
-from rest_framework.generics import get_object_or_404
 from rest_framework.relations import SlugRelatedField
 from rest_framework.validators import UniqueTogetherValidator
 from reviews.models import Categories, Comments, Genres, Review, Title
 
+from .performance import TimedSerializerMixin
+
 User = get_user_model()
 
 
-class CategoriesSerializer(serializers.ModelSerializer):
+class CategoriesSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для категорий."""
 
     class Meta:
@@ -20,7 +20,7 @@ class CategoriesSerializer(serializers.ModelSerializer):
         fields = ('name', 'slug')
 
 
-class GenresSerializer(serializers.ModelSerializer):
+class GenresSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для жанров."""
 
     class Meta:
@@ -28,7 +28,7 @@ class GenresSerializer(serializers.ModelSerializer):
         fields = ('name', 'slug')
 
 
-class TitleSerializer(serializers.ModelSerializer):
+class TitleSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для создания, обновления и удаления произведений."""
     category = SlugRelatedField(slug_field='slug',
                                 queryset=Categories.objects.all())
@@ -56,39 +56,32 @@ class TitleSerializer(serializers.ModelSerializer):
         return value
 
 
-class TitleROSerializer(serializers.ModelSerializer):
+class TitleROSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для чтения произведений."""
     category = CategoriesSerializer(read_only=True)
     genre = GenresSerializer(read_only=True, many=True)
-    rating = serializers.IntegerField(source='review__score__avg',
-                                      read_only=True)
+    rating = serializers.IntegerField(read_only=True)
+    reviews_count = serializers.IntegerField(source='rating_count',
+                                             read_only=True)
 
     class Meta:
         model = Title
-        fields = ('id', 'name', 'year', 'rating', 'description', 'genre',
-                  'category')
+        fields = ('id', 'name', 'year', 'rating', 'reviews_count',
+                  'description', 'genre', 'category')
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для отзывов."""
     author = SlugRelatedField(read_only=True, slug_field='username')
 
     class Meta:
-        fields = ('id', 'text', 'author', 'score', 'pub_date',)
-        read_only_fields = ('title',)
+        fields = ('id', 'text', 'author', 'score', 'pub_date',
+                  'comments_count',)
+        read_only_fields = ('title', 'comments_count',)
         model = Review
 
-    def validate(self, data):
-        author = self.context.get('request').user
-        title_id = self.context.get('view').kwargs.get('url_title_id')
-        title = get_object_or_404(Title, id=title_id)
-        if self.context.get('request').method == 'POST':
-            if Review.objects.filter(title=title, author=author).exists():
-                raise ValidationError('Ревью уже существует!')
-        return data
-
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для коментариев."""
     author = SlugRelatedField(read_only=True, slug_field='username')
 
@@ -134,7 +127,7 @@ class TokenSerializer(serializers.Serializer):
     confirmation_code = serializers.CharField(max_length=128)
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор управления пользователем."""
 
     class Meta:
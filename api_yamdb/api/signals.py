@@ -0,0 +1,126 @@
+"""Сигналы приложения 'api'."""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from reviews.models import (Categories, Comments, Genres, GenreTitle, Review,
+                            Title)
+
+from .authentication import revoke_tokens, user_cache
+from .bitmaps import title_bitmaps
+from .caching import bump_version
+from .purge import purge, review_paths, title_paths
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Categories)
+@receiver(post_delete, sender=Categories)
+def invalidate_categories(sender, **kwargs):
+    """Сбрасывает кэш списков категорий после фиксации транзакции."""
+    transaction.on_commit(lambda: bump_version('categories'))
+    title_bitmaps.invalidate()
+    purge(['/api/v1/categories/', '/api/v1/titles/'])
+
+
+@receiver(post_save, sender=Genres)
+@receiver(post_delete, sender=Genres)
+def invalidate_genres(sender, **kwargs):
+    """Сбрасывает кэш списков жанров после фиксации транзакции."""
+    transaction.on_commit(lambda: bump_version('genres'))
+    title_bitmaps.invalidate()
+    purge(['/api/v1/genres/', '/api/v1/titles/'])
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def purge_title(sender, instance, **kwargs):
+    """Обновляет произведение и список произведений в кэше nginx."""
+    purge(title_paths(instance.pk))
+
+
+@receiver(post_save, sender=Title)
+def move_title_bitmap(sender, instance, created, raw=False, **kwargs):
+    """Переносит произведение в карту новой категории."""
+    if raw:
+        return
+    loaded = getattr(instance, '_loaded_category', None)
+    if created or loaded != instance.category_id:
+        title_bitmaps.on_commit(title_bitmaps.move, instance.pk,
+                                instance.category_id)
+    instance._loaded_category = instance.category_id
+
+
+@receiver(post_delete, sender=Title)
+def remove_title_bitmap(sender, instance, **kwargs):
+    """Убирает удалённое произведение из битовых карт."""
+    title_bitmaps.on_commit(title_bitmaps.remove, instance.pk)
+
+
+@receiver(post_save, sender=GenreTitle)
+def link_genre_bitmap(sender, instance, created, raw=False, **kwargs):
+    """Добавляет произведение в карту жанра; связь, перенесённую
+    на другой жанр или произведение, карты получают перестроением."""
+    if raw:
+        return
+    if created:
+        title_bitmaps.on_commit(title_bitmaps.link, instance.title_id_id,
+                                instance.genre_id_id)
+    else:
+        title_bitmaps.invalidate()
+
+
+@receiver(post_delete, sender=GenreTitle)
+def unlink_genre_bitmap(sender, instance, **kwargs):
+    """Убирает произведение из карты жанра."""
+    title_bitmaps.on_commit(title_bitmaps.unlink, instance.title_id_id,
+                            instance.genre_id_id)
+
+
+@receiver(m2m_changed, sender=GenreTitle)
+def genre_set_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Связи, изменённые через Title.genre (add, remove, set, clear)."""
+    if action == 'post_clear':
+        title_bitmaps.invalidate()
+        return
+    if action not in ('post_add', 'post_remove'):
+        return
+    change = (title_bitmaps.link if action == 'post_add'
+              else title_bitmaps.unlink)
+    for pk in pk_set:
+        title_id, genre_id = (pk, instance.pk) if reverse else (
+            instance.pk, pk)
+        title_bitmaps.on_commit(change, title_id, genre_id)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def purge_review(sender, instance, **kwargs):
+    """Обновляет в кэше nginx отзыв, их список и произведение (рейтинг)."""
+    purge(review_paths(instance.title_id, instance.pk))
+
+
+@receiver(post_save, sender=Comments)
+@receiver(post_delete, sender=Comments)
+def purge_comment(sender, instance, **kwargs):
+    """Обновляет в кэше nginx комментарий, их список и отзыв (счётчик)."""
+    purge(comments=[(instance.review_id_id, instance.pk)])
+
+
+@receiver(post_save, sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    """Убирает пользователя из кэша процесса; при смене роли или прав
+    и при блокировке отзывает ранее выпущенные токены."""
+    user_cache.invalidate(instance.pk)
+    current = (instance.role, instance.is_superuser, instance.is_active)
+    loaded = getattr(instance, '_loaded_role', None)
+    if loaded is not None and loaded != current:
+        revoke_tokens(instance.pk)
+    instance._loaded_role = current
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user(sender, instance, **kwargs):
+    """Отзывает токены удалённого пользователя."""
+    user_cache.invalidate(instance.pk)
+    revoke_tokens(instance.pk)
@@ -0,0 +1,67 @@
+"""Выборочные поля ответа (?fields=).
+
+Параметр fields сокращает не только ответ, но и запрос: из БД читаются
+только столбцы выбранных полей, а связи, которые не нужны, не
+присоединяются и не подгружаются.
+"""
+from rest_framework.exceptions import ValidationError
+
+
+class SparseFieldsMixin:
+    """Поддержка ?fields=a,b для list() и retrieve().
+
+    Доступные поля и их столбцы берутся из values_class (см. fastpath),
+    prefetch_fields задаёт поля, для которых нужен prefetch_related.
+    """
+    fields_param = 'fields'
+    prefetch_fields = {}
+
+    def get_requested_fields(self):
+        """Выбранные поля в порядке сериализатора или None."""
+        if not hasattr(self, '_requested_fields'):
+            self._requested_fields = self.parse_requested_fields()
+        return self._requested_fields
+
+    def parse_requested_fields(self):
+        value = self.request.query_params.get(self.fields_param)
+        if value is None or self.action not in ('list', 'retrieve'):
+            return None
+        requested = {name.strip() for name in value.split(',')} - {''}
+        available = self.values_class.columns
+        unknown = sorted(requested - set(available))
+        if unknown or not requested:
+            raise ValidationError({self.fields_param: [
+                'Неизвестные поля: {}. Доступны: {}.'.format(
+                    ', '.join(unknown) or '-', ', '.join(available))
+            ]})
+        return tuple(name for name in available if name in requested)
+
+    def get_values(self):
+        return self.values_class(self.get_requested_fields())
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self.get_requested_fields()
+        if fields is None:
+            return queryset
+        columns = self.values_class(fields).fields
+        related = sorted({column.split('__')[0] for column in columns
+                          if '__' in column})
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        prefetch = [self.prefetch_fields[name] for name in fields
+                    if name in self.prefetch_fields]
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset.only(*columns, *related)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = self.get_requested_fields()
+        if fields is not None:
+            target = getattr(serializer, 'child', serializer)
+            for name in list(target.fields):
+                if name not in fields:
+                    target.fields.pop(name)
+        return serializer
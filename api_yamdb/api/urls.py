@@ -3,8 +3,8 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (CategoriesViewSet, CommentsViewSet, GenresViewSet,
-                    ReviewViewSet, TitleViewSet, UserViewSet, register_view,
-                    token_view)
+                    ReviewViewSet, TitleViewSet, UserViewSet, export_view,
+                    performance_view, register_view, token_view)
 
 app_name = "api"
 
@@ -35,5 +35,7 @@ auth_urlpatterns = [
 
 urlpatterns = [
     path("v1/auth/", include(auth_urlpatterns)),
+    path("v1/export/<str:kind>/", export_view),
+    path("v1/debug/performance/", performance_view),
     path("v1/", include(router.urls)),
 ]
@@ -3,42 +3,86 @@ from json import dumps
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import IntegrityError, connection, transaction
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
-from rest_framework.pagination import (LimitOffsetPagination,
-                                       PageNumberPagination)
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework.settings import api_settings
+from reviews.feed import rank_feed
 from reviews.models import Categories, Comments, Genres, Review, Title
+from users.outbox import enqueue_email
 
 from api_yamdb import settings
 
+from .authentication import access_token_for, request_user_model
+from .bulk import ReviewBulkImport, TitleBulkImport
+from .caching import CacheControlMixin, CachedListMixin, ConditionalGetMixin
 from .custom_viewsets import ListCreateDeleteViewSet
+from .export import EXPORTS, export_rows, ndjson_gzip
+from .facets import TITLE_FACETS, FacetsMixin
+from .fastpath import (CommentValues, FastJSONRenderer, ReviewValues,
+                       TitleValues, ValuesListMixin)
 from .filters import TitleFilter
+from .pagination import (CommentPagination, CountModePageNumberPagination,
+                         ReviewPagination, TitlePagination)
+from .performance import route_stats
 from .permissions import (AdminOrReadOnly, AuthorOrReadOnly, OnlyAdmin,
                           OnlyAdminCanGiveRole)
 from .serializers import (CategoriesSerializer, CommentSerializer,
                           GenresSerializer, RegistrationSerializer,
                           ReviewSerializer, TitleROSerializer, TitleSerializer,
                           TokenSerializer, UserSerializer)
+from .sparse import SparseFieldsMixin
 
 User = get_user_model()
 
+FEED_LIMIT = 10
+FEED_MAX_LIMIT = 50
+
 
 def get_usr(self):
-    return get_object_or_404(
-        User,
-        username=self.request.user,
-    )
+    """Автор записи — пользователь запроса, без повторного чтения из БД."""
+    return request_user_model(self.request)
+
 
+def save_or_reject(serializer, parent_model, parent_id, message, **kwargs):
+    """Сохраняет запись одним INSERT без предварительных проверок.
+
+    Родителя проверяет внешний ключ, повтор — ограничение уникальности БД.
+    Лишний запрос делается только при ошибке: нет родителя — 404,
+    иначе — 400 с сообщением message.
+
+    Отложенные внешние ключи проверяются при фиксации внешней транзакции.
+    Внутри чужой транзакции (ATOMIC_REQUESTS, вызов из atomic())
+    освобождение точки сохранения их не проверяет, поэтому проверка
+    выполняется до выхода из неё (SET CONSTRAINTS ALL IMMEDIATE на
+    PostgreSQL, PRAGMA foreign_key_check на SQLite).
+    """
+    nested = connection.in_atomic_block
+    try:
+        with transaction.atomic():
+            instance = serializer.save(**kwargs)
+            if nested:
+                connection.check_constraints(
+                    table_names=[instance._meta.db_table])
+    except IntegrityError:
+        if not parent_model.objects.filter(pk=parent_id).exists():
+            raise Http404
+        raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]})
 
-class CategoriesViewSet(ListCreateDeleteViewSet):
+
+class CategoriesViewSet(CacheControlMixin, CachedListMixin,
+                        ListCreateDeleteViewSet):
     """Представление для работы с категориями."""
+    cache_namespace = 'categories'
+    cache_max_age = 60
+    cache_stale_seconds = 300
     queryset = Categories.objects.all()
     serializer_class = CategoriesSerializer
     permission_classes = (AdminOrReadOnly,)
@@ -47,8 +91,12 @@ class CategoriesViewSet(ListCreateDeleteViewSet):
     search_fields = ('name',)
 
 
-class GenresViewSet(ListCreateDeleteViewSet):
+class GenresViewSet(CacheControlMixin, CachedListMixin,
+                    ListCreateDeleteViewSet):
     """Представление для работы с жанрами."""
+    cache_namespace = 'genres'
+    cache_max_age = 60
+    cache_stale_seconds = 300
     queryset = Genres.objects.all()
     serializer_class = GenresSerializer
     permission_classes = (AdminOrReadOnly,)
@@ -57,53 +105,121 @@ class GenresViewSet(ListCreateDeleteViewSet):
     search_fields = ('name',)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(CacheControlMixin, ConditionalGetMixin, SparseFieldsMixin,
+                   FacetsMixin, ValuesListMixin, viewsets.ModelViewSet):
     """Представление для работы с произведениями."""
-    queryset = Title.objects.all().annotate(Avg("review__score")).order_by(
-        "id")
+    available_facets = TITLE_FACETS
+    cache_max_age = 10
+    cache_stale_seconds = 30
+    conditional_namespaces = ('categories', 'genres')
+    last_modified_field = 'updated_at'
+    values_class = TitleValues
+    prefetch_fields = {'genre': 'genre'}
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+    queryset = Title.objects.select_related("category").prefetch_related(
+        "genre").order_by("id")
     serializer_class = TitleSerializer
     permission_classes = (AdminOrReadOnly,)
+    pagination_class = TitlePagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
 
     def get_serializer_class(self):
         """Функция выбора сериализатора."""
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'similar'):
             return TitleROSerializer
         return TitleSerializer
 
+    def get_last_modified(self):
+        if self.action != 'retrieve':
+            return None
+        return Title.objects.filter(pk=self.kwargs['pk']).values_list(
+            'updated_at', flat=True).first()
+
+    @action(detail=True)
+    def similar(self, request, pk=None):
+        """Похожие произведения по убыванию сходства.
+
+        Соседей заранее рассчитывает команда build_similar_titles, поэтому
+        ответ — один запрос по индексу (и подгрузка жанров).
+        """
+        if not pk.isdigit():
+            raise Http404
+        titles = list(self.get_queryset().filter(
+            similar_to__title_id=pk).order_by('-similar_to__score', 'id'))
+        if not titles:
+            get_object_or_404(Title.objects.only('id'), pk=pk)
+        return Response(self.get_serializer(titles, many=True).data)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Пакетное создание произведений."""
+        status_code, results = TitleBulkImport(
+            request.data, self.get_serializer_context()).run()
+        return Response(results, status=status_code)
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(CacheControlMixin, ConditionalGetMixin,
+                    SparseFieldsMixin, ValuesListMixin,
+                    viewsets.ModelViewSet):
     """Представление для работы с отзывами."""
+    cache_max_age = 5
+    cache_stale_seconds = 30
+    values_class = ReviewValues
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
     serializer_class = ReviewSerializer
     permission_classes = (AuthorOrReadOnly,)
+    pagination_class = ReviewPagination
 
     def get_queryset(self):
         url_title_id = self.kwargs.get("url_title_id")
         return Review.objects.filter(title_id=url_title_id)
 
+    def get_last_modified(self):
+        return Title.objects.filter(
+            pk=self.kwargs.get('url_title_id')).values_list(
+            'updated_at', flat=True).first()
+
     def perform_create(self, serializer):
         title_id = self.kwargs.get('url_title_id')
-        title = get_object_or_404(Title, id=title_id)
-        serializer.save(author=get_usr(self), title=title)
+        save_or_reject(serializer, Title, title_id, 'Ревью уже существует!',
+                       author=get_usr(self), title_id=title_id)
+
+    @action(detail=False, methods=['post'], permission_classes=[OnlyAdmin])
+    def bulk(self, request, url_title_id=None):
+        """Пакетный импорт отзывов к произведению администратором."""
+        get_object_or_404(Title.objects.only('id'), pk=url_title_id)
+        status_code, results = ReviewBulkImport(
+            request.data, self.get_serializer_context(), url_title_id).run()
+        return Response(results, status=status_code)
 
 
-class CommentsViewSet(viewsets.ModelViewSet):
+class CommentsViewSet(CacheControlMixin, ConditionalGetMixin,
+                      SparseFieldsMixin, ValuesListMixin,
+                      viewsets.ModelViewSet):
     """Представление для работы с коментариями."""
+    cache_max_age = 5
+    cache_stale_seconds = 30
+    values_class = CommentValues
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
     serializer_class = CommentSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = CommentPagination
     permission_classes = (AuthorOrReadOnly,)
 
     def get_queryset(self):
         url_review_id = self.kwargs.get("url_review_id")
         return Comments.objects.filter(review_id=url_review_id)
 
+    def get_last_modified(self):
+        return Title.objects.filter(
+            review=self.kwargs.get('url_review_id')).values_list(
+            'updated_at', flat=True).first()
+
     def perform_create(self, serializer):
-        review = get_object_or_404(
-            Review,
-            id=self.kwargs.get("url_review_id")
-        )
-        serializer.save(author=get_usr(self), review_id=review)
+        review_id = self.kwargs.get("url_review_id")
+        save_or_reject(serializer, Review, review_id,
+                       'Не удалось сохранить комментарий.',
+                       author=get_usr(self), review_id_id=review_id)
 
 
 @api_view(['POST'])
@@ -124,7 +240,8 @@ def register_view(request):
         "confirmation_code": confirmation_code
     }
     json_body = dumps(body)
-    send_mail(
+    # Письмо отправит команда send_emails, запрос не ждёт почтовый сервер.
+    enqueue_email(
         subject="Подтверждение регистрации на сайте yamDB",
         message=(
             f"Добрый день, {username}!\n"
@@ -134,11 +251,35 @@ def register_view(request):
             f"{json_body}"
         ),
         from_email=f"{settings.CONFIRM_EMAIL}",
-        recipient_list=[request.data["email"]],
+        recipient_list=[serializer.validated_data["email"]],
     )
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@permission_classes([OnlyAdmin])
+def export_view(request, kind):
+    """Потоковая выгрузка произведений, отзывов или комментариев
+    в NDJSON, сжатом gzip."""
+    if kind not in EXPORTS:
+        raise Http404
+    response = StreamingHttpResponse(
+        ndjson_gzip(export_rows(kind, settings.EXPORT_CHUNK_SIZE)),
+        content_type='application/gzip',
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{kind}.ndjson.gz"')
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([OnlyAdmin])
+def performance_view(request):
+    """Перцентили времени запросов по маршрутам этого процесса
+    (пусто, если замеры выключены)."""
+    return Response(route_stats.summary())
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def token_view(request):
@@ -147,10 +288,10 @@ def token_view(request):
     serializer.is_valid(raise_exception=True)
     username = serializer.validated_data['username']
     user = get_object_or_404(User, username=username)
-    if default_token_generator.check_token(
+    if user.is_active and default_token_generator.check_token(
         user, serializer.validated_data['confirmation_code']
     ):
-        token = AccessToken.for_user(user)
+        token = access_token_for(user)
         return Response({"token": str(token)}, status.HTTP_200_OK)
     return Response("Неверный запрос", status.HTTP_400_BAD_REQUEST)
 
@@ -167,7 +308,7 @@ class UserViewSet(viewsets.ModelViewSet):
     lookup_field = "username"
     filter_backends = (filters.SearchFilter,)
     search_fields = ("username",)
-    pagination_class = PageNumberPagination
+    pagination_class = CountModePageNumberPagination
 
     @action(
         detail=False,
@@ -178,8 +319,9 @@ class UserViewSet(viewsets.ModelViewSet):
         ]
     )
     def me(self, request):
-        username = request.user.username
-        user = get_object_or_404(User, username=username)
+        user = request.user
+        if not isinstance(user, User):
+            user = get_object_or_404(User, pk=user.pk)
         if request.method == 'PATCH':
             serializer = UserSerializer(user, data=request.data, partial=True)
             serializer.is_valid(raise_exception=True)
@@ -187,3 +329,23 @@ class UserViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_200_OK)
         serializer = UserSerializer(user)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=False, url_path='me/feed',
+            permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        """Неоценённые произведения, ранжированные для пользователя.
+
+        Ранги считаются по заранее сдвинутым сигналами таблицам ленты
+        (reviews.feed), поэтому ответ — несколько запросов по индексам
+        без чтения отзывов.
+        """
+        limit = request.query_params.get('limit', str(FEED_LIMIT))
+        if not limit.isdigit() or not 0 < int(limit) <= FEED_MAX_LIMIT:
+            raise ValidationError({'limit': [
+                f'Ожидается целое число от 1 до {FEED_MAX_LIMIT}.']})
+        ids = rank_feed(request.user.pk, int(limit))
+        titles = Title.objects.select_related('category').prefetch_related(
+            'genre').in_bulk(ids)
+        return Response(TitleROSerializer(
+            [titles[pk] for pk in ids if pk in titles], many=True,
+            context=self.get_serializer_context()).data)
@@ -1,6 +1,7 @@
 import os
 from datetime import timedelta
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -29,6 +30,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.performance.PerformanceMiddleware',
+    'api.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -70,6 +73,42 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения: хосты через запятую, у каждой свой алиас replicaN.
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', default='').split(',')),
+        start=1):
+    DATABASES[f'replica{number}'] = {**DATABASES['default'],
+                                     'HOST': host.strip(),
+                                     'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', default=5))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='yamdb'),
+    }
+}
+
+# Кэши процесса: метки в них не видны другим процессам.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+SHARED_CACHE = CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+LIST_CACHE_TIMEOUT = int(os.getenv('LIST_CACHE_TIMEOUT', default=300))
+
+# Служебный сервер nginx для обновления микрокэша; пусто — не обновлять.
+NGINX_PURGE_URL = os.getenv('NGINX_PURGE_URL', default='')
+NGINX_PURGE_TIMEOUT = float(os.getenv('NGINX_PURGE_TIMEOUT', default=2))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -102,23 +141,71 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+JWT_AUTHENTICATION_CLASSES = {
+    'default': 'rest_framework_simplejwt.authentication.JWTAuthentication',
+    'cached': 'api.authentication.CachedJWTAuthentication',
+    'claims': 'api.authentication.ClaimsJWTAuthentication',
+}
+JWT_AUTHENTICATION = os.getenv('JWT_AUTHENTICATION', default='default')
+if JWT_AUTHENTICATION not in JWT_AUTHENTICATION_CLASSES:
+    raise ImproperlyConfigured(
+        f'JWT_AUTHENTICATION={JWT_AUTHENTICATION!r}: ожидается одно из '
+        f'{", ".join(JWT_AUTHENTICATION_CLASSES)}.')
+# Режимы cached и claims узнают о смене роли, удалении и блокировке
+# пользователя по метке в кэше Django; без общего кэша другие процессы
+# её не увидят.
+if JWT_AUTHENTICATION != 'default' and not SHARED_CACHE:
+    raise ImproperlyConfigured(
+        f'JWT_AUTHENTICATION={JWT_AUTHENTICATION} требует общего кэша: '
+        f'задайте CACHE_BACKEND (например, memcached).')
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        JWT_AUTHENTICATION_CLASSES[JWT_AUTHENTICATION],
     ],
     'DEFAULT_PAGINATION_CLASS':
-        'rest_framework.pagination.PageNumberPagination',
+        'api.pagination.CountModePageNumberPagination',
     'PAGE_SIZE': 10,
 }
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_USER_CLASS': 'api.authentication.ClaimsUser',
 }
 
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', default=1024))
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', default=60))
+
+FAST_LIST_RESPONSES = os.getenv('FAST_LIST_RESPONSES',
+                                default='True') == 'True'
+
+PAGINATION_COUNT_MODE = os.getenv('PAGINATION_COUNT_MODE', default='exact')
+PAGINATION_COUNT_CACHE_TTL = int(os.getenv('PAGINATION_COUNT_CACHE_TTL',
+                                           default=30))
+
+TITLE_BITMAPS = os.getenv('TITLE_BITMAPS', default='False') == 'True'
+TITLE_BITMAPS_TTL = int(os.getenv('TITLE_BITMAPS_TTL', default=300))
+# Процессы узнают об изменениях чужих карт по версии в кэше Django: с кэшем
+# процесса фильтр по картам расходился бы с SQL до TITLE_BITMAPS_TTL.
+if TITLE_BITMAPS and not SHARED_CACHE:
+    raise ImproperlyConfigured(
+        'TITLE_BITMAPS=True требует общего кэша: задайте CACHE_BACKEND '
+        '(например, memcached).')
+
+PERF_INSTRUMENTATION = os.getenv('PERF_INSTRUMENTATION',
+                                 default='False') == 'True'
+PERF_SLOW_REQUEST_MS = float(os.getenv('PERF_SLOW_REQUEST_MS', default=500))
+PERF_SLOW_QUERIES = int(os.getenv('PERF_SLOW_QUERIES', default=5))
+PERF_ROUTE_SAMPLES = int(os.getenv('PERF_ROUTE_SAMPLES', default=1000))
+
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', default=2000))
+
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', default=1000))
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
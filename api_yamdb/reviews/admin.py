@@ -22,7 +22,9 @@ class GenresAdmin(admin.ModelAdmin):
 
 class TitleAdmin(admin.ModelAdmin):
     """Админка произведений."""
-    list_display = ('id', 'name', 'year', 'description', 'category',)
+    list_display = ('id', 'name', 'year', 'description', 'category',
+                    'rating',)
+    readonly_fields = ('rating_sum', 'rating_count', 'rating',)
     list_editable = ('category',)
     search_fields = ('name',)
     list_filter = ('year',)
@@ -0,0 +1,72 @@
+"""Денормализованные агрегаты приложения 'reviews'."""
+from django.db import transaction
+from django.db.models import (Case, Count, F, FloatField, OuterRef, Q,
+                              Subquery, Sum, Value, When)
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from .models import Comments, Review, Title
+
+
+def _average(rating_sum, rating_count, empty_when):
+    """Выражение среднего балла; NULL, если оценок не осталось."""
+    return Case(
+        When(empty_when, then=Value(None)),
+        default=Cast(rating_sum, FloatField()) / rating_count,
+        output_field=FloatField(),
+    )
+
+
+def apply_rating_delta(title_id, score_delta, count_delta):
+    """Атомарно сдвигает сумму и количество оценок произведения и
+    пересчитывает средний балл одним UPDATE без чтения отзывов."""
+    Title.objects.filter(pk=title_id).update(
+        updated_at=timezone.now(),
+        rating_sum=F('rating_sum') + score_delta,
+        rating_count=F('rating_count') + count_delta,
+        rating=_average(
+            F('rating_sum') + score_delta,
+            F('rating_count') + count_delta,
+            Q(rating_count=-count_delta),
+        ),
+    )
+
+
+def rebuild_ratings(titles=None):
+    """Пересчитывает рейтинги произведений (по умолчанию всех)
+    по таблице отзывов."""
+    if titles is None:
+        titles = Title.objects.all()
+    reviews = Review.objects.filter(
+        title=OuterRef('pk')).order_by().values('title')
+    with transaction.atomic():
+        titles.update(
+            rating_sum=Coalesce(Subquery(
+                reviews.annotate(total=Sum('score')).values('total')), 0),
+            rating_count=Coalesce(Subquery(
+                reviews.annotate(amount=Count('id')).values('amount')), 0),
+        )
+        return titles.update(updated_at=timezone.now(), rating=_average(
+            F('rating_sum'), F('rating_count'), Q(rating_count=0)))
+
+
+def apply_comments_delta(review_id, delta):
+    """Атомарно сдвигает счётчик комментариев отзыва."""
+    Review.objects.filter(pk=review_id).update(
+        comments_count=F('comments_count') + delta)
+
+
+def rebuild_comment_counts(reviews=None):
+    """Пересчитывает счётчики комментариев отзывов (по умолчанию всех)."""
+    if reviews is None:
+        reviews = Review.objects.all()
+    comments = Comments.objects.filter(
+        review_id=OuterRef('pk')).order_by().values('review_id')
+    return reviews.update(comments_count=Coalesce(Subquery(
+        comments.annotate(amount=Count('id')).values('amount')), 0))
+
+
+def touch_titles(titles):
+    """Отмечает произведения изменёнными: сдвигает updated_at, по которому
+    API отвечает на условные запросы."""
+    return titles.update(updated_at=timezone.now())
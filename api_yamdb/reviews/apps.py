@@ -5,3 +5,7 @@ from django.apps import AppConfig
 class ReviewsConfig(AppConfig):
     """Конфигурация приложения 'reviews'."""
     name = "reviews"
+
+    def ready(self):
+        """Подключение сигналов пересчёта агрегатов."""
+        from . import signals  # noqa: F401
@@ -0,0 +1,272 @@
+"""Персональная лента произведений.
+
+Оценка отзыва переводится в предпочтение на отрезке [-1, 1]: 10 — 1,
+1 — -1, 5.5 — безразличие. Для каждого пользователя хранятся:
+
+* UserGenrePreference — сумма предпочтений по жанрам оценённых
+  произведений;
+* UserFeedScore — сумма предпочтений, умноженных на сходство, по
+  соседям оценённых произведений (SimilarTitle). Соседи рассчитаны по
+  оценкам всех пользователей, поэтому в ленту попадает то, что любят
+  оценившие так же. Строки произведений, которые пользователь оценил
+  сам, помечены reviewed: в ленту они не попадают, но продолжают
+  накапливать оценку и возвращаются в неё при удалении отзыва.
+
+Обе таблицы сдвигаются сигналами при каждом отзыве и при изменении
+жанров произведения через ORM (m2m_changed) и целиком пересчитываются
+rebuild_feed() — после build_similar_titles, загрузок в обход сигналов
+и правки строк GenreTitle напрямую. Ранжирование и подбор популярных
+произведений читают только строки пользователя в этих таблицах и не
+обращаются к отзывам.
+"""
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import (Case, Exists, ExpressionWrapper, F, FloatField,
+                              OuterRef, Subquery, Value, When)
+
+from .models import (Genres, GenreTitle, Review, SimilarTitle, Title,
+                     UserFeedScore, UserGenrePreference)
+
+NEUTRAL_SCORE = 5.5
+SCORE_SPREAD = 4.5
+# Сколько лучших кандидатов ранжируется и сколько любимых жанров их
+# отбирает.
+FEED_CANDIDATES = 200
+FEED_GENRES = 5
+VOTES_BATCH_SIZE = 200
+
+
+def preference(score):
+    """Оценка отзыва на отрезке [-1, 1]."""
+    return (score - NEUTRAL_SCORE) / SCORE_SPREAD
+
+
+def title_links(title_id):
+    """Жанры произведения и его соседи с мерой сходства."""
+    genres = list(GenreTitle.objects.filter(
+        title_id_id=title_id).values_list('genre_id_id', flat=True))
+    neighbours = list(SimilarTitle.objects.filter(
+        title_id=title_id).values_list('similar_id', 'score'))
+    return genres, neighbours
+
+
+def _add_votes(cursor, model, keys, values, select, votes, params,
+               flags=()):
+    """INSERT ... SELECT по таблице голосов v(user_id, weight); для
+    существующих ключей значения прибавляются, а флаги объединяются
+    через OR (ON CONFLICT DO UPDATE, PostgreSQL и SQLite 3.24+)."""
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = ', '.join(quote(column) for column in (*keys, *values, *flags))
+    updates = ', '.join(
+        [f'{quote(column)} = {table}.{quote(column)} + '
+         f'excluded.{quote(column)}' for column in values]
+        + [f'{quote(column)} = {table}.{quote(column)} OR '
+           f'excluded.{quote(column)}' for column in flags])
+    for start in range(0, len(votes), VOTES_BATCH_SIZE):
+        batch = votes[start:start + VOTES_BATCH_SIZE]
+        rows = ' UNION ALL '.join(
+            ['SELECT %s AS user_id, %s AS weight'] * len(batch))
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) {select.format(votes=rows)} '
+            f'ON CONFLICT ({", ".join(map(quote, keys))}) '
+            f'DO UPDATE SET {updates}',
+            [item for vote in batch for item in vote] + params)
+
+
+def add_reviews(title_id, votes):
+    """Добавляет в ленты новые отзывы на произведение.
+
+    votes — пары (id автора, оценка). Жанры и соседи произведения
+    читаются внутри INSERT ... SELECT, без отдельных запросов. Строка
+    самого произведения вставляется с пометкой reviewed, поэтому оно
+    уходит из лент авторов; оценки соседей прибавляются и к помеченным
+    строкам.
+    """
+    if not votes:
+        return
+    quote = connection.ops.quote_name
+    link, similar = (quote(model._meta.db_table) for model in (
+        GenreTitle, SimilarTitle))
+    weights = [(user_id, preference(score)) for user_id, score in votes]
+    with connection.cursor() as cursor:
+        _add_votes(
+            cursor, UserGenrePreference, ('user_id', 'genre_id'),
+            ('weight', 'reviews'),
+            f'SELECT v.user_id, l.genre_id_id, v.weight, 1 '
+            f'FROM ({{votes}}) v, {link} l WHERE l.title_id_id = %s',
+            weights, [int(title_id)])
+        _add_votes(
+            cursor, UserFeedScore, ('user_id', 'title_id'), ('score',),
+            f'SELECT v.user_id, t.title_id, v.weight * t.score, t.reviewed '
+            f'FROM ({{votes}}) v, (SELECT similar_id AS title_id, score, '
+            f'%s AS reviewed FROM {similar} WHERE title_id = %s '
+            f'UNION ALL SELECT %s, 0, %s) t WHERE TRUE',
+            weights, [False, int(title_id), int(title_id), True],
+            flags=('reviewed',))
+
+
+def shift_review(title_id, user_id, delta, count_delta, links=None):
+    """Сдвигает вклад отзыва пользователя в ленту на delta; при
+    удалении отзыва (count_delta < 0) снимает пометку reviewed, и
+    произведение с накопленной оценкой возвращается в ленту.
+
+    links — жанры и соседи произведения из title_links(), прочитанные
+    заранее: при удалении произведения их строки удаляются раньше, чем
+    приходит post_delete отзыва.
+
+    Только UPDATE существующих строк: при каскадном удалении
+    пользователя его отзывы удаляются после строк ленты, и вставка
+    нарушила бы внешний ключ. Оценки соседей, обнулившиеся после
+    удаления отзыва, остаются в таблице до rebuild_feed() и в ленту не
+    попадают.
+    """
+    genres, neighbours = links or title_links(title_id)
+    if genres:
+        preferences = UserGenrePreference.objects.filter(
+            user_id=user_id, genre_id__in=genres)
+        preferences.update(weight=F('weight') + delta,
+                           reviews=F('reviews') + count_delta)
+        if count_delta < 0:
+            preferences.filter(reviews__lte=0).delete()
+    if neighbours:
+        UserFeedScore.objects.filter(
+            user_id=user_id,
+            title_id__in=[similar_id for similar_id, _ in neighbours],
+        ).update(score=F('score') + Case(
+            *[When(title_id=similar_id, then=Value(delta * similarity))
+              for similar_id, similarity in neighbours],
+            default=Value(0.0), output_field=FloatField()))
+    if count_delta < 0:
+        UserFeedScore.objects.filter(
+            user_id=user_id, title_id=title_id).update(reviewed=False)
+
+
+def add_title_genres(title_id, genre_ids):
+    """Добавляет отзывы на произведение в предпочтения его новых жанров."""
+    if not genre_ids:
+        return
+    votes = [(user_id, preference(score)) for user_id, score in
+             Review.objects.filter(title_id=title_id).values_list(
+                 'author_id', 'score')]
+    genres = connection.ops.quote_name(Genres._meta.db_table)
+    with connection.cursor() as cursor:
+        _add_votes(
+            cursor, UserGenrePreference, ('user_id', 'genre_id'),
+            ('weight', 'reviews'),
+            f'SELECT v.user_id, g.id, v.weight, 1 FROM ({{votes}}) v, '
+            f'{genres} g WHERE g.id IN '
+            f'({", ".join(["%s"] * len(genre_ids))})',
+            votes, [int(genre_id) for genre_id in genre_ids])
+
+
+def remove_title_genres(title_id, genre_ids):
+    """Убирает отзывы на произведение из предпочтений снятых с него
+    жанров; вызывается до удаления связей."""
+    # remove() передаёт и жанры, которых у произведения не было.
+    genre_ids = list(GenreTitle.objects.filter(
+        title_id_id=title_id, genre_id_id__in=list(genre_ids or ())
+    ).values_list('genre_id_id', flat=True))
+    if not genre_ids:
+        return
+    reviews = Review.objects.filter(title_id=title_id)
+    vote = reviews.filter(author_id=OuterRef('user_id')).annotate(
+        preference=ExpressionWrapper(
+            (F('score') - NEUTRAL_SCORE) / SCORE_SPREAD,
+            output_field=FloatField())).values('preference')[:1]
+    preferences = UserGenrePreference.objects.filter(
+        genre_id__in=list(genre_ids),
+        user_id__in=reviews.values('author_id'))
+    preferences.update(weight=F('weight') - Subquery(vote),
+                       reviews=F('reviews') - 1)
+    preferences.filter(reviews__lte=0).delete()
+
+
+def rebuild_feed():
+    """Пересчитывает ленты всех пользователей по отзывам и соседям;
+    возвращает число строк ленты."""
+    quote = connection.ops.quote_name
+    review, link, similar, preferences, scores = (
+        quote(model._meta.db_table) for model in (
+            Review, GenreTitle, SimilarTitle, UserGenrePreference,
+            UserFeedScore))
+    with transaction.atomic(), connection.cursor() as cursor:
+        UserGenrePreference.objects.all().delete()
+        UserFeedScore.objects.all().delete()
+        cursor.execute(
+            f'INSERT INTO {preferences} (user_id, genre_id, weight, reviews) '
+            f'SELECT r.author_id, l.genre_id_id, SUM((r.score - %s) / %s), '
+            f'COUNT(*) FROM {review} r '
+            f'JOIN {link} l ON l.title_id_id = r.title_id '
+            f'GROUP BY r.author_id, l.genre_id_id',
+            [NEUTRAL_SCORE, SCORE_SPREAD])
+        cursor.execute(
+            f'INSERT INTO {scores} (user_id, title_id, score, reviewed) '
+            f'SELECT r.author_id, s.similar_id, '
+            f'SUM((r.score - %s) / %s * s.score), EXISTS(SELECT 1 '
+            f'FROM {review} o WHERE o.author_id = r.author_id '
+            f'AND o.title_id = s.similar_id) FROM {review} r '
+            f'JOIN {similar} s ON s.title_id = r.title_id '
+            f'GROUP BY r.author_id, s.similar_id',
+            [NEUTRAL_SCORE, SCORE_SPREAD])
+        rows = cursor.rowcount
+        cursor.execute(
+            f'INSERT INTO {scores} (user_id, title_id, score, reviewed) '
+            f'SELECT r.author_id, r.title_id, 0, %s FROM {review} r '
+            f'WHERE NOT EXISTS (SELECT 1 FROM {scores} f '
+            f'WHERE f.user_id = r.author_id AND f.title_id = r.title_id)',
+            [True])
+        return rows + cursor.rowcount
+
+
+def _in_genres(queryset, field, genres):
+    """Строки, произведение которых есть хотя бы в одном из жанров."""
+    return queryset.annotate(in_genres=Exists(GenreTitle.objects.filter(
+        title_id=OuterRef(field), genre_id__in=list(genres)))).filter(
+        in_genres=True)
+
+
+def _popular(user_id, genres, limit, exclude):
+    """Лучшие по рейтингу неоценённые произведения любимых жанров —
+    для новых пользователей и короткой ленты."""
+    titles = Title.objects.filter(rating__isnull=False).exclude(
+        pk__in=exclude).exclude(pk__in=UserFeedScore.objects.filter(
+            user_id=user_id, reviewed=True).values('title_id'))
+    if genres:
+        titles = _in_genres(titles, 'pk', genres)
+    return list(titles.order_by('-rating', 'id').values_list(
+        'id', flat=True)[:limit])
+
+
+def rank_feed(user_id, limit):
+    """id произведений ленты пользователя по убыванию ранга.
+
+    Кандидаты — лучшие по UserFeedScore произведения из любимых жанров;
+    ранг — оценка, увеличенная на долю предпочтений пользователя,
+    которую покрывают жанры произведения.
+    """
+    preferred = dict(UserGenrePreference.objects.filter(
+        user_id=user_id, weight__gt=0).order_by(
+        '-weight', 'genre_id').values_list('genre_id', 'weight')[
+        :FEED_GENRES])
+    candidates = UserFeedScore.objects.filter(user_id=user_id, score__gt=0,
+                                              reviewed=False)
+    if preferred:
+        candidates = _in_genres(candidates, 'title_id', preferred)
+    candidates = list(candidates.order_by('-score', 'title_id').values_list(
+        'title_id', 'score')[:FEED_CANDIDATES])
+    affinity = Counter()
+    if candidates and preferred:
+        total = sum(preferred.values())
+        for title_id, genre_id in GenreTitle.objects.filter(
+                title_id_id__in=[title_id for title_id, _ in candidates],
+                genre_id_id__in=list(preferred)).values_list(
+                'title_id_id', 'genre_id_id'):
+            affinity[title_id] += preferred[genre_id] / total
+    candidates.sort(key=lambda row: (-row[1] * (1 + affinity[row[0]]),
+                                     row[0]))
+    result = [title_id for title_id, _ in candidates[:limit]]
+    if len(result) < limit:
+        result += _popular(user_id, preferred, limit - len(result), result)
+    return result
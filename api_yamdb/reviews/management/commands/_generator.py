@@ -0,0 +1,148 @@
+"""Генерация синтетических данных порциями для generate_data.
+
+Каждая порция генерируется своим генератором случайных чисел, зерно
+которого зависит только от общего зерна, таблицы и номера порции, а id
+строк — от заранее посчитанных смещений порций. Поэтому результат не
+зависит от числа процессов и порядка их работы. Функции порций не
+обращаются к БД и выполняются в дочерних процессах.
+"""
+import random
+from array import array
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+EPOCH = datetime(2015, 1, 1, tzinfo=timezone.utc)
+PERIOD = int(timedelta(days=8 * 365).total_seconds())
+MAX_GENRES = 3
+
+PHRASES = (
+    'Смотрится на одном дыхании.',
+    'Слабый сюжет, но отличная музыка.',
+    'Пересматриваю каждый год.',
+    'Ожидал большего.',
+    'Актёры сыграли блестяще.',
+    'Скучно и затянуто.',
+    'Лучшее, что я видел за последнее время.',
+    'Неплохо, но на один раз.',
+)
+
+
+def rng_for(seed, table, chunk):
+    return random.Random(f'{seed}:{table}:{chunk}')
+
+
+def skewed_weights(count, exponent):
+    """Накопленные веса 1/r^exponent для random.choices."""
+    return list(accumulate(1 / (rank + 1) ** exponent
+                           for rank in range(count)))
+
+
+def zipf_counts(total, items, cap, exponent, seed):
+    """Число отзывов на каждое произведение по закону Ципфа.
+
+    Популярность по рангу убывает как 1/r^exponent, ранги случайно
+    (но детерминированно) распределены по произведениям. Ни одно
+    произведение не получает больше cap отзывов (у автора один отзыв на
+    произведение), излишек переходит к следующим по рангу.
+    """
+    if total > items * cap:
+        raise ValueError('Отзывов больше, чем пар (произведение, автор).')
+    weights = [1 / (rank + 1) ** exponent for rank in range(items)]
+    scale = total / sum(weights)
+    by_rank = [min(cap, int(weight * scale)) for weight in weights]
+    rest = total - sum(by_rank)
+    rank = 0
+    while rest:
+        if by_rank[rank] < cap:
+            by_rank[rank] += 1
+            rest -= 1
+        rank = (rank + 1) % items
+    order = list(range(items))
+    random.Random(f'{seed}:popularity').shuffle(order)
+    counts = array('l', [0]) * items
+    for rank, index in enumerate(order):
+        counts[index] = by_rank[rank]
+    return counts
+
+
+def _date(rng, after=None):
+    moment = after or EPOCH
+    limit = PERIOD if after is None else 30 * 24 * 3600
+    moment += timedelta(seconds=rng.randrange(limit))
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def generate_users(task):
+    """Пользователи порции: строки users.csv."""
+    offset, start, stop = task
+    return [
+        (offset + index, f'synthetic_{offset + index}',
+         f'synthetic_{offset + index}@yamdb.fake', 'user', '', '', '')
+        for index in range(start + 1, stop + 1)
+    ]
+
+
+def generate_titles(task):
+    """Произведения порции и их жанры: строки titles.csv и
+    genre_title.csv."""
+    (seed, chunk, start, stop, offsets, categories, category_weights,
+     genres, genre_weights) = task
+    rng = rng_for(seed, 'titles', chunk)
+    titles = []
+    links = []
+    link_id = offsets['genre_title'] + start * MAX_GENRES
+    for index in range(start + 1, stop + 1):
+        title_id = offsets['title'] + index
+        titles.append((
+            title_id, f'Произведение {title_id}', rng.randrange(1950, 2023),
+            f'Описание произведения {title_id}. {rng.choice(PHRASES)}',
+            rng.choices(categories, cum_weights=category_weights)[0],
+        ))
+        count = rng.choices((1, 2, 3), weights=(5, 3, 2))[0]
+        chosen = set(rng.choices(genres, cum_weights=genre_weights, k=count))
+        for genre_id in sorted(chosen):
+            link_id += 1
+            links.append((link_id, title_id, genre_id))
+    return titles, links
+
+
+def generate_reviews(task):
+    """Отзывы и комментарии порции произведений: строки review.csv и
+    comments.csv.
+
+    counts — число отзывов каждого произведения порции, comments — число
+    комментариев на порцию; авторы отзывов на произведение не повторяются.
+    """
+    (seed, chunk, start, counts, users, comments, review_base,
+     comment_base, offsets) = task
+    rng = rng_for(seed, 'reviews', chunk)
+    reviews = []
+    dates = []
+    review_id = review_base
+    for index, count in enumerate(counts, start + 1):
+        title_id = offsets['title'] + index
+        quality = rng.uniform(3, 9.5)
+        for author in rng.sample(range(users), count):
+            review_id += 1
+            score = min(10, max(1, round(rng.gauss(quality, 1.5))))
+            pub_date = _date(rng)
+            reviews.append((review_id, title_id,
+                            f'{rng.choice(PHRASES)} Оценка {score}.',
+                            offsets['user'] + author + 1, score, pub_date))
+            dates.append(pub_date)
+    rows = []
+    if reviews:
+        # Обсуждают в основном первые (самые заметные) отзывы порции.
+        weights = skewed_weights(len(reviews), 0.8)
+        for comment_id in range(comment_base + 1,
+                                comment_base + comments + 1):
+            position = rng.choices(range(len(reviews)),
+                                   cum_weights=weights)[0]
+            published = datetime.strptime(
+                dates[position], '%Y-%m-%dT%H:%M:%SZ').replace(
+                tzinfo=timezone.utc)
+            rows.append((comment_id, reviews[position][0],
+                         f'Комментарий: {rng.choice(PHRASES)}',
+                         offsets['user'] + rng.randrange(users) + 1,
+                         _date(rng, after=published)))
+    return reviews, rows
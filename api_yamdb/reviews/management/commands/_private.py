@@ -0,0 +1,176 @@
+import csv
+import io
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+
+class IdSet:
+    """Множество целочисленных id на битовой карте: миллионы id занимают
+    мегабайты, а не гигабайты, как у set()."""
+
+    def __init__(self, ids=()):
+        self.bits = bytearray()
+        for pk in ids:
+            self.add(pk)
+
+    def add(self, pk):
+        index, bit = divmod(pk, 8)
+        if index >= len(self.bits):
+            self.bits.extend(bytes(index - len(self.bits) + 1))
+        self.bits[index] |= 1 << bit
+
+    def __contains__(self, pk):
+        index, bit = divmod(pk, 8)
+        return index < len(self.bits) and bool(self.bits[index] & (1 << bit))
+
+
+def read_chunks(path, size):
+    """Потоково читает CSV-файл порциями по size строк."""
+    with open(path, 'r', encoding='utf8') as f:
+        reader = csv.DictReader(f, delimiter=',')
+        while True:
+            chunk = list(islice(reader, size))
+            if not chunk:
+                return
+            yield chunk
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    return value
+
+
+def _auto_date_fields(model):
+    return [field for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False)
+            or getattr(field, 'auto_now_add', False)]
+
+
+def _fill_auto_dates(model, objs):
+    """Ставит текущее время только в пустые поля auto_now(_add): даты из
+    загружаемых данных сохраняются как есть."""
+    now = timezone.now()
+    for field in _auto_date_fields(model):
+        for obj in objs:
+            if getattr(obj, field.attname) is None:
+                setattr(obj, field.attname, now)
+
+
+@contextmanager
+def _keep_auto_dates(model):
+    """Отключает auto_now(_add) полей модели: bulk_create иначе заменит
+    загружаемые даты временем вставки."""
+    fields = [(field, field.auto_now, field.auto_now_add)
+              for field in _auto_date_fields(model)]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def copy_objects(model, objs):
+    """Загружает объекты в таблицу модели через PostgreSQL COPY."""
+    fields = [field for field in model._meta.concrete_fields]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    _fill_auto_dates(model, objs)
+    with _keep_auto_dates(model):
+        for obj in objs:
+            writer.writerow([
+                _copy_value(field.get_db_prep_save(
+                    field.pre_save(obj, True), connection))
+                for field in fields
+            ])
+    buffer.seek(0)
+    columns = ', '.join(
+        connection.ops.quote_name(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {connection.ops.quote_name(model._meta.db_table)} '
+            f"({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer,
+        )
+
+
+def write_objects(model, objs, batch_size):
+    """Пишет порцию объектов: COPY на PostgreSQL, иначе bulk_create."""
+    if connection.vendor == 'postgresql':
+        copy_objects(model, objs)
+        return
+    # Django 2.2 не ограничивает явный batch_size лимитами бэкенда, а SQLite
+    # не принимает больше 500 строк в одном INSERT.
+    limit = connection.ops.bulk_batch_size(model._meta.concrete_fields, objs)
+    _fill_auto_dates(model, objs)
+    with _keep_auto_dates(model):
+        model.objects.bulk_create(objs, batch_size=min(batch_size, limit))
+
+
+def reset_sequences(model):
+    """Сдвигает последовательность id после вставки с явными id."""
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    if not statements:
+        return
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+class BulkTableLoader:
+    """Потоковая загрузка одной CSV-таблицы порциями.
+
+    relations — словарь 'колонка CSV' -> ('атрибут модели', модель);
+    внешние ключи проверяются по известным id из known_ids без запросов
+    к БД, строки с несуществующими ссылками пропускаются.
+    """
+
+    def __init__(self, model, relations, known_ids, chunk_size):
+        self.model = model
+        self.relations = relations
+        self.known_ids = known_ids
+        self.chunk_size = chunk_size
+        self.loaded = 0
+        self.skipped = 0
+
+    def build(self, row):
+        """Объект модели из строки CSV или None, если строку пропускаем."""
+        pk = int(row.pop('id'))
+        if pk in self.known_ids[self.model]:
+            return None
+        values = {}
+        for column, (attname, related_model) in self.relations.items():
+            value = row.pop(column) or None
+            if value is not None:
+                value = int(value)
+                if value not in self.known_ids[related_model]:
+                    return None
+            values[attname] = value
+        return self.model(pk=pk, **values, **row)
+
+    def load(self, path):
+        """Загружает файл в одной транзакции и возвращает строк в секунду."""
+        started = time.monotonic()
+        with transaction.atomic():
+            for chunk in read_chunks(path, self.chunk_size):
+                objs = []
+                for row in chunk:
+                    obj = self.build(row)
+                    if obj is None:
+                        self.skipped += 1
+                        continue
+                    objs.append(obj)
+                    self.known_ids[self.model].add(obj.pk)
+                if objs:
+                    write_objects(self.model, objs, self.chunk_size)
+                    self.loaded += len(objs)
+            reset_sequences(self.model)
+        elapsed = time.monotonic() - started
+        return self.loaded / elapsed if elapsed else float(self.loaded)
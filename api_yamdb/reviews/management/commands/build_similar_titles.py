@@ -0,0 +1,87 @@
+import os
+import time
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from reviews.feed import rebuild_feed
+from reviews.models import SimilarTitle
+
+from ._private import reset_sequences, write_objects
+
+
+def split(total, size):
+    """Границы порций [start, stop) по size элементов."""
+    return [(start, min(start + size, total))
+            for start in range(0, total, size)]
+
+
+class Command(BaseCommand):
+    help = ('Пересчёт похожих произведений по оценкам пользователей и '
+            'жанрам (нужны numpy и scipy)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--neighbours', type=int, default=20,
+                            help='Число соседей произведения')
+        parser.add_argument('--genre-weight', type=float, default=0.3,
+                            help='Доля сходства по жанрам, от 0 до 1')
+        parser.add_argument('--pool', type=int, default=1000,
+                            help='Число самых обсуждаемых произведений, '
+                                 'которые всегда проверяются как соседи')
+        parser.add_argument('--workers', type=int,
+                            default=os.cpu_count() or 1,
+                            help='Число процессов расчёта')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Число произведений в порции')
+
+    def handle(self, *args, **options):
+        for name in ('neighbours', 'workers', 'chunk_size'):
+            if options[name] < 1:
+                raise CommandError(f'--{name.replace("_", "-")} '
+                                   f'должно быть больше нуля.')
+        if options['pool'] < 0:
+            raise CommandError('--pool не может быть отрицательным.')
+        if not 0 <= options['genre_weight'] <= 1:
+            raise CommandError('--genre-weight должно быть от 0 до 1.')
+        try:
+            from reviews.similarity import (init_worker, load_state,
+                                            neighbours_chunk)
+            state = load_state(options['genre_weight'], options['pool'],
+                               options['neighbours'])
+        except ImportError as error:
+            raise CommandError(f'Для расчёта нужны numpy и scipy: {error}')
+
+        started = time.monotonic()
+        chunks = split(len(state['titles']), options['chunk_size'])
+        if options['workers'] > 1:
+            pool = Pool(options['workers'], initializer=init_worker,
+                        initargs=(state,))
+            results = pool.imap(neighbours_chunk, chunks)
+        else:
+            pool = None
+            init_worker(state)
+            results = map(neighbours_chunk, chunks)
+        written = 0
+        try:
+            # Старые соседи видны API до фиксации транзакции.
+            with transaction.atomic():
+                SimilarTitle.objects.all().delete()
+                for rows in results:
+                    write_objects(SimilarTitle, [
+                        SimilarTitle(pk=written + number, title_id=title_id,
+                                     similar_id=similar_id, score=score)
+                        for number, (title_id, similar_id, score)
+                        in enumerate(rows, 1)
+                    ], options['chunk_size'])
+                    written += len(rows)
+                reset_sequences(SimilarTitle)
+                # Ленты считаются по соседям и устаревают вместе с ними.
+                feed_rows = rebuild_feed()
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        self.stdout.write(
+            f'Похожие произведения пересчитаны: {written} пар для '
+            f'{len(state["titles"])} произведений за '
+            f'{time.monotonic() - started:.1f} с, строк лент: {feed_rows}')
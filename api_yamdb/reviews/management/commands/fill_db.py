@@ -1,10 +1,15 @@
 import csv
+import os
 
 from django.core.management.base import BaseCommand
+from reviews.aggregates import rebuild_comment_counts, rebuild_ratings
+from reviews.feed import rebuild_feed
 from reviews.models import (Categories, Comments, Genres, GenreTitle, Review,
                             Title)
 from users.models import CustomUser as User
 
+from ._private import BulkTableLoader, IdSet
+
 file_table = {
     'category.csv': Categories,
     'genre.csv': Genres,
@@ -15,13 +20,46 @@ file_table = {
     'comments.csv': Comments
 }
 
+file_relations = {
+    'titles.csv': {'category': ('category_id', Categories)},
+    'genre_title.csv': {'title_id': ('title_id_id', Title),
+                        'genre_id': ('genre_id_id', Genres)},
+    'review.csv': {'title_id': ('title_id', Title),
+                   'author': ('author_id', User)},
+    'comments.csv': {'review_id': ('review_id_id', Review),
+                     'author': ('author_id', User)},
+}
+
 
 class Command(BaseCommand):
     help = 'Заполнение БД'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Потоковая загрузка порциями через bulk_create '
+                 '(COPY на PostgreSQL)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Размер порции строк для загрузки в режиме --bulk',
+        )
+        parser.add_argument(
+            '--data-dir',
+            default=os.path.join('static', 'data'),
+            help='Каталог с CSV-файлами',
+        )
+
     def handle(self, *args, **options):
+        if options['bulk']:
+            self.bulk_fill(options['data_dir'], options['chunk_size'])
+            return
         for file, table in file_table.items():
-            with open(f'static/data/{file}', 'r', encoding='utf8') as f:
+            with open(os.path.join(options['data_dir'], file), 'r',
+                      encoding='utf8') as f:
                 dr = csv.DictReader(f, delimiter=',')
                 for row in dr:
                     if file == 'titles.csv':
@@ -46,3 +84,24 @@ class Command(BaseCommand):
                     else:
                         table.objects.get_or_create(**row)
                 self.stdout.write(f'Таблица {table.__name__} заполнена!')
+
+    def bulk_fill(self, data_dir, chunk_size):
+        """Загрузка всех таблиц порциями, по транзакции на таблицу."""
+        known_ids = {
+            table: IdSet(table.objects.values_list('id', flat=True).iterator())
+            for table in file_table.values()
+        }
+        for file, table in file_table.items():
+            loader = BulkTableLoader(table, file_relations.get(file, {}),
+                                     known_ids, chunk_size)
+            rate = loader.load(os.path.join(data_dir, file))
+            self.stdout.write(
+                f'Таблица {table.__name__} заполнена! '
+                f'Загружено {loader.loaded}, пропущено {loader.skipped}, '
+                f'{rate:.0f} строк/с'
+            )
+        # bulk_create и COPY не вызывают сигналы — рейтинги, счётчики и ленты
+        # пересчитываем.
+        rebuild_ratings()
+        rebuild_comment_counts()
+        rebuild_feed()
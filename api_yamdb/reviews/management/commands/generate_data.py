@@ -0,0 +1,231 @@
+import csv
+import os
+import time
+from itertools import accumulate
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from reviews.aggregates import rebuild_comment_counts, rebuild_ratings
+from reviews.feed import rebuild_feed
+from reviews.models import (Categories, Comments, Genres, GenreTitle, Review,
+                            Title)
+from users.models import CustomUser as User
+
+from ._generator import (generate_reviews, generate_titles, generate_users,
+                         skewed_weights, zipf_counts)
+from ._private import reset_sequences, write_objects
+
+# Файл -> (модель, колонки CSV, атрибуты модели). Колонки совпадают с
+# static/data, поэтому результат загружается командой fill_db.
+tables = {
+    'category.csv': (Categories, ('id', 'name', 'slug'),
+                     ('pk', 'name', 'slug')),
+    'genre.csv': (Genres, ('id', 'name', 'slug'), ('pk', 'name', 'slug')),
+    'users.csv': (User,
+                  ('id', 'username', 'email', 'role', 'bio', 'first_name',
+                   'last_name'),
+                  ('pk', 'username', 'email', 'role', 'bio', 'first_name',
+                   'last_name')),
+    'titles.csv': (Title, ('id', 'name', 'year', 'description', 'category'),
+                   ('pk', 'name', 'year', 'description', 'category_id')),
+    'genre_title.csv': (GenreTitle, ('id', 'title_id', 'genre_id'),
+                        ('pk', 'title_id_id', 'genre_id_id')),
+    'review.csv': (Review,
+                   ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+                   ('pk', 'title_id', 'text', 'author_id', 'score',
+                    'pub_date')),
+    'comments.csv': (Comments,
+                     ('id', 'review_id', 'text', 'author', 'pub_date'),
+                     ('pk', 'review_id_id', 'text', 'author_id', 'pub_date')),
+}
+
+offset_keys = {
+    'category': Categories, 'genre': Genres, 'user': User, 'title': Title,
+    'genre_title': GenreTitle, 'review': Review, 'comment': Comments,
+}
+
+
+class CsvSink:
+    """Пишет строки в CSV-файлы каталога; id начинаются с 1."""
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.files = {}
+        self.writers = {}
+        for file, (_, columns, _) in tables.items():
+            self.files[file] = open(os.path.join(directory, file), 'w',
+                                    encoding='utf8', newline='')
+            self.writers[file] = csv.writer(self.files[file])
+            self.writers[file].writerow(columns)
+
+    def offsets(self):
+        return dict.fromkeys(offset_keys, 0)
+
+    def write(self, file, rows):
+        self.writers[file].writerows(rows)
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+
+
+class DatabaseSink:
+    """Пишет строки в БД порциями (COPY на PostgreSQL, иначе bulk_create);
+    id продолжают уже существующие."""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+
+    def offsets(self):
+        return {key: model.objects.aggregate(top=Max('id'))['top'] or 0
+                for key, model in offset_keys.items()}
+
+    def write(self, file, rows):
+        model, _, attnames = tables[file]
+        objs = [model(**dict(zip(attnames, row))) for row in rows]
+        with transaction.atomic():
+            write_objects(model, objs, self.batch_size)
+
+    def close(self):
+        for model, _, _ in tables.values():
+            reset_sequences(model)
+        # bulk_create и COPY не вызывают сигналы — рейтинги, счётчики и ленты
+        # пересчитываем.
+        rebuild_ratings()
+        rebuild_comment_counts()
+        rebuild_feed()
+
+
+def split(total, size):
+    """Границы порций [start, stop) по size элементов."""
+    return [(start, min(start + size, total))
+            for start in range(0, total, size)]
+
+
+class Command(BaseCommand):
+    help = ('Генерация синтетического набора данных: в CSV-файлы для '
+            'fill_db или сразу в БД')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=1000,
+                            help='Число произведений')
+        parser.add_argument('--users', type=int, default=1000,
+                            help='Число пользователей')
+        parser.add_argument('--reviews', type=int, default=10000,
+                            help='Число отзывов')
+        parser.add_argument('--comments', type=int, default=20000,
+                            help='Число комментариев')
+        parser.add_argument('--categories', type=int, default=10,
+                            help='Число категорий')
+        parser.add_argument('--genres', type=int, default=30,
+                            help='Число жанров')
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Показатель распределения Ципфа для '
+                                 'отзывов на произведение')
+        parser.add_argument('--seed', type=int, default=1,
+                            help='Зерно генератора случайных чисел')
+        parser.add_argument('--workers', type=int,
+                            default=os.cpu_count() or 1,
+                            help='Число процессов генерации')
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help='Число произведений (пользователей) '
+                                 'в порции')
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--output-dir',
+                            help='Каталог для CSV-файлов')
+        target.add_argument('--to-db', action='store_true',
+                            help='Писать сразу в БД')
+
+    def handle(self, *args, **options):
+        for name in ('titles', 'users', 'categories', 'genres', 'workers',
+                     'chunk_size'):
+            if options[name] < 1:
+                raise CommandError(f'--{name.replace("_", "-")} '
+                                   f'должно быть больше нуля.')
+        for name in ('reviews', 'comments'):
+            if options[name] < 0:
+                raise CommandError(f'--{name} не может быть отрицательным.')
+        if options['comments'] and not options['reviews']:
+            raise CommandError('Комментариям нужны отзывы.')
+        try:
+            counts = zipf_counts(options['reviews'], options['titles'],
+                                 options['users'], options['zipf'],
+                                 options['seed'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        if options['to_db']:
+            sink = DatabaseSink(options['chunk_size'])
+        else:
+            sink = CsvSink(options['output_dir'])
+        offsets = sink.offsets()
+        pool = Pool(options['workers']) if options['workers'] > 1 else None
+        imap = pool.imap if pool else map
+        try:
+            self.generate(sink, imap, offsets, counts, options)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+            sink.close()
+
+    def generate(self, sink, imap, offsets, counts, options):
+        seed = options['seed']
+        chunks = split(options['titles'], options['chunk_size'])
+
+        categories = [offsets['category'] + index
+                      for index in range(1, options['categories'] + 1)]
+        genres = [offsets['genre'] + index
+                  for index in range(1, options['genres'] + 1)]
+        sink.write('category.csv', [(pk, f'Категория {pk}', f'category-{pk}')
+                                    for pk in categories])
+        sink.write('genre.csv', [(pk, f'Жанр {pk}', f'genre-{pk}')
+                                 for pk in genres])
+
+        self.run(sink, 'users.csv', imap(generate_users, [
+            (offsets['user'], start, stop)
+            for start, stop in split(options['users'], options['chunk_size'])
+        ]))
+
+        category_weights = skewed_weights(len(categories), 1.0)
+        genre_weights = skewed_weights(len(genres), 1.2)
+        self.run(sink, ('titles.csv', 'genre_title.csv'), imap(
+            generate_titles, [
+                (seed, chunk, start, stop, offsets, categories,
+                 category_weights, genres, genre_weights)
+                for chunk, (start, stop) in enumerate(chunks)
+            ]))
+
+        # Смещения id отзывов и комментариев каждой порции известны заранее,
+        # поэтому порции генерируются независимо и в любом порядке.
+        reviews = [sum(counts[start:stop]) for start, stop in chunks]
+        ratio = options['comments'] / (options['reviews'] or 1)
+        review_bases = [0, *accumulate(reviews)]
+        comment_bases = [round(base * ratio) for base in review_bases]
+        self.run(sink, ('review.csv', 'comments.csv'), imap(
+            generate_reviews, [
+                (seed, chunk, start, counts[start:stop].tolist(),
+                 options['users'],
+                 comment_bases[chunk + 1] - comment_bases[chunk],
+                 offsets['review'] + review_bases[chunk],
+                 offsets['comment'] + comment_bases[chunk], offsets)
+                for chunk, (start, stop) in enumerate(chunks)
+            ]))
+
+    def run(self, sink, files, results):
+        """Пишет результаты порций по порядку и печатает скорость."""
+        if isinstance(files, str):
+            files = (files,)
+            results = ((rows,) for rows in results)
+        started = time.monotonic()
+        written = dict.fromkeys(files, 0)
+        for result in results:
+            for file, rows in zip(files, result):
+                sink.write(file, rows)
+                written[file] += len(rows)
+        elapsed = time.monotonic() - started or 1e-9
+        for file, count in written.items():
+            self.stdout.write(f'{file}: {count} строк, '
+                              f'{count / elapsed:.0f} строк/с')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from reviews.aggregates import rebuild_comment_counts, rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = ('Пересчёт рейтингов, числа отзывов произведений и числа '
+            'комментариев отзывов')
+
+    def handle(self, *args, **options):
+        titles = rebuild_ratings()
+        reviews = rebuild_comment_counts()
+        self.stdout.write(
+            f'Счётчики пересчитаны для {titles} произведений '
+            f'и {reviews} отзывов!')
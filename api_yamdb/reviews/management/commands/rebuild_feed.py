@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from reviews.feed import rebuild_feed
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт персональных лент по отзывам и похожим произведениям'
+
+    def handle(self, *args, **options):
+        count = rebuild_feed()
+        self.stdout.write(f'Ленты пересчитаны: {count} строк!')
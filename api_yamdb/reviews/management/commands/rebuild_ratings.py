@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from reviews.aggregates import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт рейтингов произведений по отзывам'
+
+    def handle(self, *args, **options):
+        count = rebuild_ratings()
+        self.stdout.write(f'Рейтинги пересчитаны для {count} произведений!')
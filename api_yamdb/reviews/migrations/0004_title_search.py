@@ -0,0 +1,70 @@
+from django.db import migrations
+
+# SQL скопирован в миграцию, чтобы она не зависела от reviews.search.
+# Выражение индекса PostgreSQL должно совпадать с PG_VECTOR поиска.
+PG_INSTALL = [
+    'CREATE INDEX IF NOT EXISTS reviews_title_search_idx ON reviews_title '
+    "USING GIN ((to_tsvector('russian', coalesce(name, '') "
+    "|| ' ' || coalesce(description, ''))))",
+]
+
+PG_UNINSTALL = [
+    'DROP INDEX IF EXISTS reviews_title_search_idx',
+]
+
+SQLITE_INSTALL = [
+    'CREATE VIRTUAL TABLE IF NOT EXISTS reviews_title_fts USING fts5('
+    "name, description, content='reviews_title', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    'DROP TRIGGER IF EXISTS reviews_title_fts_insert',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_delete',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_update',
+    'CREATE TRIGGER reviews_title_fts_insert AFTER INSERT ON reviews_title '
+    'BEGIN INSERT INTO reviews_title_fts(rowid, name, description) '
+    'VALUES (new.id, new.name, new.description); END',
+    'CREATE TRIGGER reviews_title_fts_delete AFTER DELETE ON reviews_title '
+    'BEGIN INSERT INTO reviews_title_fts'
+    '(reviews_title_fts, rowid, name, description) '
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    'CREATE TRIGGER reviews_title_fts_update '
+    'AFTER UPDATE OF name, description ON reviews_title '
+    'BEGIN INSERT INTO reviews_title_fts'
+    '(reviews_title_fts, rowid, name, description) '
+    "VALUES ('delete', old.id, old.name, old.description); "
+    'INSERT INTO reviews_title_fts(rowid, name, description) '
+    'VALUES (new.id, new.name, new.description); END',
+    "INSERT INTO reviews_title_fts(reviews_title_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS reviews_title_fts_insert',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_delete',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_update',
+    'DROP TABLE IF EXISTS reviews_title_fts',
+]
+
+
+def execute(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql)
+
+
+def install(apps, schema_editor):
+    execute(schema_editor, {'postgresql': PG_INSTALL,
+                            'sqlite': SQLITE_INSTALL})
+
+
+def uninstall(apps, schema_editor):
+    execute(schema_editor, {'postgresql': PG_UNINSTALL,
+                            'sqlite': SQLITE_UNINSTALL})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_title_rating'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:46
+
+from django.db import migrations, models
+
+# Копия SQLITE_INSTALL из 0004_title_search: миграция не зависит от
+# reviews.search.
+SQLITE_INSTALL = [
+    'CREATE VIRTUAL TABLE IF NOT EXISTS reviews_title_fts USING fts5('
+    "name, description, content='reviews_title', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    'DROP TRIGGER IF EXISTS reviews_title_fts_insert',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_delete',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_update',
+    'CREATE TRIGGER reviews_title_fts_insert AFTER INSERT ON reviews_title '
+    'BEGIN INSERT INTO reviews_title_fts(rowid, name, description) '
+    'VALUES (new.id, new.name, new.description); END',
+    'CREATE TRIGGER reviews_title_fts_delete AFTER DELETE ON reviews_title '
+    'BEGIN INSERT INTO reviews_title_fts'
+    '(reviews_title_fts, rowid, name, description) '
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    'CREATE TRIGGER reviews_title_fts_update '
+    'AFTER UPDATE OF name, description ON reviews_title '
+    'BEGIN INSERT INTO reviews_title_fts'
+    '(reviews_title_fts, rowid, name, description) '
+    "VALUES ('delete', old.id, old.name, old.description); "
+    'INSERT INTO reviews_title_fts(rowid, name, description) '
+    'VALUES (new.id, new.name, new.description); END',
+    "INSERT INTO reviews_title_fts(reviews_title_fts) VALUES ('rebuild')",
+]
+
+
+def reinstall_search_index(apps, schema_editor):
+    # На SQLite AddField и RemoveField пересобирают reviews_title и удаляют
+    # триггеры поискового индекса; индекс PostgreSQL при этом сохраняется.
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in SQLITE_INSTALL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop,
+                             reinstall_search_index),
+        migrations.AddField(
+            model_name='title',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменено'),
+        ),
+        migrations.RunPython(reinstall_search_index,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:49
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_comments(apps, schema_editor):
+    Comments = apps.get_model('reviews', 'Comments')
+    Review = apps.get_model('reviews', 'Review')
+    comments = Comments.objects.filter(
+        review_id=OuterRef('pk')).order_by().values('review_id')
+    Review.objects.update(comments_count=Coalesce(Subquery(
+        comments.annotate(amount=Count('id')).values('amount')), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_title_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество комментариев'),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reviews', '0008_similar_title'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserFeedScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(default=0, verbose_name='Оценка')),
+            ],
+            options={
+                'verbose_name': 'Оценка для ленты',
+                'verbose_name_plural': 'Оценки для ленты',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserGenrePreference',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.FloatField(default=0, verbose_name='Вес')),
+                ('reviews', models.IntegerField(default=0, verbose_name='Число отзывов')),
+            ],
+            options={
+                'verbose_name': 'Предпочтение жанра',
+                'verbose_name_plural': 'Предпочтения жанров',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-rating', 'id'], name='title_rating_idx'),
+        ),
+        migrations.AddField(
+            model_name='usergenrepreference',
+            name='genre',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.Genres', verbose_name='Жанр'),
+        ),
+        migrations.AddField(
+            model_name='usergenrepreference',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='genre_preferences', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddField(
+            model_name='userfeedscore',
+            name='title',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.Title', verbose_name='Произведение'),
+        ),
+        migrations.AddField(
+            model_name='userfeedscore',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_scores', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddConstraint(
+            model_name='usergenrepreference',
+            constraint=models.UniqueConstraint(fields=('user', 'genre'), name='unique_user_genre_preference'),
+        ),
+        migrations.AddIndex(
+            model_name='userfeedscore',
+            index=models.Index(fields=['user', '-score'], name='feed_user_score_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='userfeedscore',
+            constraint=models.UniqueConstraint(fields=('user', 'title'), name='unique_user_feed_title'),
+        ),
+    ]
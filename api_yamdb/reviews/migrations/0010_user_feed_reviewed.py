@@ -0,0 +1,35 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_user_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userfeedscore',
+            name='reviewed',
+            field=models.BooleanField(default=False, verbose_name='Оценено пользователем'),
+        ),
+        # Строки оценённых произведений раньше удалялись из ленты;
+        # оценки соседей в них восстановит rebuild_feed.
+        migrations.RunSQL(
+            [
+                'UPDATE reviews_userfeedscore SET reviewed = TRUE '
+                'WHERE EXISTS (SELECT 1 FROM reviews_review r '
+                'WHERE r.author_id = reviews_userfeedscore.user_id '
+                'AND r.title_id = reviews_userfeedscore.title_id)',
+                'INSERT INTO reviews_userfeedscore '
+                '(user_id, title_id, score, reviewed) '
+                'SELECT r.author_id, r.title_id, 0, TRUE '
+                'FROM reviews_review r WHERE NOT EXISTS (SELECT 1 '
+                'FROM reviews_userfeedscore f WHERE f.user_id = r.author_id '
+                'AND f.title_id = r.title_id)',
+            ],
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -71,11 +71,32 @@ class Title(models.Model):
         related_name='titles',
         verbose_name='Жанр'
     )
+    rating_sum = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Сумма оценок'
+    )
+    rating_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество оценок'
+    )
+    rating = models.FloatField(
+        blank=True,
+        null=True,
+        verbose_name='Рейтинг'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменено'
+    )
 
     class Meta:
         ordering = ('id',)
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
+        indexes = [
+            models.Index(fields=['year'], name='title_year_idx'),
+            models.Index(fields=['-rating', 'id'], name='title_rating_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(fields=['name', 'year', 'category'],
                                     name='unique_title')
@@ -84,6 +105,15 @@ class Title(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает загруженную категорию, чтобы при сохранении
+        отличить её смену от правки других полей."""
+        instance = super().from_db(db, field_names, values)
+        if 'category_id' in instance.__dict__:
+            instance._loaded_category = instance.category_id
+        return instance
+
 
 class GenreTitle(models.Model):
     """Модель связей произведений с жанрами."""
@@ -99,6 +129,10 @@ class GenreTitle(models.Model):
     class Meta:
         verbose_name = 'Произведение-жанр'
         verbose_name_plural = 'Произведения-жанры'
+        indexes = [
+            models.Index(fields=['genre_id', 'title_id'],
+                         name='genretitle_genre_title_idx'),
+        ]
 
 
 class Review(models.Model):
@@ -115,12 +149,29 @@ class Review(models.Model):
         'Дата публикации, отзыва',
         auto_now_add=True
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество комментариев'
+    )
 
     class Meta:
         ordering = ('id',)
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
         unique_together = ('title', 'author')
+        indexes = [
+            models.Index(fields=['title', 'pub_date', 'id'],
+                         name='review_title_pub_date_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает загруженные произведение и оценку, чтобы при
+        сохранении сдвинуть рейтинг на разницу, а не пересчитывать его."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_rating = (instance.__dict__.get('title_id'),
+                                   instance.__dict__.get('score'))
+        return instance
 
 
 class Comments(models.Model):
@@ -137,3 +188,96 @@ class Comments(models.Model):
         ordering = ('id',)
         verbose_name = 'Комент'
         verbose_name_plural = 'Коменты'
+        indexes = [
+            models.Index(fields=['review_id', 'id'],
+                         name='comments_review_idx'),
+            models.Index(fields=['review_id', 'pub_date', 'id'],
+                         name='comments_review_pub_date_idx'),
+        ]
+
+
+class SimilarTitle(models.Model):
+    """Похожее произведение; таблицу заполняет команда
+    build_similar_titles."""
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='neighbours',
+        verbose_name='Произведение'
+    )
+    similar = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожее произведение'
+    )
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        verbose_name = 'Похожее произведение'
+        verbose_name_plural = 'Похожие произведения'
+        indexes = [
+            models.Index(fields=['title', '-score'],
+                         name='similar_title_score_idx'),
+        ]
+
+
+class UserGenrePreference(models.Model):
+    """Предпочтение пользователя к жанру: сумма его оценок произведений
+    жанра, приведённых к отрезку [-1, 1]."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='genre_preferences',
+        verbose_name='Пользователь'
+    )
+    genre = models.ForeignKey(
+        Genres,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Жанр'
+    )
+    weight = models.FloatField(default=0, verbose_name='Вес')
+    reviews = models.IntegerField(default=0, verbose_name='Число отзывов')
+
+    class Meta:
+        verbose_name = 'Предпочтение жанра'
+        verbose_name_plural = 'Предпочтения жанров'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'genre'],
+                                    name='unique_user_genre_preference')
+        ]
+
+
+class UserFeedScore(models.Model):
+    """Оценка произведения для ленты пользователя по соседям
+    произведений, которые он оценил."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_scores',
+        verbose_name='Пользователь'
+    )
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Произведение'
+    )
+    score = models.FloatField(default=0, verbose_name='Оценка')
+    reviewed = models.BooleanField(
+        default=False,
+        verbose_name='Оценено пользователем'
+    )
+
+    class Meta:
+        verbose_name = 'Оценка для ленты'
+        verbose_name_plural = 'Оценки для ленты'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'title'],
+                                    name='unique_user_feed_title')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-score'],
+                         name='feed_user_score_idx'),
+        ]
@@ -0,0 +1,57 @@
+"""Полнотекстовый поиск произведений.
+
+На PostgreSQL поиск идёт по GIN-индексу выражения to_tsvector над названием
+и описанием, на SQLite — по виртуальной таблице FTS5, которую поддерживают
+в актуальном состоянии триггеры. Индекс и триггеры создаёт миграция
+0004_title_search; выражение PG_VECTOR должно совпадать с выражением её
+индекса. На SQLite миграции, пересобирающие reviews_title, удаляют
+триггеры и должны создать их заново (как 0006_title_updated_at).
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'russian'
+
+PG_VECTOR = (
+    f"to_tsvector('{SEARCH_CONFIG}', coalesce(reviews_title.name, '') "
+    f"|| ' ' || coalesce(reviews_title.description, ''))"
+)
+
+
+def _fts5_query(query):
+    """Запрос FTS5 из слов пользователя: все слова обязательны, синтаксис
+    FTS5 в пользовательском вводе не интерпретируется."""
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', query))
+
+
+def search_titles(queryset, query):
+    """Произведения, подходящие под запрос, в порядке релевантности.
+
+    К каждому произведению добавляется аннотация search_rank.
+    """
+    if connection.vendor == 'postgresql':
+        tsquery = f"plainto_tsquery('{SEARCH_CONFIG}', %s)"
+        return queryset.extra(
+            where=[f'{PG_VECTOR} @@ {tsquery}'], params=[query]
+        ).annotate(search_rank=RawSQL(
+            f'ts_rank({PG_VECTOR}, {tsquery})', [query],
+            output_field=FloatField(),
+        )).order_by('-search_rank', 'id')
+    if connection.vendor == 'sqlite':
+        match = _fts5_query(query)
+        if not match:
+            return queryset.none()
+        return queryset.extra(
+            where=['reviews_title.id IN (SELECT rowid FROM reviews_title_fts '
+                   'WHERE reviews_title_fts MATCH %s)'],
+            params=[match],
+        ).annotate(search_rank=RawSQL(
+            'SELECT -bm25(reviews_title_fts) FROM reviews_title_fts '
+            'WHERE reviews_title_fts MATCH %s '
+            'AND reviews_title_fts.rowid = reviews_title.id', [match],
+            output_field=FloatField(),
+        )).order_by('-search_rank', 'id')
+    return queryset.filter(name__icontains=query)
@@ -0,0 +1,102 @@
+"""Сигналы приложения 'reviews'."""
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from .aggregates import (apply_comments_delta, apply_rating_delta,
+                         rebuild_ratings, touch_titles)
+from .feed import (SCORE_SPREAD, add_reviews, add_title_genres, preference,
+                   remove_title_genres, shift_review, title_links)
+from .models import Comments, Review, Title
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, raw=False, **kwargs):
+    """Сдвигает рейтинг произведения и ленту автора при создании и
+    изменении отзыва; изменение одного текста только отмечает
+    произведение изменённым."""
+    if raw:
+        return
+    loaded_title_id, loaded_score = getattr(
+        instance, '_loaded_rating', (None, None))
+    vote = [(instance.author_id, instance.score)]
+    if created:
+        apply_rating_delta(instance.title_id, instance.score, 1)
+        add_reviews(instance.title_id, vote)
+    elif loaded_title_id is None:
+        rebuild_ratings(Title.objects.filter(pk=instance.title_id))
+    elif loaded_title_id != instance.title_id:
+        apply_rating_delta(loaded_title_id, -loaded_score, -1)
+        apply_rating_delta(instance.title_id, instance.score, 1)
+        shift_review(loaded_title_id, instance.author_id,
+                     -preference(loaded_score), -1)
+        add_reviews(instance.title_id, vote)
+    elif loaded_score != instance.score:
+        apply_rating_delta(instance.title_id,
+                           instance.score - loaded_score, 0)
+        shift_review(instance.title_id, instance.author_id,
+                     (instance.score - loaded_score) / SCORE_SPREAD, 0)
+    else:
+        touch_titles(Title.objects.filter(pk=instance.title_id))
+    instance._loaded_rating = (instance.title_id, instance.score)
+
+
+@receiver(pre_delete, sender=Review)
+def capture_feed_links(sender, instance, **kwargs):
+    """Запоминает жанры и соседей произведения удаляемого отзыва: при
+    удалении произведения каскад удаляет их раньше отзыва."""
+    instance._feed_links = title_links(instance.title_id)
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    """Убирает оценку удалённого отзыва из рейтинга произведения и
+    ленты автора."""
+    apply_rating_delta(instance.title_id, -instance.score, -1)
+    shift_review(instance.title_id, instance.author_id,
+                 -preference(instance.score), -1,
+                 getattr(instance, '_feed_links', None))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def update_feed_on_genres(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """Переносит оценки отзывов в предпочтениях пользователей при
+    добавлении и снятии жанров произведения."""
+    if action == 'pre_clear':
+        if reverse:
+            pk_set = set(instance.titles.values_list('pk', flat=True))
+        else:
+            pk_set = set(instance.genre.values_list('pk', flat=True))
+    elif action not in ('post_add', 'pre_remove'):
+        return
+    change = add_title_genres if action == 'post_add' else (
+        remove_title_genres)
+    if not reverse:
+        change(instance.pk, pk_set)
+        return
+    for title_id in pk_set:
+        change(title_id, [instance.pk])
+
+
+@receiver(post_save, sender=Comments)
+@receiver(post_delete, sender=Comments)
+def touch_title_on_comment(sender, instance, raw=False, **kwargs):
+    """Отмечает изменённым произведение, к отзыву на которое
+    добавлен, изменён или удалён комментарий."""
+    if raw:
+        return
+    touch_titles(Title.objects.filter(review=instance.review_id_id))
+
+
+@receiver(post_save, sender=Comments)
+def count_comment_on_save(sender, instance, created, raw=False, **kwargs):
+    """Увеличивает счётчик комментариев отзыва."""
+    if created and not raw:
+        apply_comments_delta(instance.review_id_id, 1)
+
+
+@receiver(post_delete, sender=Comments)
+def count_comment_on_delete(sender, instance, **kwargs):
+    """Уменьшает счётчик комментариев отзыва."""
+    apply_comments_delta(instance.review_id_id, -1)
@@ -0,0 +1,127 @@
+"""Похожие произведения по оценкам пользователей и жанрам.
+
+Оценки отзывов собираются в разреженную матрицу «произведение ×
+пользователь» за вычетом средней оценки автора, чтобы щедрые и строгие
+пользователи не делали похожими всё, что они оценили. Сходство двух
+произведений — косинус их строк, смешанный с косинусом векторов жанров
+в доле genre_weight.
+
+Кандидаты в соседи — произведения с общими авторами отзывов и pool_size
+самых обсуждаемых произведений: так у произведений без отзывов тоже
+есть соседи по жанрам, а строка сходства не становится плотной из-за
+популярного жанра.
+
+NumPy и SciPy нужны только команде build_similar_titles и
+импортируются внутри функций.
+"""
+from array import array
+
+from .models import GenreTitle, Review, Title
+
+_state = {}
+
+
+def _ids(pairs, count):
+    """Столбцы массивов из потока кортежей целых чисел."""
+    import numpy as np
+
+    columns = [array('q') for _ in range(count)]
+    for row in pairs:
+        for column, value in zip(columns, row):
+            column.append(value)
+    return [np.frombuffer(column, dtype=np.int64) if column
+            else np.zeros(0, dtype=np.int64) for column in columns]
+
+
+def _normalized(matrix):
+    """Строки матрицы единичной длины; нулевые строки остаются нулевыми."""
+    import numpy as np
+    from scipy import sparse
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    scale = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    return sparse.diags(scale) @ matrix
+
+
+def load_state(genre_weight, pool_size, neighbours):
+    """Матрицы оценок и жанров для расчёта соседей по порциям."""
+    import numpy as np
+    from scipy import sparse
+
+    titles, popularity = _ids(Title.objects.order_by('id').values_list(
+        'id', 'rating_count').iterator(), 2)
+    title_ids, author_ids, scores = _ids(Review.objects.values_list(
+        'title_id', 'author_id', 'score').iterator(), 3)
+    users, columns = np.unique(author_ids, return_inverse=True)
+    scores = scores.astype(np.float64)
+    means = (np.bincount(columns, weights=scores, minlength=len(users))
+             / np.maximum(np.bincount(columns, minlength=len(users)), 1))
+    ratings = sparse.csr_matrix(
+        (scores - means[columns], (np.searchsorted(titles, title_ids),
+                                   columns)),
+        shape=(len(titles), len(users)))
+    ratings.eliminate_zeros()
+    ratings = _normalized(ratings).tocsr()
+
+    link_titles, link_genres = _ids(GenreTitle.objects.values_list(
+        'title_id_id', 'genre_id_id').iterator(), 2)
+    genres, genre_columns = np.unique(link_genres, return_inverse=True)
+    genre_matrix = sparse.csr_matrix(
+        (np.ones(len(link_titles)),
+         (np.searchsorted(titles, link_titles), genre_columns)),
+        shape=(len(titles), len(genres)))
+    genre_matrix = _normalized(genre_matrix).tocsr()
+
+    pool = np.sort(np.argsort(-popularity, kind='stable')[:pool_size])
+    return {
+        'titles': titles,
+        'ratings': ratings,
+        'ratings_t': ratings.T.tocsr(),
+        'genres': genre_matrix,
+        'pool': pool,
+        'genre_weight': genre_weight,
+        'neighbours': neighbours,
+    }
+
+
+def init_worker(state):
+    """Инициализатор процесса пула: матрицы передаются один раз."""
+    _state.clear()
+    _state.update(state)
+
+
+def neighbours_chunk(bounds):
+    """Соседи строк [start, stop): список (id, id соседа, сходство)."""
+    import numpy as np
+
+    start, stop = bounds
+    titles = _state['titles']
+    genres = _state['genres']
+    weight = _state['genre_weight']
+    limit = _state['neighbours']
+    products = (_state['ratings'][start:stop] @ _state['ratings_t']).tocsr()
+    result = []
+    for offset, row in enumerate(range(start, stop)):
+        begin, end = products.indptr[offset], products.indptr[offset + 1]
+        columns = products.indices[begin:end]
+        candidates = np.union1d(columns, _state['pool'])
+        candidates = candidates[candidates != row]
+        if not len(candidates):
+            continue
+        rating = np.zeros(len(candidates))
+        keep = columns != row
+        rating[np.searchsorted(candidates, columns[keep])] = (
+            products.data[begin:end][keep])
+        genre = np.asarray(
+            (genres[candidates] @ genres[row].T).todense()).ravel()
+        score = (1 - weight) * rating + weight * genre
+        if len(score) > limit:
+            top = np.argpartition(-score, limit)[:limit]
+        else:
+            top = np.arange(len(score))
+        top = top[np.lexsort((candidates[top], -score[top]))]
+        result.extend(
+            (int(titles[row]), int(titles[candidates[index]]),
+             float(score[index]))
+            for index in top if score[index] > 0)
+    return result
@@ -2,6 +2,8 @@
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 
+from .models import OutgoingEmail
+
 User = get_user_model()
 
 
@@ -27,3 +29,21 @@ class UserAdmin(admin.ModelAdmin):
 
 
 admin.site.register(User, UserAdmin)
+
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    """Просмотр очереди исходящих писем."""
+    list_display = (
+        "recipient",
+        "subject",
+        "status",
+        "attempts",
+        "send_after",
+        "sent_at",
+    )
+    search_fields = ("recipient",)
+    list_filter = ("status",)
+    readonly_fields = ("created", "sent_at", "last_error")
+
+
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
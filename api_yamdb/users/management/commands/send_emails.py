@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+from users.outbox import deliver_batch
+
+
+class Command(BaseCommand):
+    help = 'Отправка писем из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Число писем, отправляемых через одно соединение',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=5,
+            help='Число попыток, после которого письмо не отправляется',
+        )
+        parser.add_argument(
+            '--backoff',
+            type=float,
+            default=30,
+            help='Задержка перед второй попыткой, секунды; далее удваивается',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Пауза при пустой очереди, секунды',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Разобрать очередь и завершиться',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = deliver_batch(options['batch_size'],
+                                         options['max_attempts'],
+                                         options['backoff'])
+            if sent or failed:
+                self.stdout.write(
+                    f'Отправлено писем: {sent}, с ошибкой: {failed}')
+                continue
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 CHOICES_ROLE = (
     ("user", "user"),
@@ -55,6 +56,16 @@ class CustomUser(AbstractUser):
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает загруженные роль, права и активность, чтобы при
+        сохранении отличить их смену от правки профиля."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_role = (instance.__dict__.get('role'),
+                                 instance.__dict__.get('is_superuser'),
+                                 instance.__dict__.get('is_active'))
+        return instance
+
     @property
     def is_admin(self):
         return self.role == 'admin'
@@ -69,3 +80,42 @@ class CustomUser(AbstractUser):
 
     def __str__(self):
         return self.username
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку."""
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'в очереди'),
+        (SENT, 'отправлено'),
+        (FAILED, 'не отправлено'),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipient = models.EmailField()
+    status = models.CharField(
+        max_length=10,
+        default=PENDING,
+        choices=STATUSES,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    send_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Письмо'
+        verbose_name_plural = 'Очередь писем'
+        indexes = [
+            models.Index(fields=['status', 'send_after'],
+                         name='outgoingemail_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
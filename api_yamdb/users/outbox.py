@@ -0,0 +1,105 @@
+"""Очередь исходящих писем в БД.
+
+Запрос только ставит письмо в очередь, отправляет их команда send_emails:
+порциями, через одно соединение с почтовым сервером на порцию, с повторами
+и растущей задержкой между попытками.
+"""
+import logging
+import smtplib
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+logger = logging.getLogger('users.outbox')
+
+# На сколько письмо откладывается при захвате: если обработчик упадёт во
+# время отправки, письмо вернётся в очередь после этого срока.
+CLAIM_LEASE = timedelta(minutes=10)
+
+
+def enqueue_email(subject, message, from_email, recipient_list):
+    """Ставит письмо в очередь, по записи на каждого получателя."""
+    return OutgoingEmail.objects.bulk_create(
+        OutgoingEmail(subject=subject, body=message, from_email=from_email,
+                      recipient=recipient)
+        for recipient in recipient_list
+    )
+
+
+def retry_delay(attempts, backoff):
+    """Задержка перед следующей попыткой: удваивается с каждой неудачей."""
+    return timedelta(seconds=backoff * 2 ** (attempts - 1))
+
+
+def _send(email, connection, now, max_attempts, backoff):
+    # Попытка уже засчитана при захвате письма.
+    try:
+        EmailMessage(email.subject, email.body, email.from_email,
+                     [email.recipient], connection=connection).send()
+    except Exception as error:
+        email.last_error = repr(error)
+        if email.attempts >= max_attempts:
+            email.status = OutgoingEmail.FAILED
+        else:
+            email.send_after = now + retry_delay(email.attempts, backoff)
+        return False
+    email.status = OutgoingEmail.SENT
+    email.sent_at = now
+    return True
+
+
+def _claim(batch_size, now):
+    """Захватывает порцию писем, срок которых подошёл.
+
+    Строки блокируются с SKIP LOCKED только на время захвата: попытка
+    засчитывается, а письмо откладывается на CLAIM_LEASE, и транзакция
+    завершается до обращения к почтовому серверу.
+    """
+    with transaction.atomic():
+        batch = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True).filter(
+                status=OutgoingEmail.PENDING, send_after__lte=now,
+            ).order_by('send_after', 'id')[:batch_size]
+        )
+        if batch:
+            OutgoingEmail.objects.filter(
+                pk__in=[email.pk for email in batch],
+            ).update(attempts=F('attempts') + 1, send_after=now + CLAIM_LEASE)
+    for email in batch:
+        email.attempts += 1
+        email.send_after = now + CLAIM_LEASE
+    return batch
+
+
+def deliver_batch(batch_size, max_attempts, backoff):
+    """Отправляет одну порцию писем, срок которых подошёл.
+
+    Письма захватываются отдельной транзакцией (_claim), поэтому
+    несколько обработчиков не берут одни и те же письма, а блокировки
+    строк не держатся во время отправки. Возвращает (отправлено,
+    с ошибкой).
+    """
+    now = timezone.now()
+    batch = _claim(batch_size, now)
+    if not batch:
+        return 0, 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except (OSError, smtplib.SMTPException) as error:
+        # Сервер недоступен: каждое письмо получит свою ошибку ниже.
+        logger.warning('Не удалось подключиться к почтовому серверу: %s',
+                       error)
+    try:
+        sent = sum(_send(email, connection, now, max_attempts, backoff)
+                   for email in batch)
+    finally:
+        connection.close()
+    OutgoingEmail.objects.bulk_update(
+        batch, ['status', 'send_after', 'last_error', 'sent_at'])
+    return sent, len(batch) - sent
@@ -1,9 +1,36 @@
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
+    'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(
+        django_db_modify_db_settings_parallel_suffix):
+    # Отдельная тестовая БД-«реплика»: в неё ничего не реплицируется, поэтому
+    # видно, из какой БД читал запрос. Маршрутизатор использует её только
+    # в тестах, включающих DATABASE_REPLICAS.
+    from django.conf import settings
+
+    default = settings.DATABASES['default']
+    test = {}
+    if default['ENGINE'] != 'django.db.backends.sqlite3':
+        test['NAME'] = f'test_{default["NAME"]}_replica'
+    settings.DATABASES.setdefault('replica', {**default, 'TEST': test})
+
+
+@pytest.fixture(autouse=True)
+def reset_title_bitmaps():
+    # Битовые карты жанров живут в процессе дольше тестовой транзакции,
+    # а её откат не сдвигает их версию.
+    from api.bitmaps import title_bitmaps
+
+    title_bitmaps.clear()
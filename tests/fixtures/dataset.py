@@ -0,0 +1,67 @@
+"""Набор данных для проверок планов запросов и нагрузочных тестов."""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from reviews.aggregates import rebuild_comment_counts, rebuild_ratings
+from reviews.models import (Categories, Comments, Genres, GenreTitle, Review,
+                            Title)
+
+SEED_TABLES = ('reviews_comments', 'reviews_review', 'reviews_genretitle',
+               'reviews_title', 'reviews_genres', 'reviews_categories')
+
+
+def seed(titles_count, users_count=300):
+    """Заполняет БД вне транзакции теста; возвращает id «горячих»
+    произведения и отзыва, у которых больше всего отзывов и комментариев."""
+    User = get_user_model()
+    Categories.objects.bulk_create(
+        Categories(name=f'Категория {i}', slug=f'category-{i}')
+        for i in range(5))
+    Genres.objects.bulk_create(
+        Genres(name=f'Жанр {i}', slug=f'genre-{i}') for i in range(20))
+    categories = list(Categories.objects.order_by('id'))
+    genres = list(Genres.objects.order_by('id'))
+    Title.objects.bulk_create(
+        (Title(name=f'Произведение {i}', year=1900 + i % 120,
+               description=f'Описание {i}', category=categories[i % 5])
+         for i in range(titles_count)), batch_size=500)
+    titles = list(Title.objects.order_by('id').values_list('id', flat=True))
+    GenreTitle.objects.bulk_create(
+        (GenreTitle(title_id_id=title, genre_id=genres[(i + shift) % 20])
+         for i, title in enumerate(titles) for shift in (0, 7)),
+        batch_size=500)
+    User.objects.bulk_create(
+        User(username=f'plan_user_{i}', email=f'plan_user_{i}@yamdb.fake')
+        for i in range(users_count))
+    users = list(User.objects.filter(
+        username__startswith='plan_user_').values_list('id', flat=True))
+    hot_title = titles[0]
+    Review.objects.bulk_create(
+        (Review(title_id=hot_title, author_id=user, text='Отзыв', score=7)
+         for user in users), batch_size=500)
+    Review.objects.bulk_create(
+        (Review(title_id=title, author_id=users[(i + shift) % users_count],
+                text='Отзыв', score=5)
+         for i, title in enumerate(titles[1:]) for shift in (0, 1)),
+        batch_size=500)
+    hot_review = Review.objects.filter(title_id=hot_title).order_by(
+        'id').values_list('id', flat=True)[0]
+    Comments.objects.bulk_create(
+        (Comments(review_id_id=hot_review, author_id=user, text='Коммент')
+         for user in users), batch_size=500)
+    Comments.objects.bulk_create(
+        (Comments(review_id_id=review, author_id=users[0], text='Коммент')
+         for review in Review.objects.exclude(pk=hot_review).values_list(
+            'id', flat=True)), batch_size=500)
+    rebuild_ratings()
+    rebuild_comment_counts()
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return {'title': hot_title, 'review': hot_review}
+
+
+def unseed():
+    with connection.cursor() as cursor:
+        for table in SEED_TABLES:
+            cursor.execute(f'DELETE FROM {table}')
+        cursor.execute('DELETE FROM users_customuser WHERE username LIKE %s',
+                       ['plan_user_%'])
@@ -0,0 +1,73 @@
+import pytest
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+def _client_for(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create(
+        username='TestUser', email='testuser@yamdb.fake'
+    )
+
+
+@pytest.fixture
+def another_user(django_user_model):
+    return django_user_model.objects.create(
+        username='TestUserAnother', email='testuseranother@yamdb.fake'
+    )
+
+
+@pytest.fixture
+def admin(django_user_model):
+    return django_user_model.objects.create(
+        username='TestAdmin', email='testadmin@yamdb.fake', role='admin'
+    )
+
+
+@pytest.fixture
+def user_client(user):
+    return _client_for(user)
+
+
+@pytest.fixture
+def another_user_client(another_user):
+    return _client_for(another_user)
+
+
+@pytest.fixture
+def admin_client(admin):
+    return _client_for(admin)
+
+
+@pytest.fixture
+def anon_client():
+    return APIClient()
+
+
+@pytest.fixture
+def catalogue(db):
+    from reviews.models import Categories, Genres, GenreTitle, Title
+
+    movie = Categories.objects.create(name='Фильм', slug='movie')
+    book = Categories.objects.create(name='Книга', slug='book')
+    drama = Genres.objects.create(name='Драма', slug='drama')
+    comedy = Genres.objects.create(name='Комедия', slug='comedy')
+    titles = []
+    for number in range(12):
+        title = Title.objects.create(
+            name=f'Произведение {number}',
+            year=1990 + number,
+            description=f'Описание {number}',
+            category=movie if number % 2 else book,
+        )
+        GenreTitle.objects.create(title_id=title, genre_id=drama)
+        if number % 3 == 0:
+            GenreTitle.objects.create(title_id=title, genre_id=comedy)
+        titles.append(title)
+    return titles
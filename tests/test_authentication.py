@@ -0,0 +1,199 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from api.authentication import (CachedJWTAuthentication,
+                                ClaimsJWTAuthentication, access_token_for,
+                                revoke_tokens, user_cache)
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+
+@pytest.fixture
+def claims_auth(monkeypatch):
+    # authentication_classes вычисляется при импорте APIView,
+    # поэтому режим подменяем на классе, а не через настройки.
+    monkeypatch.setattr(APIView, 'authentication_classes',
+                        [ClaimsJWTAuthentication])
+
+
+@pytest.fixture
+def cached_auth(monkeypatch):
+    monkeypatch.setattr(APIView, 'authentication_classes',
+                        [CachedJWTAuthentication])
+
+
+PROJECT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api_yamdb')
+AUTHENTICATION_CLASSES = (
+    'import django; django.setup(); '
+    'from rest_framework.views import APIView; '
+    'print(*[cls.__name__ for cls in APIView.authentication_classes])'
+)
+
+
+def authentication_classes(tmp_path, **env):
+    """Классы аутентификации, которые получает процесс с окружением env."""
+    environ = {key: value for key, value in os.environ.items()
+               if key not in ('JWT_AUTHENTICATION', 'CACHE_BACKEND')}
+    environ.update(DJANGO_SETTINGS_MODULE='api_yamdb.settings',
+                   CACHE_LOCATION=str(tmp_path), **env)
+    return subprocess.run(
+        [sys.executable, '-c', AUTHENTICATION_CLASSES], cwd=PROJECT_DIR,
+        env=environ, capture_output=True, text=True)
+
+
+def client_with_claims(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token_for(user)}')
+    return client
+
+
+def user_queries(context):
+    return [query['sql'] for query in context.captured_queries
+            if 'users_customuser' in query['sql']
+            and query['sql'].lstrip().upper().startswith('SELECT')]
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    cache.clear()
+    user_cache.clear()
+    yield
+    cache.clear()
+    user_cache.clear()
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('claims_auth')
+class TestClaimsAuthentication:
+
+    def test_admin_write_without_user_queries(self, admin):
+        client = client_with_claims(admin)
+        with CaptureQueriesContext(connection) as context:
+            response = client.post('/api/v1/genres/',
+                                   {'name': 'Драма', 'slug': 'drama'})
+        assert response.status_code == 201
+        assert not user_queries(context), (
+            'Проверьте, что права администратора определяются по токену'
+        )
+
+    def test_review_create_without_user_queries(self, user, catalogue):
+        client = client_with_claims(user)
+        url = f'/api/v1/titles/{catalogue[0].id}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(url, {'text': 'Текст', 'score': 7})
+        assert response.status_code == 201
+        assert response.json()['author'] == user.username
+        assert not user_queries(context), (
+            'Проверьте, что автор отзыва берётся из токена без запросов к БД'
+        )
+
+    def test_role_change_rejects_old_token(self, admin):
+        client = client_with_claims(admin)
+        admin = type(admin).objects.get(pk=admin.pk)
+        admin.role = 'user'
+        admin.save()
+        response = client.post('/api/v1/genres/',
+                               {'name': 'Драма', 'slug': 'drama'})
+        assert response.status_code == 401, (
+            'Проверьте, что после смены роли старый токен отклоняется'
+        )
+
+    def test_profile_edit_keeps_token(self, user):
+        client = client_with_claims(user)
+        response = client.patch('/api/v1/users/me/', {'bio': 'О себе'})
+        assert response.status_code == 200
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == 200
+        assert response.json()['bio'] == 'О себе'
+
+    def test_delete_and_block_reject_old_token(self, user, admin):
+        client = client_with_claims(user)
+        user = type(user).objects.get(pk=user.pk)
+        user.is_active = False
+        user.save()
+        assert client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что после блокировки старый токен отклоняется'
+        )
+        client = client_with_claims(admin)
+        type(admin).objects.get(pk=admin.pk).delete()
+        assert client.get('/api/v1/users/').status_code == 401, (
+            'Проверьте, что токен удалённого пользователя отклоняется'
+        )
+
+    def test_unreadable_revocation_fails_closed(self, user, monkeypatch):
+        client = client_with_claims(user)
+
+        def broken(*args, **kwargs):
+            raise ConnectionError('кэш недоступен')
+
+        monkeypatch.setattr(cache, 'get', broken)
+        assert client.get('/api/v1/users/me/').status_code == 401
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('cached_auth')
+class TestCachedAuthentication:
+
+    def test_user_loaded_once(self, user):
+        client = client_with_claims(user)
+        client.get('/api/v1/users/me/')
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/users/me/')
+        assert response.status_code == 200
+        assert not user_queries(context), (
+            'Проверьте, что пользователь берётся из кэша процесса'
+        )
+
+    def test_role_change_evicts_cached_user(self, admin):
+        client = client_with_claims(admin)
+        assert client.get('/api/v1/users/').status_code == 200
+        admin = type(admin).objects.get(pk=admin.pk)
+        admin.role = 'user'
+        admin.save()
+        assert client.get('/api/v1/users/').status_code == 403
+
+    def test_revocation_from_other_process(self, user):
+        client = client_with_claims(user)
+        assert client.get('/api/v1/users/me/').status_code == 200
+        # Другой процесс заблокировал пользователя: сигналы этого
+        # процесса не срабатывали, остаётся только метка в общем кэше.
+        type(user).objects.filter(pk=user.pk).update(is_active=False)
+        revoke_tokens(user.pk)
+        assert client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что кэш пользователей перечитывает отозванного '
+            'пользователя'
+        )
+
+
+class TestAuthenticationSetting:
+    FILE_CACHE = 'django.core.cache.backends.filebased.FileBasedCache'
+
+    @pytest.mark.parametrize('mode, expected', [
+        ('default', 'JWTAuthentication'),
+        ('cached', 'CachedJWTAuthentication'),
+        ('claims', 'ClaimsJWTAuthentication'),
+    ])
+    def test_modes(self, tmp_path, mode, expected):
+        result = authentication_classes(tmp_path, JWT_AUTHENTICATION=mode,
+                                        CACHE_BACKEND=self.FILE_CACHE)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.split() == [expected]
+
+    def test_unknown_mode(self, tmp_path):
+        result = authentication_classes(tmp_path, JWT_AUTHENTICATION='jwt')
+        assert result.returncode != 0
+        assert 'ImproperlyConfigured' in result.stderr
+
+    @pytest.mark.parametrize('mode', ['cached', 'claims'])
+    def test_local_cache_rejected(self, tmp_path, mode):
+        result = authentication_classes(tmp_path, JWT_AUTHENTICATION=mode)
+        assert result.returncode != 0, (
+            'Проверьте, что режимы cached и claims требуют общего кэша'
+        )
+        assert 'CACHE_BACKEND' in result.stderr
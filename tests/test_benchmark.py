@@ -0,0 +1,417 @@
+"""Нагрузочные замеры эндпойнтов API.
+
+Запускаются только с переменной окружения BENCHMARK=1:
+
+    BENCHMARK=1 pytest tests/test_benchmark.py
+
+BENCHMARK_TITLES — размер набора данных, BENCHMARK_REQUESTS — число
+запросов на эндпойнт, BENCHMARK_OUTPUT — файл с результатами в JSON,
+BENCHMARK_BASELINE — прошлый файл результатов для сравнения.
+
+Проверка того, что у каждого маршрута API есть сценарий, выполняется
+всегда.
+"""
+import json
+import os
+import subprocess
+import time
+from urllib.parse import urlsplit
+
+import pytest
+from api.export import EXPORTS
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, resolve
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .fixtures.dataset import seed, unseed
+
+benchmark = pytest.mark.skipif(
+    not os.getenv('BENCHMARK'),
+    reason='нагрузочные замеры включаются переменной BENCHMARK=1',
+)
+
+TITLES = int(os.getenv('BENCHMARK_TITLES', 2000))
+REQUESTS = int(os.getenv('BENCHMARK_REQUESTS', 50))
+OUTPUT = os.getenv('BENCHMARK_OUTPUT', 'benchmark.json')
+BASELINE = os.getenv('BENCHMARK_BASELINE')
+BULK_AUTHORS = 20
+HTTP_METHODS = ('get', 'post', 'put', 'patch', 'delete')
+
+TITLES_URL = '/api/v1/titles/'
+TITLE_URL = '/api/v1/titles/{title}/'
+REVIEWS_URL = '/api/v1/titles/{title}/reviews/'
+REVIEW_URL = '/api/v1/titles/{title}/reviews/{review}/'
+COMMENTS_URL = '/api/v1/titles/{title}/reviews/{review}/comments/'
+COMMENT_URL = '/api/v1/titles/{title}/reviews/{review}/comments/{comment}/'
+
+
+def new_title(n, ids, name='Замер'):
+    return {'name': f'{name} {n}', 'year': 2000, 'genre': ['genre-1'],
+            'category': 'category-1'}
+
+
+def deep_page():
+    """Последняя страница засеянных произведений."""
+    return max(1, -(-TITLES // settings.REST_FRAMEWORK['PAGE_SIZE']))
+
+
+# Эндпойнт -> (метод, адрес, тело запроса, клиент, ожидаемый статус).
+# Адрес и тело получают номер запроса n и словарь ids набора данных,
+# поэтому записи, создаваемые в цикле, не повторяются, а удаляемые
+# записи (doomed) заготовлены в наборе данных по одной на запрос.
+SCENARIOS = {
+    'auth_signup': ('post', lambda n, ids: '/api/v1/auth/signup/',
+                    lambda n, ids: {'username': f'bench_{n}',
+                                    'email': f'bench_{n}@yamdb.fake'},
+                    'anon', 200),
+    'auth_token': ('post', lambda n, ids: '/api/v1/auth/token/',
+                   lambda n, ids: {'username': ids['username'],
+                                   'confirmation_code': ids['code']},
+                   'anon', 200),
+    'users_list': ('get', lambda n, ids: '/api/v1/users/', None,
+                   'admin', 200),
+    'users_detail': ('get', lambda n, ids: f'/api/v1/users/{ids["username"]}/',
+                     None, 'admin', 200),
+    'users_create': ('post', lambda n, ids: '/api/v1/users/',
+                     lambda n, ids: {'username': f'plan_user_new_{n}',
+                                     'email': f'plan_user_new_{n}@yamdb.fake'},
+                     'admin', 201),
+    'users_update': ('patch',
+                     lambda n, ids: f'/api/v1/users/{ids["username"]}/',
+                     lambda n, ids: {'bio': f'Замер {n}'}, 'admin', 200),
+    'users_replace': ('put',
+                      lambda n, ids: f'/api/v1/users/{ids["username"]}/',
+                      lambda n, ids: {'username': ids['username'],
+                                      'email': f'{ids["username"]}@yamdb.fake',
+                                      'bio': f'Замер {n}'},
+                      'admin', 200),
+    'users_delete': ('delete',
+                     lambda n, ids: f'/api/v1/users/plan_user_doomed_{n}/',
+                     None, 'admin', 204),
+    'users_me': ('get', lambda n, ids: '/api/v1/users/me/', None,
+                 'user', 200),
+    'users_me_update': ('patch', lambda n, ids: '/api/v1/users/me/',
+                        lambda n, ids: {'bio': f'Замер {n}'}, 'user', 200),
+    'users_me_feed': ('get', lambda n, ids: '/api/v1/users/me/feed/', None,
+                      'user', 200),
+    'categories_list': ('get', lambda n, ids: '/api/v1/categories/', None,
+                        'anon', 200),
+    'categories_create': ('post', lambda n, ids: '/api/v1/categories/',
+                          lambda n, ids: {'name': f'Замер {n}',
+                                          'slug': f'bench-{n}'},
+                          'admin', 201),
+    'categories_delete': ('delete',
+                          lambda n, ids: f'/api/v1/categories/doomed-{n}/',
+                          None, 'admin', 204),
+    'genres_list': ('get', lambda n, ids: '/api/v1/genres/?search=Жанр',
+                    None, 'anon', 200),
+    'genres_create': ('post', lambda n, ids: '/api/v1/genres/',
+                      lambda n, ids: {'name': f'Замер {n}',
+                                      'slug': f'bench-{n}'},
+                      'admin', 201),
+    'genres_delete': ('delete', lambda n, ids: f'/api/v1/genres/doomed-{n}/',
+                      None, 'admin', 204),
+    'titles_list': ('get', lambda n, ids: TITLES_URL, None, 'anon', 200),
+    'titles_deep_page': ('get',
+                         lambda n, ids: f'{TITLES_URL}?page={deep_page()}',
+                         None, 'anon', 200),
+    'titles_cursor': ('get', lambda n, ids: f'{TITLES_URL}?cursor=', None,
+                      'anon', 200),
+    'titles_by_genre': ('get', lambda n, ids: f'{TITLES_URL}?genre=genre-3',
+                        None, 'anon', 200),
+    'titles_by_category_year': (
+        'get', lambda n, ids: f'{TITLES_URL}?category=category-2&year=1950',
+        None, 'anon', 200),
+    'titles_search': ('get', lambda n, ids: f'{TITLES_URL}?search=Описание',
+                      None, 'anon', 200),
+    'titles_sparse': ('get',
+                      lambda n, ids: f'{TITLES_URL}?fields=id,name,rating',
+                      None, 'anon', 200),
+    'titles_detail': ('get', lambda n, ids: TITLE_URL.format(**ids), None,
+                      'anon', 200),
+    'titles_similar': ('get',
+                       lambda n, ids: TITLE_URL.format(**ids) + 'similar/',
+                       None, 'anon', 200),
+    'titles_create': ('post', lambda n, ids: TITLES_URL, new_title,
+                      'admin', 201),
+    'titles_update': ('patch', lambda n, ids: TITLE_URL.format(**ids),
+                      lambda n, ids: {'description': f'Описание {n}'},
+                      'admin', 200),
+    'titles_replace': ('put', lambda n, ids: TITLE_URL.format(**ids),
+                       lambda n, ids: new_title(n, ids, 'Замена'),
+                       'admin', 200),
+    'titles_delete': ('delete',
+                      lambda n, ids: TITLE_URL.format(
+                          title=ids['doomed']['titles'][n]),
+                      None, 'admin', 204),
+    'titles_bulk': ('post', lambda n, ids: f'{TITLES_URL}bulk/',
+                    lambda n, ids: [new_title(f'{n}-{i}', ids)
+                                    for i in range(20)],
+                    'admin', 201),
+    'reviews_list': ('get', lambda n, ids: REVIEWS_URL.format(**ids), None,
+                     'anon', 200),
+    'reviews_cursor': ('get',
+                       lambda n, ids: REVIEWS_URL.format(**ids) + '?cursor=',
+                       None, 'anon', 200),
+    'reviews_detail': ('get', lambda n, ids: REVIEW_URL.format(**ids), None,
+                       'anon', 200),
+    'reviews_create': ('post',
+                       lambda n, ids: REVIEWS_URL.format(
+                           title=ids['titles'][n], review=None),
+                       lambda n, ids: {'text': 'Отзыв', 'score': n % 10 + 1},
+                       'admin', 201),
+    'reviews_bulk': ('post',
+                     lambda n, ids: REVIEWS_URL.format(
+                         title=ids['titles'][n], review=None) + 'bulk/',
+                     lambda n, ids: [
+                         {'author': f'plan_user_bulk_{i}', 'text': 'Отзыв',
+                          'score': (n + i) % 10 + 1}
+                         for i in range(BULK_AUTHORS)],
+                     'admin', 201),
+    'reviews_update': ('patch', lambda n, ids: REVIEW_URL.format(**ids),
+                       lambda n, ids: {'score': n % 10 + 1}, 'admin', 200),
+    'reviews_replace': ('put', lambda n, ids: REVIEW_URL.format(**ids),
+                        lambda n, ids: {'text': f'Отзыв {n}',
+                                        'score': n % 10 + 1},
+                        'admin', 200),
+    'reviews_delete': ('delete',
+                       lambda n, ids: REVIEW_URL.format(
+                           **ids['doomed']['reviews'][n]),
+                       None, 'admin', 204),
+    'comments_list': ('get', lambda n, ids: COMMENTS_URL.format(**ids),
+                      None, 'anon', 200),
+    'comments_cursor': ('get',
+                        lambda n, ids: COMMENTS_URL.format(**ids)
+                        + '?cursor=', None, 'anon', 200),
+    'comments_detail': ('get', lambda n, ids: COMMENT_URL.format(**ids),
+                        None, 'anon', 200),
+    'comments_create': ('post', lambda n, ids: COMMENTS_URL.format(**ids),
+                        lambda n, ids: {'text': f'Комментарий {n}'},
+                        'user', 201),
+    'comments_update': ('patch', lambda n, ids: COMMENT_URL.format(**ids),
+                        lambda n, ids: {'text': f'Комментарий {n}'},
+                        'admin', 200),
+    'comments_replace': ('put', lambda n, ids: COMMENT_URL.format(**ids),
+                         lambda n, ids: {'text': f'Комментарий {n}'},
+                         'admin', 200),
+    'comments_delete': ('delete',
+                        lambda n, ids: COMMENT_URL.format(
+                            title=ids['title'], review=ids['review'],
+                            comment=ids['doomed']['comments'][n]),
+                        None, 'admin', 204),
+    'export_titles': ('get', lambda n, ids: '/api/v1/export/titles/', None,
+                      'admin', 200),
+    'export_reviews': ('get', lambda n, ids: '/api/v1/export/reviews/', None,
+                       'admin', 200),
+    'export_comments': ('get', lambda n, ids: '/api/v1/export/comments/',
+                        None, 'admin', 200),
+    'debug_performance': ('get', lambda n, ids: '/api/v1/debug/performance/',
+                          None, 'admin', 200),
+    'api_root': ('get', lambda n, ids: '/api/v1/', None, 'admin', 200),
+}
+
+
+def percentile(ordered, share):
+    index = max(0, min(len(ordered) - 1,
+                       int(round(share * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def doomed_rows(admin, hot_review):
+    """Записи для сценариев удаления и авторы пакетного импорта отзывов:
+    по одной удаляемой записи на запрос."""
+    from django.contrib.auth import get_user_model
+    from reviews.aggregates import rebuild_comment_counts, rebuild_ratings
+    from reviews.models import Categories, Comments, Genres, Review, Title
+
+    User = get_user_model()
+    Categories.objects.bulk_create(
+        Categories(name=f'Удаляемая {n}', slug=f'doomed-{n}')
+        for n in range(REQUESTS))
+    Genres.objects.bulk_create(
+        Genres(name=f'Удаляемый {n}', slug=f'doomed-{n}')
+        for n in range(REQUESTS))
+    User.objects.bulk_create(
+        [User(username=f'plan_user_doomed_{n}',
+              email=f'plan_user_doomed_{n}@yamdb.fake')
+         for n in range(REQUESTS)]
+        + [User(username=f'plan_user_bulk_{i}',
+                email=f'plan_user_bulk_{i}@yamdb.fake')
+           for i in range(BULK_AUTHORS)])
+    category = Categories.objects.get(slug='category-0')
+    Title.objects.bulk_create(
+        Title(name=f'Удаляемое {n}', year=2000, category=category)
+        for n in range(2 * REQUESTS))
+    titles = list(Title.objects.filter(
+        name__startswith='Удаляемое ').order_by('id').values_list(
+        'id', flat=True))
+    # Отзывы удаляются с отдельных произведений, а комментарии — с
+    # «горячего» отзыва, чтобы удаление отзывов не задело комментарии.
+    Review.objects.bulk_create(
+        Review(title_id=title, author=admin, text='Отзыв', score=5)
+        for title in titles[REQUESTS:])
+    Comments.objects.bulk_create(
+        Comments(review_id_id=hot_review, author=admin, text='Коммент')
+        for _ in range(REQUESTS))
+    rebuild_ratings()
+    rebuild_comment_counts()
+    return {
+        'titles': titles[:REQUESTS],
+        'reviews': [{'title': title, 'review': review}
+                    for title, review in Review.objects.filter(
+                        author=admin, title_id__in=titles).order_by(
+                        'id').values_list('title_id', 'id')],
+        'comments': list(Comments.objects.filter(
+            review_id_id=hot_review, author=admin).order_by(
+            'id').values_list('id', flat=True)),
+    }
+
+
+@pytest.fixture(scope='module')
+def dataset(django_db_setup, django_db_blocker):
+    from django.contrib.auth import get_user_model
+    from reviews.models import Comments, Title
+
+    User = get_user_model()
+    with django_db_blocker.unblock():
+        ids = seed(TITLES)
+        admin = User.objects.create(username='plan_user_admin',
+                                    email='plan_user_admin@yamdb.fake',
+                                    role='admin')
+        user = User.objects.get(username='plan_user_0')
+        ids.update(
+            comment=Comments.objects.filter(
+                review_id=ids['review']).order_by('id')[0].id,
+            titles=list(Title.objects.order_by('-id').values_list(
+                'id', flat=True)[:REQUESTS + 1]),
+            username=user.username,
+            code=default_token_generator.make_token(user),
+            tokens={'admin': str(AccessToken.for_user(admin)),
+                    'user': str(AccessToken.for_user(user))},
+        )
+        ids['doomed'] = doomed_rows(admin, ids['review'])
+        yield ids
+        unseed()
+
+
+@pytest.fixture(scope='module')
+def report():
+    results = {}
+    yield results
+    baseline = {}
+    if BASELINE and os.path.exists(BASELINE):
+        with open(BASELINE, encoding='utf8') as file:
+            baseline = json.load(file)['endpoints']
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous:
+            result['p95_vs_baseline'] = round(
+                result['p95_ms'] / previous['p95_ms'], 2)
+    with open(OUTPUT, 'w', encoding='utf8') as file:
+        json.dump({
+            'meta': {'revision': git_revision(), 'vendor': connection.vendor,
+                     'titles': TITLES, 'requests': REQUESTS},
+            'endpoints': results,
+        }, file, ensure_ascii=False, indent=2)
+    print(f'\nРезультаты сохранены в {OUTPUT}')
+    for name, result in results.items():
+        print(f'{name:28} {result["rps"]:8.1f} зап/с  '
+              f'p50 {result["p50_ms"]:7.2f}  p95 {result["p95_ms"]:7.2f}  '
+              f'p99 {result["p99_ms"]:7.2f} мс  '
+              f'SQL {result["queries"]}')
+
+
+def make_client(kind, ids):
+    client = APIClient()
+    if kind != 'anon':
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {ids["tokens"][kind]}')
+    return client
+
+
+def api_routes(patterns=None, prefix=''):
+    """Пары (метод, маршрут) API; у выгрузки маршрут дополняется видом."""
+    for pattern in patterns or get_resolver().url_patterns:
+        # Как и resolve(), без «^» у вложенных регулярных выражений.
+        route = prefix + str(pattern.pattern).lstrip('^')
+        if isinstance(pattern, URLResolver):
+            yield from api_routes(pattern.url_patterns, route)
+            continue
+        # Маршруты с суффиксом формата дублируют основные.
+        if not route.startswith('api/') or '(?P<format>' in route:
+            continue
+        callback = pattern.callback
+        # DRF дописывает в actions «head» после первого запроса.
+        actions = getattr(callback, 'actions', None) or vars(callback.cls)
+        for method in (method for method in HTTP_METHODS
+                       if method in actions):
+            if '<str:kind>' in route:
+                for kind in EXPORTS:
+                    yield method, f'{route}:{kind}'
+            else:
+                yield method, route
+
+
+def scenario_route(method, url):
+    match = resolve(urlsplit(url).path)
+    if 'kind' in match.kwargs:
+        return method, f'{match.route}:{match.kwargs["kind"]}'
+    return method, match.route
+
+
+def test_scenarios_cover_routes():
+    ids = {'title': 1, 'review': 2, 'comment': 3, 'titles': [4],
+           'username': 'plan_user_0',
+           'doomed': {'titles': [5], 'reviews': [{'title': 6, 'review': 7}],
+                      'comments': [8]}}
+    covered = {scenario_route(method, url(0, ids))
+               for method, url, *_ in SCENARIOS.values()}
+    missing = sorted(set(api_routes()) - covered)
+    assert not missing, (
+        f'Добавьте в SCENARIOS сценарии для маршрутов API: {missing}'
+    )
+
+
+@benchmark
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', SCENARIOS)
+def test_endpoint(dataset, report, name):
+    method, url, body, kind, expected = SCENARIOS[name]
+    client = make_client(kind, dataset)
+    latencies = []
+    queries = []
+    started = time.perf_counter()
+    for n in range(REQUESTS):
+        data = body(n, dataset) if body else None
+        with CaptureQueriesContext(connection) as context:
+            request_started = time.perf_counter()
+            response = getattr(client, method)(url(n, dataset), data,
+                                               format='json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+            latencies.append(time.perf_counter() - request_started)
+        queries.append(len(context.captured_queries))
+        assert response.status_code == expected, (
+            f'{name}: {response.status_code} {response.content[:200]}'
+        )
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    report[name] = {
+        'rps': round(REQUESTS / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'queries': max(queries),
+    }
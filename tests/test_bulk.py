@@ -0,0 +1,128 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import GenreTitle, Review, Title
+
+TITLES_URL = '/api/v1/titles/bulk/'
+
+
+def title_item(number, **fields):
+    item = {'name': f'Новое произведение {number}', 'year': 2000,
+            'description': 'Описание', 'genre': ['drama', 'comedy'],
+            'category': 'movie'}
+    item.update(fields)
+    return item
+
+
+@pytest.mark.django_db
+class TestTitlesBulk:
+
+    def test_only_admin(self, user_client, anon_client, catalogue):
+        assert anon_client.post(TITLES_URL, [title_item(1)],
+                                format='json').status_code == 401
+        assert user_client.post(TITLES_URL, [title_item(1)],
+                                format='json').status_code == 403
+
+    def test_all_created(self, admin_client, catalogue):
+        items = [title_item(number) for number in range(50)]
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(TITLES_URL, items, format='json')
+        assert response.status_code == 201
+        results = response.json()
+        assert [result['status'] for result in results] == [201] * 50
+        created = Title.objects.get(pk=results[7]['data']['id'])
+        assert created.name == 'Новое произведение 7'
+        assert sorted(created.genre.values_list('slug', flat=True)) == [
+            'comedy', 'drama']
+        assert GenreTitle.objects.filter(
+            title_id__name__startswith='Новое').count() == 100
+        assert len(context.captured_queries) < 15, (
+            'Проверьте, что число запросов не зависит от размера пакета'
+        )
+
+    def test_partial_success(self, admin_client, catalogue):
+        existing = catalogue[0]
+        items = [
+            title_item(1),
+            title_item(2, category='unknown'),
+            title_item(3, genre=['drama', 'unknown']),
+            title_item(4, year=3000),
+            {'name': existing.name, 'year': existing.year,
+             'genre': ['drama'], 'category': existing.category.slug},
+            title_item(1),
+        ]
+        response = admin_client.post(TITLES_URL, items, format='json')
+        assert response.status_code == 207
+        results = response.json()
+        assert [result['status'] for result in results] == [
+            201, 400, 400, 400, 400, 400]
+        assert 'category' in results[1]['errors']
+        assert 'genre' in results[2]['errors']
+        assert 'year' in results[3]['errors']
+        assert results[4]['errors'] == {
+            'non_field_errors': ['Произведение уже существует!']}
+        assert results[5]['errors'] == results[4]['errors'], (
+            'Проверьте, что повтор внутри пакета тоже отклоняется'
+        )
+        assert Title.objects.filter(name='Новое произведение 1').count() == 1
+
+    def test_nothing_created(self, admin_client, catalogue):
+        response = admin_client.post(
+            TITLES_URL, [title_item(1, category='unknown')], format='json')
+        assert response.status_code == 400
+
+    def test_not_a_list(self, admin_client, catalogue, settings):
+        response = admin_client.post(TITLES_URL, title_item(1), format='json')
+        assert response.status_code == 400
+        settings.BULK_MAX_ITEMS = 2
+        response = admin_client.post(
+            TITLES_URL, [title_item(number) for number in range(3)],
+            format='json')
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestReviewsBulk:
+
+    def url(self, title):
+        return f'/api/v1/titles/{title.id}/reviews/bulk/'
+
+    def test_only_admin(self, user, user_client, catalogue):
+        response = user_client.post(
+            self.url(catalogue[0]),
+            [{'author': user.username, 'text': 'Отзыв', 'score': 5}],
+            format='json')
+        assert response.status_code == 403
+
+    def test_import_updates_rating(self, admin_client, user, another_user,
+                                   admin, catalogue):
+        title = catalogue[0]
+        Review.objects.create(title=title, author=admin, text='Отзыв',
+                              score=10)
+        items = [
+            {'author': user.username, 'text': 'Отзыв', 'score': 4},
+            {'author': another_user.username, 'text': 'Отзыв', 'score': 7},
+            {'author': admin.username, 'text': 'Повтор', 'score': 1},
+            {'author': 'nobody', 'text': 'Отзыв', 'score': 1},
+            {'author': user.username, 'text': 'Без оценки'},
+        ]
+        response = admin_client.post(self.url(title), items, format='json')
+        assert response.status_code == 207
+        results = response.json()
+        assert [result['status'] for result in results] == [
+            201, 201, 400, 400, 400]
+        assert results[0]['data']['author'] == user.username
+        assert Review.objects.filter(
+            pk=results[1]['data']['id'], author=another_user).exists()
+        title.refresh_from_db()
+        assert title.rating_count == 3
+        assert title.rating == pytest.approx(7), (
+            'Проверьте, что пакетный импорт обновляет рейтинг произведения'
+        )
+
+    def test_missing_title_404(self, admin_client, user, catalogue):
+        response = admin_client.post(
+            '/api/v1/titles/999/reviews/bulk/',
+            [{'author': user.username, 'text': 'Отзыв', 'score': 4}],
+            format='json')
+        assert response.status_code == 404
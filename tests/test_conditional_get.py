@@ -0,0 +1,89 @@
+import pytest
+from reviews.models import Comments, Review
+
+
+@pytest.fixture
+def discussion(catalogue, user):
+    title = catalogue[0]
+    review = Review.objects.create(title=title, author=user, text='Отзыв',
+                                   score=8)
+    Comments.objects.create(review_id=review, author=user,
+                            text='Комментарий')
+    return title, review
+
+
+def urls(title, review):
+    return {
+        'title': f'/api/v1/titles/{title.id}/',
+        'reviews': f'/api/v1/titles/{title.id}/reviews/',
+        'review': f'/api/v1/titles/{title.id}/reviews/{review.id}/',
+        'comments': f'/api/v1/titles/{title.id}/reviews/{review.id}/'
+                    'comments/',
+    }
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    @pytest.mark.parametrize('name', ['title', 'reviews', 'review',
+                                      'comments'])
+    def test_not_modified_with_one_query(self, anon_client, discussion,
+                                         name, django_assert_num_queries):
+        url = urls(*discussion)[name]
+        response = anon_client.get(url)
+        assert response.status_code == 200
+        assert response['ETag'].startswith('W/"')
+        assert 'Last-Modified' in response
+        with django_assert_num_queries(1):
+            response = anon_client.get(url,
+                                       HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == 304, (
+            'Проверьте, что на If-None-Match отвечает 304 без списка'
+        )
+
+    def test_if_modified_since(self, anon_client, discussion):
+        url = urls(*discussion)['reviews']
+        last_modified = anon_client.get(url)['Last-Modified']
+        response = anon_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 304
+
+    def test_title_retrieve_without_extra_query(
+            self, anon_client, discussion, django_assert_num_queries):
+        title, _ = discussion
+        with django_assert_num_queries(1):
+            response = anon_client.get(f'/api/v1/titles/{title.id}/'
+                                       '?fields=name')
+        assert response['ETag']
+
+    @pytest.mark.parametrize('change', ['review', 'comment', 'new_comment',
+                                        'delete_comment', 'title'])
+    def test_changes_bump_validator(self, anon_client, user_client,
+                                    admin_client, discussion, change):
+        title, review = discussion
+        url_map = urls(title, review)
+        etags = {name: anon_client.get(url)['ETag']
+                 for name, url in url_map.items()}
+        comment = Comments.objects.get(review_id=review)
+        comment_url = f'{url_map["comments"]}{comment.id}/'
+        if change == 'review':
+            user_client.patch(url_map['review'], {'text': 'Новый текст'})
+        elif change == 'comment':
+            user_client.patch(comment_url, {'text': 'Новый текст'})
+        elif change == 'new_comment':
+            user_client.post(url_map['comments'], {'text': 'Ещё'})
+        elif change == 'delete_comment':
+            user_client.delete(comment_url)
+        else:
+            admin_client.patch(url_map['title'], {'description': 'Новое'})
+        for name, url in url_map.items():
+            response = anon_client.get(url, HTTP_IF_NONE_MATCH=etags[name])
+            assert response.status_code == 200, (
+                f'Проверьте, что изменение ({change}) сбрасывает ETag {name}'
+            )
+
+    def test_etag_depends_on_query(self, anon_client, discussion):
+        url = urls(*discussion)['title']
+        etag = anon_client.get(url)['ETag']
+        response = anon_client.get(f'{url}?fields=name',
+                                   HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
@@ -0,0 +1,59 @@
+import pytest
+from django.core.management import call_command
+from reviews.models import Comments, Review, Title
+
+
+@pytest.fixture
+def review(catalogue, user, another_user):
+    review = Review.objects.create(title=catalogue[0], author=user,
+                                   text='Отзыв', score=8)
+    Review.objects.create(title=catalogue[0], author=another_user,
+                          text='Отзыв', score=4)
+    return review
+
+
+@pytest.mark.django_db
+class TestCounters:
+
+    @pytest.mark.parametrize('fast', [True, False])
+    def test_reviews_count(self, anon_client, settings, catalogue, review,
+                           fast):
+        settings.FAST_LIST_RESPONSES = fast
+        title = anon_client.get('/api/v1/titles/').json()['results'][0]
+        assert title['reviews_count'] == 2
+        assert anon_client.get(f'/api/v1/titles/{catalogue[1].id}/').json()[
+            'reviews_count'] == 0
+
+    @pytest.mark.parametrize('fast', [True, False])
+    def test_comments_count(self, user_client, anon_client, settings,
+                            review, fast):
+        settings.FAST_LIST_RESPONSES = fast
+        url = f'/api/v1/titles/{review.title_id}/reviews/{review.id}/'
+        for number in range(3):
+            response = user_client.post(f'{url}comments/',
+                                        {'text': f'Комментарий {number}'})
+            assert response.status_code == 201
+        comment_id = response.json()['id']
+        user_client.delete(f'{url}comments/{comment_id}/')
+        assert anon_client.get(url).json()['comments_count'] == 2
+        counts = {row['id']: row['comments_count'] for row in anon_client.get(
+            f'/api/v1/titles/{review.title_id}/reviews/').json()['results']}
+        assert counts[review.id] == 2, (
+            'Проверьте, что число комментариев есть в списке отзывов'
+        )
+
+    def test_counter_read_only(self, user_client, review):
+        response = user_client.patch(
+            f'/api/v1/titles/{review.title_id}/reviews/{review.id}/',
+            {'comments_count': 100})
+        assert response.status_code == 200
+        assert response.json()['comments_count'] == 0
+
+    def test_rebuild_counters(self, review, user):
+        Comments.objects.create(review_id=review, author=user, text='Текст')
+        Review.objects.update(comments_count=7)
+        Title.objects.update(rating_count=9)
+        call_command('rebuild_counters')
+        review.refresh_from_db()
+        assert review.comments_count == 1
+        assert Title.objects.get(pk=review.title_id).rating_count == 2
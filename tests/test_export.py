@@ -0,0 +1,80 @@
+import gzip
+import json
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Comments, Review
+
+
+@pytest.fixture
+def corpus(catalogue, user, another_user):
+    reviews = [
+        Review.objects.create(title=title, author=author, text='Отзыв',
+                              score=7)
+        for title in catalogue[:3] for author in (user, another_user)
+    ]
+    for review in reviews:
+        Comments.objects.create(review_id=review, author=user,
+                                text='Комментарий')
+    return reviews
+
+
+def read_ndjson(content):
+    return [json.loads(line)
+            for line in gzip.decompress(content).decode().splitlines()]
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    def test_only_admin(self, user_client, anon_client, corpus):
+        assert anon_client.get('/api/v1/export/titles/').status_code == 401
+        assert user_client.get('/api/v1/export/titles/').status_code == 403
+
+    def test_unknown_kind_404(self, admin_client, corpus):
+        assert admin_client.get('/api/v1/export/users/').status_code == 404
+
+    def test_titles_stream(self, admin_client, corpus, monkeypatch):
+        from api_yamdb import settings
+
+        monkeypatch.setattr(settings, 'EXPORT_CHUNK_SIZE', 5)
+        response = admin_client.get('/api/v1/export/titles/')
+        assert response.status_code == 200
+        assert response.streaming
+        assert response['Content-Type'] == 'application/gzip'
+        with CaptureQueriesContext(connection) as context:
+            content = b''.join(response.streaming_content)
+        genre_queries = [query for query in context.captured_queries
+                         if 'reviews_genretitle' in query['sql']]
+        assert len(genre_queries) == 3, (
+            'Проверьте, что жанры читаются одним запросом на порцию'
+        )
+        rows = read_ndjson(content)
+        assert len(rows) == 12
+        assert rows[0] == admin_client.get(
+            f'/api/v1/titles/{rows[0]["id"]}/').json(), (
+            'Проверьте, что строка выгрузки совпадает с ответом API'
+        )
+
+    def test_reviews_and_comments(self, admin_client, corpus):
+        reviews = read_ndjson(b''.join(
+            admin_client.get('/api/v1/export/reviews/').streaming_content))
+        assert len(reviews) == 6
+        assert set(reviews[0]) == {'id', 'title', 'text', 'author', 'score',
+                                   'pub_date', 'comments_count'}
+        assert reviews[0]['comments_count'] == 1
+        assert reviews[0]['title'] == corpus[0].title_id
+        comments = read_ndjson(b''.join(
+            admin_client.get('/api/v1/export/comments/').streaming_content))
+        assert len(comments) == 6
+        assert comments[0]['review'] == corpus[0].id
+
+    def test_command(self, corpus, tmp_path):
+        call_command('export_data', '--output-dir', str(tmp_path),
+                     '--chunk-size', '4')
+        for kind, count in (('titles', 12), ('reviews', 6),
+                            ('comments', 6)):
+            content = (tmp_path / f'{kind}.ndjson.gz').read_bytes()
+            assert len(read_ndjson(content)) == count
@@ -0,0 +1,87 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+FACETS = 'facets=category,genre,year'
+
+
+def facets(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.content
+    return response.json()['facets']
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        assert client.get(url).status_code == 200
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestFacets:
+
+    def test_unfiltered(self, anon_client, catalogue):
+        assert facets(anon_client, f'/api/v1/titles/?{FACETS}') == {
+            'category': [{'slug': 'book', 'count': 6},
+                         {'slug': 'movie', 'count': 6}],
+            'genre': [{'slug': 'comedy', 'count': 4},
+                      {'slug': 'drama', 'count': 12}],
+            'year': [{'decade': 1990, 'count': 10},
+                     {'decade': 2000, 'count': 2}],
+        }
+
+    def test_current_filters(self, anon_client, catalogue):
+        result = facets(anon_client,
+                        f'/api/v1/titles/?genre=comedy&{FACETS}')
+        assert result['category'] == [{'slug': 'book', 'count': 2},
+                                      {'slug': 'movie', 'count': 2}], (
+            'Проверьте, что фасеты считаются по фильтрам списка'
+        )
+        assert result['genre'] == [{'slug': 'comedy', 'count': 4},
+                                   {'slug': 'drama', 'count': 4}]
+        assert result['year'] == [{'decade': 1990, 'count': 4}]
+
+    def test_selected_facets_only(self, anon_client, catalogue):
+        response = anon_client.get('/api/v1/titles/')
+        assert 'facets' not in response.json()
+        result = facets(anon_client, f'/api/v1/titles/?page=2&{FACETS}')
+        assert result['category'][0]['count'] == 6, (
+            'Проверьте, что фасеты считаются по всему списку, а не по '
+            'странице'
+        )
+        result = facets(anon_client, '/api/v1/titles/?facets=year&search='
+                                     'Произведение&cursor=')
+        assert list(result) == ['year']
+
+    def test_unknown_facet(self, anon_client, catalogue):
+        response = anon_client.get('/api/v1/titles/?facets=genre,rating')
+        assert response.status_code == 400
+        assert 'rating' in response.json()['facets'][0]
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/titles/?genre=drama,comedy&genre_mode=and',
+        '/api/v1/titles/?genre=comedy&category=movie',
+        '/api/v1/titles/?genre=drama&year=1995',
+    ])
+    @pytest.mark.parametrize('fast', [True, False])
+    def test_bitmaps_match_sql(self, anon_client, settings, catalogue, url,
+                               fast):
+        settings.FAST_LIST_RESPONSES = fast
+        settings.TITLE_BITMAPS = False
+        expected = facets(anon_client, f'{url}&{FACETS}')
+        settings.TITLE_BITMAPS = True
+        assert facets(anon_client, f'{url}&{FACETS}') == expected
+
+    @pytest.mark.parametrize('url, extra', [
+        ('/api/v1/titles/?year=1995', 3),
+        ('/api/v1/titles/?genre=comedy', 1),
+    ])
+    def test_one_query_per_facet(self, anon_client, settings, catalogue, url,
+                                 extra):
+        settings.TITLE_BITMAPS = True
+        anon_client.get(url)
+        plain = count_queries(anon_client, url)
+        assert count_queries(anon_client, f'{url}&{FACETS}') == plain + extra, (
+            'Проверьте, что каждый фасет считается одним запросом, а '
+            'категории и жанры по битовым картам — без запросов'
+        )
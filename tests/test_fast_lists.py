@@ -0,0 +1,104 @@
+import pytest
+from reviews.models import Comments, Review, Title
+
+TEXT = 'Отзыв "в кавычках" \\ с\tтабуляцией\x01, \u2028 и \u2029 😀'
+
+
+@pytest.fixture
+def discussion(catalogue, user, another_user, admin):
+    title = catalogue[0]
+    Title.objects.filter(pk=catalogue[1].pk).update(category=None)
+    reviews = [
+        Review.objects.create(title=title, author=author, text=TEXT,
+                              score=score)
+        for author, score in ((user, 10), (another_user, 5), (admin, 6))
+    ]
+    for number in range(15):
+        Comments.objects.create(review_id=reviews[0], author=user,
+                                text=f'{TEXT} {number}')
+    return title, reviews[0]
+
+
+def both_paths(client, settings, url):
+    settings.FAST_LIST_RESPONSES = False
+    expected = client.get(url)
+    settings.FAST_LIST_RESPONSES = True
+    actual = client.get(url)
+    assert expected.status_code == actual.status_code == 200
+    return expected.content, actual.content
+
+
+@pytest.mark.django_db
+class TestFastLists:
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/titles/',
+        '/api/v1/titles/?page=2',
+        '/api/v1/titles/?genre=comedy',
+        '/api/v1/titles/?search=Произведение',
+        '/api/v1/titles/?cursor=',
+        '/api/v1/titles/{title}/reviews/',
+        '/api/v1/titles/{title}/reviews/?cursor=',
+        '/api/v1/titles/{title}/reviews/{review}/comments/',
+        '/api/v1/titles/{title}/reviews/{review}/comments/?limit=4&offset=3',
+        '/api/v1/titles/{title}/reviews/{review}/comments/?cursor=',
+    ])
+    def test_byte_identical(self, anon_client, settings, discussion, url):
+        title, review = discussion
+        url = url.format(title=title.id, review=review.id)
+        expected, actual = both_paths(anon_client, settings, url)
+        assert actual == expected, (
+            f'Проверьте, что быстрый список {url} совпадает с ответом '
+            'сериализатора байт в байт'
+        )
+
+    def test_next_cursor_page_identical(self, anon_client, settings,
+                                        discussion):
+        title, review = discussion
+        url = (f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+               '?cursor=')
+        next_url = anon_client.get(url).json()['next']
+        expected, actual = both_paths(anon_client, settings, next_url)
+        assert actual == expected
+
+    def test_escapes_line_separators(self, anon_client, discussion):
+        title, _ = discussion
+        content = anon_client.get(f'/api/v1/titles/{title.id}/reviews/'
+                                  ).content
+        assert b'\\u2028' in content and b'\\u2029' in content
+        assert '\u2028'.encode() not in content
+
+    def test_titles_query_count(self, anon_client, discussion,
+                                django_assert_num_queries):
+        with django_assert_num_queries(3):
+            anon_client.get('/api/v1/titles/')
+
+    def test_indent_uses_default_renderer(self, anon_client, discussion):
+        response = anon_client.get(
+            '/api/v1/titles/', HTTP_ACCEPT='application/json; indent=2')
+        assert response.content.startswith(b'{\n  "count"')
+
+    def test_no_serializer_on_fast_path(self, anon_client, discussion,
+                                        monkeypatch):
+        from api import serializers
+
+        def fail(*args, **kwargs):
+            raise AssertionError('Сериализатор не должен вызываться')
+
+        monkeypatch.setattr(serializers.ReviewSerializer, 'to_representation',
+                            fail)
+        title, _ = discussion
+        response = anon_client.get(f'/api/v1/titles/{title.id}/reviews/')
+        assert response.status_code == 200
+
+    def test_benchmark_command(self, discussion):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('benchmark_lists', '--requests', '1', '--warmup', '1',
+                     stdout=out)
+        lines = out.getvalue().splitlines()
+        assert len(lines) == 3
+        assert all('совпадает' in line for line in lines)
@@ -0,0 +1,213 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.feed import rebuild_feed
+from reviews.models import (Review, SimilarTitle, UserFeedScore,
+                            UserGenrePreference)
+
+FEED_URL = '/api/v1/users/me/feed/'
+
+
+@pytest.fixture
+def neighbours(catalogue):
+    for title, similar, score in ((0, 1, 0.9), (0, 3, 0.5), (2, 4, 0.8),
+                                  (5, 0, 0.6)):
+        SimilarTitle.objects.create(title=catalogue[title],
+                                    similar=catalogue[similar], score=score)
+    return catalogue
+
+
+def feed_state():
+    return (
+        sorted((user, genre, round(weight, 6), reviews)
+               for user, genre, weight, reviews
+               in UserGenrePreference.objects.values_list(
+                   'user_id', 'genre_id', 'weight', 'reviews')),
+        # Обнулённые оценки остаются до пересчёта и в ленту не попадают.
+        sorted((user, title, round(score, 6), bool(reviewed))
+               for user, title, score, reviewed
+               in UserFeedScore.objects.values_list(
+                   'user_id', 'title_id', 'score', 'reviewed')
+               if round(score, 6) or reviewed),
+    )
+
+
+def feed(client, url=FEED_URL):
+    response = client.get(url)
+    assert response.status_code == 200, response.content
+    return [item['id'] for item in response.json()]
+
+
+@pytest.mark.django_db
+class TestFeedTables:
+
+    def test_incremental_matches_rebuild(self, neighbours, user,
+                                         another_user):
+        titles = neighbours
+        review = Review.objects.create(title=titles[0], author=user,
+                                       text='Отзыв', score=10)
+        Review.objects.create(title=titles[2], author=user, text='Отзыв',
+                              score=3)
+        Review.objects.create(title=titles[5], author=another_user,
+                              text='Отзыв', score=7)
+        other = Review.objects.create(title=titles[1], author=another_user,
+                                      text='Отзыв', score=9)
+        review.score = 6
+        review.save()
+        other.title = titles[0]
+        other.save()
+        Review.objects.get(title=titles[2], author=user).delete()
+        incremental = feed_state()
+        rebuild_feed()
+        assert feed_state() == incremental, (
+            'Проверьте, что сигналы сдвигают ленту так же, как её '
+            'пересчитывает rebuild_feed'
+        )
+
+    def test_bulk_import(self, admin_client, neighbours, user, another_user):
+        Review.objects.create(title=neighbours[1], author=user, text='Отзыв',
+                              score=4)
+        response = admin_client.post(
+            f'/api/v1/titles/{neighbours[0].id}/reviews/bulk/',
+            [{'author': author.username, 'text': 'Отзыв', 'score': score}
+             for author, score in ((user, 9), (another_user, 2))],
+            format='json')
+        assert response.status_code == 201, response.content
+        incremental = feed_state()
+        rebuild_feed()
+        assert feed_state() == incremental, (
+            'Проверьте, что пакетная загрузка отзывов обновляет ленты'
+        )
+
+    def test_reviewed_title_leaves_feed(self, neighbours, user):
+        Review.objects.create(title=neighbours[0], author=user,
+                              text='Отзыв', score=10)
+        row = UserFeedScore.objects.get(user=user, title=neighbours[1])
+        assert not row.reviewed
+        review = Review.objects.create(title=neighbours[1], author=user,
+                                       text='Отзыв', score=8)
+        row.refresh_from_db()
+        assert row.reviewed
+        review.delete()
+        row.refresh_from_db()
+        assert not row.reviewed and round(row.score, 6) == 0.9, (
+            'Проверьте, что при удалении отзыва произведение возвращается '
+            'в ленту с накопленной оценкой'
+        )
+
+    def test_title_delete(self, neighbours, user, another_user):
+        Review.objects.create(title=neighbours[0], author=user, text='Отзыв',
+                              score=10)
+        Review.objects.create(title=neighbours[5], author=another_user,
+                              text='Отзыв', score=9)
+        Review.objects.create(title=neighbours[5], author=user, text='Отзыв',
+                              score=2)
+        neighbours[0].delete()
+        # Остаётся только драма оценки 2; комедия была лишь у удалённого.
+        assert list(UserGenrePreference.objects.filter(
+            user=user).values_list('genre__slug', 'reviews')) == [
+            ('drama', 1)], (
+            'Проверьте, что удаление произведения убирает его отзывы из '
+            'предпочтений жанров'
+        )
+        incremental = feed_state()
+        rebuild_feed()
+        assert feed_state() == incremental
+
+    def test_genre_change(self, admin_client, neighbours, user,
+                          another_user):
+        title = neighbours[1]
+        for author, score in ((user, 10), (another_user, 3)):
+            Review.objects.create(title=title, author=author, text='Отзыв',
+                                  score=score)
+        response = admin_client.patch(f'/api/v1/titles/{title.id}/',
+                                      {'genre': ['comedy']}, format='json')
+        assert response.status_code == 200, response.content
+        incremental = feed_state()
+        rebuild_feed()
+        assert feed_state() == incremental, (
+            'Проверьте, что смена жанров произведения переносит оценки в '
+            'предпочтениях пользователей'
+        )
+        title.genre.clear()
+        incremental = feed_state()
+        rebuild_feed()
+        assert feed_state() == incremental
+        assert not UserGenrePreference.objects.exists()
+
+    def test_user_delete(self, neighbours, user):
+        Review.objects.create(title=neighbours[0], author=user,
+                              text='Отзыв', score=10)
+        user.delete()
+        assert not UserFeedScore.objects.exists()
+        assert not UserGenrePreference.objects.exists()
+
+
+@pytest.mark.django_db
+class TestFeedEndpoint:
+
+    def test_ranking(self, user_client, another_user_client, neighbours):
+        titles = neighbours
+        user_client.post(f'/api/v1/titles/{titles[0].id}/reviews/',
+                         {'text': 'Отзыв', 'score': 10})
+        assert feed(user_client) == [titles[1].id, titles[3].id], (
+            'Проверьте, что лента ранжирует соседей оценённых произведений '
+            'с учётом любимых жанров'
+        )
+        another_user_client.post(f'/api/v1/titles/{titles[5].id}/reviews/',
+                                 {'text': 'Отзыв', 'score': 8})
+        user_client.post(f'/api/v1/titles/{titles[1].id}/reviews/',
+                         {'text': 'Отзыв', 'score': 9})
+        assert feed(user_client) == [titles[3].id, titles[5].id], (
+            'Проверьте, что оценённые произведения уходят из ленты, а '
+            'короткая лента дополняется лучшими по рейтингу'
+        )
+        assert feed(user_client, f'{FEED_URL}?limit=1') == [titles[3].id]
+
+    def test_cold_start(self, user_client, another_user, neighbours):
+        for index, score in ((2, 9), (4, 3)):
+            Review.objects.create(title=neighbours[index],
+                                  author=another_user, text='Отзыв',
+                                  score=score)
+        assert feed(user_client) == [neighbours[2].id, neighbours[4].id]
+
+    def test_no_review_reads(self, user_client, neighbours):
+        user_client.post(f'/api/v1/titles/{neighbours[0].id}/reviews/',
+                         {'text': 'Отзыв', 'score': 10})
+        with CaptureQueriesContext(connection) as context:
+            assert len(feed(user_client, f'{FEED_URL}?limit=2')) == 2
+        # Пользователь, жанры, кандидаты, их жанры, произведения и жанры
+        # произведений.
+        assert len(context.captured_queries) == 6
+        assert not [query for query in context.captured_queries
+                    if Review._meta.db_table in query['sql']], (
+            'Проверьте, что ранжирование ленты не читает отзывы'
+        )
+        with CaptureQueriesContext(connection) as context:
+            assert neighbours[0].id not in feed(user_client)
+        assert not [query for query in context.captured_queries
+                    if Review._meta.db_table in query['sql']], (
+            'Проверьте, что дополнение ленты популярными произведениями '
+            'не читает отзывы'
+        )
+
+    def test_deleted_review_returns_title(self, user_client, neighbours):
+        url = f'/api/v1/titles/{neighbours[0].id}/reviews/'
+        review_id = user_client.post(url, {'text': 'Отзыв',
+                                           'score': 10}).json()['id']
+        # Соседом произведения 0 оно остаётся для произведения 5.
+        user_client.post(f'/api/v1/titles/{neighbours[5].id}/reviews/',
+                         {'text': 'Отзыв', 'score': 9})
+        assert neighbours[0].id not in feed(user_client)
+        assert user_client.delete(f'{url}{review_id}/').status_code == 204
+        assert neighbours[0].id in feed(user_client), (
+            'Проверьте, что после удаления отзыва произведение снова '
+            'попадает в ленту'
+        )
+
+    def test_access_and_limit(self, anon_client, user_client, catalogue):
+        assert anon_client.get(FEED_URL).status_code == 401
+        for limit in ('0', '51', 'abc'):
+            response = user_client.get(f'{FEED_URL}?limit={limit}')
+            assert response.status_code == 400
+            assert 'limit' in response.json()
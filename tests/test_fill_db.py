@@ -0,0 +1,41 @@
+import csv
+import os
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import Avg
+from reviews.models import Comments, GenreTitle, Review, Title
+
+DATA_DIR = os.path.join(settings.BASE_DIR, 'static', 'data')
+
+
+def count_rows(file):
+    with open(os.path.join(DATA_DIR, file), encoding='utf8') as f:
+        return sum(1 for _ in csv.DictReader(f))
+
+
+@pytest.mark.django_db
+class TestBulkFillDb:
+
+    def test_bulk_fill_loads_all_rows(self):
+        out = StringIO()
+        call_command('fill_db', bulk=True, chunk_size=10,
+                     data_dir=DATA_DIR, stdout=out)
+        assert Title.objects.count() == count_rows('titles.csv')
+        assert GenreTitle.objects.count() == count_rows('genre_title.csv')
+        assert Review.objects.count() == count_rows('review.csv')
+        assert Comments.objects.count() == count_rows('comments.csv')
+        assert 'строк/с' in out.getvalue(), (
+            'Проверьте, что команда сообщает скорость загрузки таблиц'
+        )
+
+    def test_bulk_fill_is_idempotent_and_rebuilds_ratings(self):
+        call_command('fill_db', bulk=True, data_dir=DATA_DIR,
+                     stdout=StringIO())
+        call_command('fill_db', bulk=True, data_dir=DATA_DIR,
+                     stdout=StringIO())
+        assert Review.objects.count() == count_rows('review.csv')
+        for title in Title.objects.annotate(expected=Avg('review__score')):
+            assert title.rating == title.expected
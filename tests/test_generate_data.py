@@ -0,0 +1,85 @@
+import csv
+from datetime import timedelta
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db.models import Count, Max, Min, Sum
+from reviews.models import Comments, Review, Title
+
+SCALE = ('--titles', '60', '--users', '40', '--reviews', '600',
+         '--comments', '300', '--chunk-size', '7')
+
+
+def read(directory, file):
+    with open(directory / file, encoding='utf8') as f:
+        return list(csv.DictReader(f))
+
+
+class TestGenerateData:
+
+    def test_deterministic_across_workers(self, tmp_path):
+        for workers in ('1', '3'):
+            call_command('generate_data', *SCALE, '--workers', workers,
+                         '--output-dir', str(tmp_path / workers))
+        for file in ('users.csv', 'titles.csv', 'genre_title.csv',
+                     'review.csv', 'comments.csv'):
+            assert ((tmp_path / '1' / file).read_bytes()
+                    == (tmp_path / '3' / file).read_bytes()), (
+                f'Проверьте, что {file} не зависит от числа процессов'
+            )
+        call_command('generate_data', *SCALE, '--seed', '2',
+                     '--output-dir', str(tmp_path / 'other'))
+        assert (tmp_path / '1' / 'review.csv').read_bytes() != (
+            tmp_path / 'other' / 'review.csv').read_bytes()
+
+    def test_distributions(self, tmp_path):
+        call_command('generate_data', *SCALE, '--workers', '1',
+                     '--output-dir', str(tmp_path))
+        reviews = read(tmp_path, 'review.csv')
+        assert len(reviews) == 600
+        assert len(read(tmp_path, 'comments.csv')) == 300
+        pairs = {(row['title_id'], row['author']) for row in reviews}
+        assert len(pairs) == len(reviews), (
+            'Проверьте, что пара (произведение, автор) не повторяется'
+        )
+        per_title = sorted(
+            (sum(row['title_id'] == str(pk) for row in reviews)
+             for pk in range(1, 61)), reverse=True)
+        assert per_title[0] == 40, 'Самые популярные упираются в авторов'
+        assert per_title[-1] < 5
+        ids = [int(row['id']) for row in reviews]
+        assert ids == list(range(1, 601))
+
+    def test_too_many_reviews(self, tmp_path):
+        with pytest.raises(CommandError):
+            call_command('generate_data', '--titles', '2', '--users', '2',
+                         '--reviews', '5', '--output-dir', str(tmp_path))
+
+
+@pytest.mark.django_db
+class TestGenerateDataLoad:
+
+    def test_fill_db_loads_csv(self, tmp_path):
+        call_command('generate_data', *SCALE, '--workers', '1',
+                     '--output-dir', str(tmp_path))
+        call_command('fill_db', '--bulk', '--data-dir', str(tmp_path))
+        assert Title.objects.count() == 60
+        assert Review.objects.count() == 600
+        assert Comments.objects.count() == 300
+
+    def test_to_db(self, catalogue, user):
+        call_command('generate_data', *SCALE, '--workers', '1', '--to-db')
+        assert Title.objects.count() == len(catalogue) + 60
+        assert Review.objects.count() == 600
+        assert Comments.objects.count() == 300
+        assert Title.objects.aggregate(total=Sum('rating_count'))[
+            'total'] == 600, 'Проверьте, что рейтинги пересчитаны'
+        assert not Review.objects.values('title', 'author').annotate(
+            count=Count('id')).filter(count__gt=1).exists()
+        for model in (Review, Comments):
+            dates = model.objects.aggregate(first=Min('pub_date'),
+                                            last=Max('pub_date'))
+            assert dates['last'] - dates['first'] > timedelta(days=1), (
+                'Проверьте, что в БД попадают сгенерированные даты, а не '
+                'время загрузки'
+            )
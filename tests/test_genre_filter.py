@@ -0,0 +1,157 @@
+import random
+
+import pytest
+from api import bitmaps
+from api.bitmaps import slice_ids, title_bitmaps, to_bitmap
+from api.caching import bump_version
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Genres
+
+URLS = [
+    '/api/v1/titles/?genre=drama,comedy',
+    '/api/v1/titles/?genre=drama,comedy&page=2',
+    '/api/v1/titles/?genre=drama,comedy&genre_mode=and',
+    '/api/v1/titles/?genre=comedy&category=book',
+    '/api/v1/titles/?genre=drama,comedy&genre_mode=and&category=movie',
+    '/api/v1/titles/?genre=drama,comedy&cursor=',
+    '/api/v1/titles/?genre=drama&year=1995',
+    '/api/v1/titles/?genre=unknown',
+]
+
+
+@pytest.fixture(autouse=True)
+def bitmaps_on(settings):
+    # По умолчанию карты выключены: им нужен общий кэш.
+    settings.TITLE_BITMAPS = True
+
+
+def names(response):
+    assert response.status_code == 200
+    return [title['name'] for title in response.json()['results']]
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    calls = []
+    build = bitmaps.TitleBitmaps.build
+
+    def counted(self, version):
+        calls.append(version)
+        return build(self, version)
+
+    monkeypatch.setattr(bitmaps.TitleBitmaps, 'build', counted)
+    return calls
+
+
+class TestBitmaps:
+
+    def test_slice_ids(self):
+        generator = random.Random(1)
+        ids = sorted(generator.sample(range(1, 50000), 3000))
+        bitmap = to_bitmap(ids)
+        for start, stop in ((0, 10), (5, 5), (2990, 3010), (1234, 1300)):
+            assert slice_ids(bitmap, start, stop) == ids[start:stop]
+        assert slice_ids(0, 0, 10) == []
+
+
+@pytest.mark.django_db
+class TestGenreFilter:
+
+    def test_any_genre_without_duplicates(self, anon_client, catalogue):
+        response = anon_client.get('/api/v1/titles/?genre=drama,comedy')
+        assert response.json()['count'] == 12, (
+            'Проверьте, что произведение с несколькими жанрами из фильтра '
+            'возвращается один раз'
+        )
+
+    def test_all_genres(self, anon_client, catalogue):
+        response = anon_client.get(
+            '/api/v1/titles/?genre=drama,comedy&genre_mode=and')
+        assert names(response) == [
+            f'Произведение {number}' for number in (0, 3, 6, 9)]
+        response = anon_client.get(
+            '/api/v1/titles/?genre=drama,comedy&genre_mode=and'
+            '&category=book')
+        assert names(response) == ['Произведение 0', 'Произведение 6']
+
+    def test_invalid_mode(self, anon_client, catalogue):
+        response = anon_client.get('/api/v1/titles/?genre=drama'
+                                   '&genre_mode=xor')
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize('url', URLS)
+    @pytest.mark.parametrize('fast', [True, False])
+    def test_bitmaps_match_sql(self, anon_client, settings, catalogue, url,
+                               fast):
+        settings.FAST_LIST_RESPONSES = fast
+        settings.TITLE_BITMAPS = False
+        expected = anon_client.get(url)
+        settings.TITLE_BITMAPS = True
+        actual = anon_client.get(url)
+        assert actual.status_code == expected.status_code == 200
+        assert actual.content == expected.content, (
+            f'Проверьте, что ответ {url} по битовым картам совпадает с SQL'
+        )
+
+    def test_page_without_joins(self, anon_client, catalogue):
+        title_bitmaps.refresh()
+        with CaptureQueriesContext(connection) as context:
+            response = anon_client.get(
+                '/api/v1/titles/?genre=drama,comedy&genre_mode=and')
+        assert response.json()['count'] == 4
+        sql = [query['sql'] for query in context.captured_queries
+               if 'reviews_title' in query['sql']]
+        assert len(sql) == 1, (
+            'Проверьте, что число результатов берётся из битовой карты, '
+            'а страница читается одним запросом'
+        )
+        assert 'reviews_genretitle' not in sql[0]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBitmapUpdates:
+
+    def test_local_changes_applied_in_place(self, admin_client, anon_client,
+                                            catalogue, builds):
+        url = '/api/v1/titles/?genre=comedy&category=movie'
+        assert len(names(anon_client.get(url))) == 2
+        response = admin_client.post('/api/v1/titles/', {
+            'name': 'Новое', 'year': 2000, 'category': 'movie',
+            'genre': ['comedy']})
+        assert response.status_code == 201
+        title_id = response.json()['id']
+        assert 'Новое' in names(anon_client.get(url))
+        admin_client.patch(f'/api/v1/titles/{title_id}/',
+                           {'genre': ['drama']})
+        assert 'Новое' not in names(anon_client.get(url))
+        admin_client.patch(f'/api/v1/titles/{catalogue[0].id}/',
+                           {'category': 'movie'})
+        assert 'Произведение 0' in names(anon_client.get(url))
+        admin_client.delete(f'/api/v1/titles/{catalogue[3].id}/')
+        assert names(anon_client.get(url)) == [
+            'Произведение 0', 'Произведение 9']
+        assert len(builds) == 1, (
+            'Проверьте, что изменения процесса применяются к картам '
+            'без перестроения'
+        )
+
+    def test_other_process_version(self, anon_client, catalogue, builds):
+        url = '/api/v1/titles/?genre=comedy'
+        assert len(names(anon_client.get(url))) == 4
+        # Связи удалены другим процессом: здесь видна только новая версия.
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM reviews_genretitle WHERE genre_id_id '
+                           '= %s', [Genres.objects.get(slug='comedy').pk])
+        assert len(names(anon_client.get(url))) == 4
+        bump_version(bitmaps.NAMESPACE)
+        assert names(anon_client.get(url)) == []
+        assert len(builds) == 2
+
+    def test_new_genre(self, admin_client, anon_client, catalogue):
+        anon_client.get('/api/v1/titles/?genre=drama')
+        Genres.objects.create(name='Триллер', slug='thriller')
+        admin_client.patch(f'/api/v1/titles/{catalogue[1].id}/',
+                           {'genre': ['thriller']})
+        assert names(anon_client.get('/api/v1/titles/?genre=thriller')) == [
+            'Произведение 1']
@@ -0,0 +1,137 @@
+import pytest
+from api import purge
+from reviews.models import Comments, Review
+
+
+class InlineThread:
+    def __init__(self, target, args, daemon):
+        self.target = target
+        self.args = args
+
+    def start(self):
+        self.target(*self.args)
+
+
+@pytest.fixture
+def refreshed(settings, monkeypatch):
+    settings.NGINX_PURGE_URL = 'http://nginx:8080/'
+    urls = []
+
+    class Response:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            return False
+
+        def read(self):
+            return b''
+
+    def fake_urlopen(request, timeout):
+        assert request.get_header('X-cache-refresh') == '1'
+        urls.append(request.full_url)
+        return Response()
+
+    monkeypatch.setattr(purge.threading, 'Thread', InlineThread)
+    monkeypatch.setattr(purge, 'urlopen', fake_urlopen)
+    return urls
+
+
+@pytest.mark.django_db
+class TestCacheControl:
+
+    def test_anonymous_public(self, anon_client, catalogue):
+        response = anon_client.get('/api/v1/titles/')
+        assert response['Cache-Control'] == (
+            'public, max-age=10, stale-while-revalidate=30')
+        response = anon_client.get('/api/v1/categories/')
+        assert 'max-age=60' in response['Cache-Control']
+
+    def test_authorized_private(self, user_client, catalogue):
+        response = user_client.get('/api/v1/titles/')
+        assert response['Cache-Control'] == 'private, no-cache', (
+            'Проверьте, что ответы авторизованным не попадают в общий кэш'
+        )
+
+    def test_writes_not_cached(self, admin_client, catalogue):
+        response = admin_client.patch(f'/api/v1/titles/{catalogue[0].id}/',
+                                      {'description': 'Новое'})
+        assert not response.has_header('Cache-Control')
+
+
+@pytest.mark.django_db(transaction=True)
+class TestPurge:
+
+    def test_disabled_without_url(self, settings, user_client, catalogue,
+                                  monkeypatch):
+        settings.NGINX_PURGE_URL = ''
+        monkeypatch.setattr(purge, 'refresh', pytest.fail)
+        user_client.post(f'/api/v1/titles/{catalogue[0].id}/reviews/',
+                         {'text': 'Отзыв', 'score': 5})
+
+    def test_review_refreshes_title_and_reviews(self, refreshed, user_client,
+                                                catalogue):
+        title = catalogue[0]
+        refreshed.clear()
+        response = user_client.post(f'/api/v1/titles/{title.id}/reviews/',
+                                    {'text': 'Отзыв', 'score': 5})
+        review = response.json()['id']
+        base = 'http://nginx:8080/api/v1/titles/'
+        assert refreshed == sorted([
+            base, f'{base}{title.id}/', f'{base}{title.id}/reviews/',
+            f'{base}{title.id}/reviews/{review}/',
+        ])
+
+    def test_comment_paths(self, refreshed, user, catalogue):
+        review = Review.objects.create(title=catalogue[0], author=user,
+                                       text='Отзыв', score=5)
+        refreshed.clear()
+        comment = Comments.objects.create(review_id=review, author=user,
+                                          text='Комментарий')
+        assert (f'http://nginx:8080/api/v1/titles/{catalogue[0].id}/reviews/'
+                f'{review.id}/comments/{comment.id}/') in refreshed
+
+    def test_cascade_sends_once(self, refreshed, user, catalogue):
+        title = catalogue[0]
+        review = Review.objects.create(title=title, author=user,
+                                       text='Отзыв', score=5)
+        for number in range(3):
+            Comments.objects.create(review_id=review, author=user,
+                                    text=f'Комментарий {number}')
+        refreshed.clear()
+        title_id = title.pk
+        title.delete()
+        assert len(refreshed) == len(set(refreshed)), (
+            'Проверьте, что адреса одной транзакции отправляются один раз'
+        )
+        assert f'http://nginx:8080/api/v1/titles/{title_id}/' in refreshed
+
+    def test_bulk_title_import(self, refreshed, admin_client, catalogue):
+        refreshed.clear()
+        response = admin_client.post('/api/v1/titles/bulk/', [
+            {'name': f'Пакет {number}', 'year': 2000, 'genre': ['drama'],
+             'category': 'book'} for number in range(2)], format='json')
+        assert response.status_code == 201, response.content
+        base = 'http://nginx:8080/api/v1/titles/'
+        assert refreshed == sorted([base] + [
+            f'{base}{item["data"]["id"]}/' for item in response.json()]), (
+            'Проверьте, что пакетное создание произведений обновляет кэш '
+            'nginx'
+        )
+
+    def test_bulk_review_import(self, refreshed, admin_client, user,
+                                another_user, catalogue):
+        title = catalogue[0]
+        refreshed.clear()
+        response = admin_client.post(
+            f'/api/v1/titles/{title.id}/reviews/bulk/',
+            [{'author': author.username, 'text': 'Отзыв', 'score': 5}
+             for author in (user, another_user)], format='json')
+        assert response.status_code == 201, response.content
+        base = 'http://nginx:8080/api/v1/titles/'
+        reviews = f'{base}{title.id}/reviews/'
+        assert refreshed == sorted(
+            [base, f'{base}{title.id}/', reviews]
+            + [f'{reviews}{item["data"]["id"]}/' for item in response.json()]), (
+            'Проверьте, что пакетный импорт отзывов обновляет кэш nginx'
+        )
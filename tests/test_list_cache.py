@@ -0,0 +1,65 @@
+import pytest
+from django.core.cache import cache
+from reviews.models import Categories, Genres
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestListCache:
+
+    @pytest.mark.parametrize('url,model', [
+        ('/api/v1/categories/', Categories),
+        ('/api/v1/genres/', Genres),
+    ])
+    def test_cached_list_and_invalidation(self, url, model, anon_client,
+                                          admin_client,
+                                          django_assert_num_queries):
+        model.objects.create(name='Первая', slug='first')
+        first = anon_client.get(url)
+        assert first.status_code == 200
+        with django_assert_num_queries(0):
+            second = anon_client.get(url)
+        assert second.json() == first.json(), (
+            'Проверьте, что повторный запрос списка отдаётся из кэша'
+        )
+
+        response = admin_client.post(url, {'name': 'Вторая', 'slug': 'second'})
+        assert response.status_code == 201
+        assert anon_client.get(url).json()['count'] == 2, (
+            'Проверьте, что создание записи сбрасывает кэш списка'
+        )
+
+        response = admin_client.delete(f'{url}second/')
+        assert response.status_code == 204
+        assert anon_client.get(url).json()['count'] == 1, (
+            'Проверьте, что удаление записи сбрасывает кэш списка'
+        )
+
+    def test_search_variants_cached_separately(self, anon_client):
+        Genres.objects.create(name='Драма', slug='drama')
+        Genres.objects.create(name='Комедия', slug='comedy')
+        assert anon_client.get('/api/v1/genres/?search=Драм').json()[
+            'count'] == 1
+        assert anon_client.get('/api/v1/genres/').json()['count'] == 2
+
+    def test_etag_not_modified(self, anon_client, django_assert_num_queries):
+        Categories.objects.create(name='Фильм', slug='movie')
+        response = anon_client.get('/api/v1/categories/')
+        etag = response['ETag']
+        assert etag, 'Проверьте, что ответ списка содержит ETag'
+        with django_assert_num_queries(0):
+            response = anon_client.get('/api/v1/categories/',
+                                       HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        cache.clear()
+        response = anon_client.get('/api/v1/categories/',
+                                   HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Проверьте, что ETag зависит только от содержимого ответа'
+        )
@@ -0,0 +1,150 @@
+import logging
+import smtplib
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+from users.models import OutgoingEmail
+from users.outbox import CLAIM_LEASE, deliver_batch, enqueue_email
+
+
+class CountingBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return super().open()
+
+
+class FailingBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        raise ConnectionError('Почтовый сервер недоступен')
+
+
+class UnreachableBackend(FailingBackend):
+
+    def open(self):
+        raise smtplib.SMTPConnectError(421, 'Сервер недоступен')
+
+
+class ClaimCheckingBackend(EmailBackend):
+    """Запоминает состояние строк в БД на момент отправки."""
+    seen = []
+
+    def send_messages(self, email_messages):
+        ClaimCheckingBackend.seen += list(OutgoingEmail.objects.filter(
+            recipient__in=[recipient for message in email_messages
+                           for recipient in message.to],
+        ).values_list('attempts', 'send_after'))
+        return super().send_messages(email_messages)
+
+
+@pytest.fixture
+def locmem_mail(settings):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+def enqueue(count):
+    return enqueue_email('Тема', 'Текст', 'from@yamdb.fake',
+                         [f'user{number}@yamdb.fake'
+                          for number in range(count)])
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('locmem_mail')
+class TestOutbox:
+
+    def test_signup_only_enqueues(self, anon_client):
+        response = anon_client.post('/api/v1/auth/signup/', {
+            'username': 'new_user', 'email': 'new_user@yamdb.fake'})
+        assert response.status_code == 200
+        assert mail.outbox == [], (
+            'Проверьте, что регистрация не отправляет письмо в запросе'
+        )
+        email = OutgoingEmail.objects.get()
+        assert email.recipient == 'new_user@yamdb.fake'
+        assert 'confirmation_code' in email.body
+
+    def test_worker_sends_queue(self, anon_client):
+        anon_client.post('/api/v1/auth/signup/', {
+            'username': 'new_user', 'email': 'new_user@yamdb.fake'})
+        call_command('send_emails', '--once')
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].to == ['new_user@yamdb.fake']
+        email = OutgoingEmail.objects.get()
+        assert email.status == OutgoingEmail.SENT
+        assert email.sent_at is not None
+
+    def test_batch_uses_one_connection(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_outbox.CountingBackend'
+        CountingBackend.opened = 0
+        enqueue(5)
+        assert deliver_batch(3, 5, 30) == (3, 0)
+        assert CountingBackend.opened == 1, (
+            'Проверьте, что порция писем отправляется через одно соединение'
+        )
+        assert deliver_batch(3, 5, 30) == (2, 0)
+        assert deliver_batch(3, 5, 30) == (0, 0)
+        assert len(mail.outbox) == 5
+
+    def test_failed_email_retried_with_backoff(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_outbox.FailingBackend'
+        enqueue(1)
+        before = timezone.now()
+        assert deliver_batch(10, 3, 60) == (0, 1)
+        email = OutgoingEmail.objects.get()
+        assert email.status == OutgoingEmail.PENDING
+        assert email.attempts == 1
+        assert email.send_after >= before + timedelta(seconds=60)
+        assert 'ConnectionError' in email.last_error
+        assert deliver_batch(10, 3, 60) == (0, 0), (
+            'Проверьте, что письмо не повторяется до истечения задержки'
+        )
+        OutgoingEmail.objects.update(send_after=before)
+        deliver_batch(10, 3, 60)
+        email.refresh_from_db()
+        assert email.send_after >= before + timedelta(seconds=120)
+
+    def test_email_fails_after_max_attempts(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_outbox.FailingBackend'
+        enqueue(1)
+        call_command('send_emails', '--once', '--backoff', '0',
+                     '--max-attempts', '2')
+        email = OutgoingEmail.objects.get()
+        assert email.status == OutgoingEmail.FAILED
+        assert email.attempts == 2
+
+    def test_claim_saved_before_send(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_outbox.ClaimCheckingBackend'
+        ClaimCheckingBackend.seen = []
+        enqueue(2)
+        before = timezone.now()
+        assert deliver_batch(10, 5, 30) == (2, 0)
+        assert [attempts for attempts, _ in ClaimCheckingBackend.seen] == [
+            1, 1], (
+            'Проверьте, что попытка засчитывается до обращения к серверу'
+        )
+        assert all(send_after >= before + CLAIM_LEASE
+                   for _, send_after in ClaimCheckingBackend.seen)
+        assert set(OutgoingEmail.objects.values_list(
+            'status', flat=True)) == {OutgoingEmail.SENT}
+
+    def test_unreachable_server_logged(self, settings, caplog):
+        settings.EMAIL_BACKEND = 'tests.test_outbox.UnreachableBackend'
+        enqueue(1)
+        before = timezone.now()
+        with caplog.at_level(logging.WARNING, logger='users.outbox'):
+            assert deliver_batch(10, 3, 60) == (0, 1)
+        assert 'Сервер недоступен' in caplog.text, (
+            'Проверьте, что ошибка подключения к почтовому серверу '
+            'записывается в лог'
+        )
+        email = OutgoingEmail.objects.get()
+        assert email.attempts == 1
+        assert before + timedelta(seconds=60) <= email.send_after < (
+            before + CLAIM_LEASE)
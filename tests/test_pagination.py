@@ -0,0 +1,202 @@
+from base64 import b64encode
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Comments, Review, Title
+
+
+@pytest.fixture
+def reviews(catalogue, django_user_model):
+    title = catalogue[0]
+    base = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    created = []
+    for number in range(25):
+        author = django_user_model.objects.create(
+            username=f'author{number}', email=f'author{number}@yamdb.fake'
+        )
+        review = Review.objects.create(
+            title=title, author=author, text=str(number), score=5
+        )
+        # Несколько отзывов с одинаковой датой: ключ курсора составной.
+        Review.objects.filter(pk=review.pk).update(
+            pub_date=base + timedelta(days=(25 - number) // 3)
+        )
+        created.append(review)
+    return title, created
+
+
+def walk(client, url, direction='next'):
+    ids = []
+    pages = 0
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.json()
+        assert 'count' not in data, (
+            'Проверьте, что курсорный режим не считает COUNT(*)'
+        )
+        results = [item['id'] for item in data['results']]
+        ids = ids + results if direction == 'next' else results + ids
+        url = data[direction]
+        pages += 1
+    return ids, pages
+
+
+@pytest.mark.django_db
+class TestCursorPagination:
+
+    def test_reviews_cursor_walk(self, reviews, anon_client):
+        title, _ = reviews
+        expected = list(Review.objects.filter(title=title).order_by(
+            'pub_date', 'id').values_list('id', flat=True))
+        ids, pages = walk(
+            anon_client, f'/api/v1/titles/{title.id}/reviews/?cursor=')
+        assert ids == expected, (
+            'Проверьте, что курсор обходит отзывы по (pub_date, id) без '
+            'пропусков и повторов'
+        )
+        assert pages == 3
+
+    def test_reviews_cursor_walk_back(self, reviews, anon_client):
+        title, _ = reviews
+        url = f'/api/v1/titles/{title.id}/reviews/?cursor='
+        while True:
+            data = anon_client.get(url).json()
+            if not data['next']:
+                break
+            url = data['next']
+        ids, _ = walk(anon_client, url, direction='previous')
+        expected = list(Review.objects.filter(title=title).order_by(
+            'pub_date', 'id').values_list('id', flat=True))
+        assert ids == expected
+
+    def test_page_number_still_works(self, reviews, anon_client):
+        title, _ = reviews
+        data = anon_client.get(
+            f'/api/v1/titles/{title.id}/reviews/?page=2').json()
+        assert data['count'] == 25
+        assert len(data['results']) == 10
+
+    def test_comments_limit_offset_and_cursor(self, reviews, user,
+                                              anon_client):
+        title, created = reviews
+        review = created[0]
+        for number in range(7):
+            Comments.objects.create(review_id=review, author=user,
+                                    text=str(number))
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        data = anon_client.get(url + '?limit=5&offset=5').json()
+        assert data['count'] == 7
+        assert len(data['results']) == 2
+        ids, _ = walk(anon_client, url + '?cursor=')
+        assert ids == list(Comments.objects.filter(
+            review_id=review).order_by('pub_date', 'id').values_list(
+            'id', flat=True))
+
+    def test_titles_cursor(self, catalogue, anon_client):
+        ids, pages = walk(anon_client, '/api/v1/titles/?cursor=')
+        assert ids == [title.id for title in catalogue]
+        assert pages == 2
+
+    def test_invalid_cursor(self, catalogue, anon_client):
+        cursor = b64encode(b'p=not-a-position').decode()
+        response = anon_client.get(f'/api/v1/titles/?cursor={cursor}')
+        assert response.status_code == 404
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return response.json(), [query['sql'] for query in context.captured_queries
+                             if 'COUNT(' in query['sql'].upper()]
+
+
+@pytest.mark.django_db
+class TestCountModes:
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/titles/?count=none',
+        '/api/v1/titles/?count=none&genre=drama',
+    ])
+    def test_none_skips_count(self, catalogue, anon_client, url):
+        data, counts = count_queries(anon_client, url)
+        assert counts == [], 'Проверьте, что режим none не считает COUNT(*)'
+        assert data['count'] is None
+        assert len(data['results']) == 10
+        assert 'page=2' in data['next']
+        data = anon_client.get(data['next']).json()
+        assert [item['name'] for item in data['results']] == [
+            'Произведение 10', 'Произведение 11']
+        assert data['next'] is None
+        assert data['previous'] is not None
+
+    def test_none_past_last_page(self, catalogue, anon_client):
+        response = anon_client.get('/api/v1/titles/?count=none&page=3')
+        assert response.status_code == 404
+
+    def test_none_limit_offset(self, reviews, user, anon_client):
+        title, created = reviews
+        review = created[0]
+        for number in range(7):
+            Comments.objects.create(review_id=review, author=user,
+                                    text=str(number))
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        data, counts = count_queries(anon_client,
+                                     f'{url}?count=none&limit=5')
+        assert counts == []
+        assert data['count'] is None
+        assert 'offset=5' in data['next']
+        data = anon_client.get(data['next']).json()
+        assert len(data['results']) == 2
+        assert data['next'] is None
+
+    def test_cached_count(self, catalogue, anon_client, settings):
+        settings.PAGINATION_COUNT_MODE = 'cached'
+        data, counts = count_queries(anon_client, '/api/v1/titles/')
+        assert data['count'] == 12
+        assert len(counts) == 1
+        Title.objects.create(name='Новое', year=2000)
+        data, counts = count_queries(anon_client, '/api/v1/titles/?page=2')
+        assert counts == [], (
+            'Проверьте, что точное число объектов берётся из кэша'
+        )
+        assert data['count'] == 12
+        cache.clear()
+        assert anon_client.get('/api/v1/titles/').json()['count'] == 13
+
+    def test_estimate_falls_back_to_count(self, catalogue, anon_client):
+        data = anon_client.get('/api/v1/titles/?count=estimate').json()
+        if connection.vendor != 'postgresql':
+            assert data['count'] == 12
+        assert len(data['results']) == 10
+        assert 'page=2' in data['next']
+        data = anon_client.get(
+            '/api/v1/titles/?count=estimate&genre=comedy').json()
+        assert data['count'] == 4, (
+            'Проверьте, что отфильтрованные списки не берут оценку таблицы'
+        )
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql',
+                        reason='Оценка по статистике есть только в PostgreSQL')
+    def test_estimate_from_statistics(self, catalogue, anon_client):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE reviews_title')
+        data, counts = count_queries(anon_client,
+                                     '/api/v1/titles/?count=estimate')
+        assert counts == []
+        assert data['count'] == 12
+
+    def test_unknown_mode(self, catalogue, anon_client):
+        response = anon_client.get('/api/v1/titles/?count=fast')
+        assert response.status_code == 400
+        assert 'count' in response.json()
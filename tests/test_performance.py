@@ -0,0 +1,109 @@
+import logging
+import re
+import time
+
+import pytest
+from api.performance import (PerformanceMiddleware, RequestTimings, _current,
+                             route_stats, serializer_timer)
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from reviews.models import Title
+
+TIMING = re.compile(
+    r'^db;dur=[\d.]+;desc="(\d+) queries", ser;dur=([\d.]+), '
+    r'total;dur=[\d.]+$'
+)
+
+
+@pytest.fixture
+def instrumented(settings):
+    settings.PERF_INSTRUMENTATION = True
+    route_stats.clear()
+    yield
+    route_stats.clear()
+
+
+def new_client(user=None):
+    # Middleware загружается при первом запросе клиента, поэтому для
+    # каждой настройки нужен новый клиент.
+    client = APIClient()
+    if user is not None:
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+@pytest.mark.django_db
+class TestPerformanceMiddleware:
+
+    def test_disabled_not_used(self, settings, catalogue):
+        settings.PERF_INSTRUMENTATION = False
+        with pytest.raises(MiddlewareNotUsed):
+            PerformanceMiddleware(lambda request: None)
+        response = new_client().get('/api/v1/titles/')
+        assert 'Server-Timing' not in response
+
+    @pytest.mark.usefixtures('instrumented')
+    @pytest.mark.parametrize('fast', [True, False])
+    def test_server_timing(self, settings, catalogue, fast):
+        settings.FAST_LIST_RESPONSES = fast
+        response = new_client().get('/api/v1/titles/')
+        match = TIMING.match(response['Server-Timing'])
+        assert match, response['Server-Timing']
+        assert int(match.group(1)) == 3
+        assert float(match.group(2)) > 0, (
+            'Проверьте, что время сериализации попадает в замеры'
+        )
+
+    @pytest.mark.usefixtures('instrumented')
+    def test_slow_request_logged(self, settings, catalogue, caplog):
+        settings.PERF_SLOW_REQUEST_MS = 0
+        settings.PERF_SLOW_QUERIES = 2
+        with caplog.at_level(logging.WARNING, logger='api.performance'):
+            new_client().get('/api/v1/titles/')
+        record, = caplog.records
+        message = record.getMessage()
+        assert 'TitleViewSet.list' in message
+        assert message.count('SELECT') == 2, (
+            'Проверьте, что в журнал попадают самые долгие SQL-запросы'
+        )
+
+    @pytest.mark.usefixtures('instrumented')
+    def test_route_percentiles(self, admin, catalogue):
+        client = new_client()
+        for _ in range(3):
+            client.get('/api/v1/titles/')
+        client.get(f'/api/v1/titles/{catalogue[0].id}/')
+        response = new_client(admin).get('/api/v1/debug/performance/')
+        assert response.status_code == 200
+        data = response.json()
+        assert data['TitleViewSet.list']['count'] == 3
+        assert data['TitleViewSet.retrieve']['queries'] == {'p50': 2,
+                                                            'max': 2}
+        assert set(data['TitleViewSet.list']['total_ms']) == {
+            'p50', 'p95', 'p99'}
+
+    def test_debug_endpoint_admin_only(self, user, catalogue):
+        response = new_client(user).get('/api/v1/debug/performance/')
+        assert response.status_code == 403
+
+    def test_serializer_time_excludes_sql(self, catalogue):
+        def slow(execute, sql, params, many, context):
+            time.sleep(0.05)
+            return execute(sql, params, many, context)
+
+        timings = RequestTimings(1)
+        token = _current.set(timings)
+        try:
+            with connection.execute_wrapper(timings), \
+                    connection.execute_wrapper(slow), serializer_timer():
+                list(Title.objects.all())
+        finally:
+            _current.reset(token)
+        assert timings.queries == 1
+        assert timings.db_time >= 0.05
+        assert timings.serializer_time < 0.05, (
+            'Проверьте, что SQL внутри сериализации относится ко времени БД'
+        )
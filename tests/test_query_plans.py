@@ -0,0 +1,90 @@
+import os
+import re
+
+import pytest
+from api.bitmaps import title_bitmaps
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .fixtures.dataset import seed, unseed
+
+SEED_TITLES = int(os.getenv('QUERY_PLAN_SEED_TITLES', 5000))
+
+# Эндпойнт -> таблицы, которые нельзя читать полным просмотром.
+# Полный COUNT(*) по нефильтрованному списку произведений — не регресс,
+# поэтому reviews_title для него не проверяется.
+ENDPOINTS = {
+    'titles': ('/api/v1/titles/', ('reviews_genretitle',)),
+    'titles_by_genre': ('/api/v1/titles/?genre=genre-3',
+                        ('reviews_genretitle', 'reviews_title')),
+    'titles_by_category': ('/api/v1/titles/?category=category-2&page=3',
+                           ('reviews_genretitle',)),
+    'titles_by_year': ('/api/v1/titles/?year=1950',
+                       ('reviews_title', 'reviews_genretitle')),
+    'titles_search': ('/api/v1/titles/?search=Произведение',
+                      ('reviews_genretitle',)),
+    'title': ('/api/v1/titles/{title}/',
+              ('reviews_title', 'reviews_genretitle')),
+    'reviews': ('/api/v1/titles/{title}/reviews/?page=5',
+                ('reviews_review',)),
+    'reviews_cursor': ('/api/v1/titles/{title}/reviews/?cursor=',
+                       ('reviews_review',)),
+    'review': ('/api/v1/titles/{title}/reviews/{review}/',
+               ('reviews_review',)),
+    'comments': ('/api/v1/titles/{title}/reviews/{review}/comments/'
+                 '?limit=10&offset=100', ('reviews_comments',)),
+    'comments_cursor': ('/api/v1/titles/{title}/reviews/{review}/comments/'
+                        '?cursor=', ('reviews_comments',)),
+}
+
+
+@pytest.fixture(scope='module')
+def dataset(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        ids = seed(SEED_TITLES)
+        yield ids
+        unseed()
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f'EXPLAIN {sql}')
+        return [row[0] for row in cursor.fetchall()]
+
+
+def full_scans(plan, tables):
+    names = '|'.join(tables)
+    if connection.vendor == 'sqlite':
+        regex = re.compile(rf'^SCAN (TABLE )?({names})\b')
+    else:
+        regex = re.compile(rf'Seq Scan on ({names})\b')
+    return [line for line in plan if regex.search(line.strip())]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('endpoint', ENDPOINTS)
+def test_endpoint_has_no_full_scans(dataset, endpoint):
+    url, guarded = ENDPOINTS[endpoint]
+    url = url.format(**dataset)
+    # Битовые карты жанров строятся полным чтением связей один раз на
+    # процесс, а не на запрос.
+    title_bitmaps.refresh()
+    with CaptureQueriesContext(connection) as context:
+        response = APIClient().get(url)
+    assert response.status_code == 200, url
+    regressions = []
+    for query in context.captured_queries:
+        sql = query['sql']
+        if not sql.lstrip().upper().startswith('SELECT'):
+            continue
+        scans = full_scans(explain(sql), guarded)
+        if scans:
+            regressions.append(f'{sql}\n    {scans}')
+    assert not regressions, (
+        f'Проверьте индексы: запросы эндпойнта {url} читают таблицы '
+        'полным просмотром:\n' + '\n'.join(regressions)
+    )
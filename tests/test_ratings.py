@@ -0,0 +1,49 @@
+import pytest
+from django.db.models import Avg
+from reviews.aggregates import rebuild_ratings
+from reviews.models import Review, Title
+
+
+@pytest.mark.django_db
+class TestRating:
+
+    def assert_rating(self, title):
+        title.refresh_from_db()
+        expected = Review.objects.filter(title=title).aggregate(
+            Avg('score'))['score__avg']
+        assert title.rating == expected, (
+            'Проверьте, что рейтинг произведения совпадает со средней оценкой отзывов'
+        )
+        assert title.rating_count == Review.objects.filter(title=title).count()
+
+    def test_rating_follows_reviews(self, catalogue, user, another_user):
+        title = catalogue[0]
+        review = Review.objects.create(title=title, author=user, text='1', score=10)
+        self.assert_rating(title)
+        Review.objects.create(title=title, author=another_user, text='2', score=3)
+        self.assert_rating(title)
+
+        review = Review.objects.get(pk=review.pk)
+        review.score = 6
+        review.save()
+        self.assert_rating(title)
+
+        Review.objects.filter(title=title).delete()
+        self.assert_rating(title)
+        assert title.rating is None, (
+            'Проверьте, что рейтинг произведения без отзывов пустой'
+        )
+
+    def test_rebuild_ratings(self, catalogue, user):
+        title = catalogue[1]
+        Review.objects.create(title=title, author=user, text='1', score=7)
+        Title.objects.update(rating=None, rating_sum=0, rating_count=0)
+        rebuild_ratings()
+        self.assert_rating(title)
+
+    def test_rating_in_response(self, catalogue, user, anon_client):
+        title = catalogue[2]
+        Review.objects.create(title=title, author=user, text='1', score=7)
+        response = anon_client.get(f'/api/v1/titles/{title.id}/')
+        assert response.status_code == 200
+        assert response.json()['rating'] == 7
@@ -0,0 +1,112 @@
+import pytest
+from api import replicas
+from api.caching import bump_version
+from api.replicas import ReplicaMiddleware, ReplicaRouter
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from reviews.models import Review, Title
+
+DATABASES = ['default', 'replica']
+
+
+@pytest.fixture
+def replica(settings):
+    settings.DATABASE_REPLICAS = ['replica']
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def new_client(user=None):
+    # Middleware загружается при первом запросе клиента.
+    client = APIClient()
+    if user is not None:
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+def test_without_replicas(settings):
+    settings.DATABASE_REPLICAS = []
+    with pytest.raises(MiddlewareNotUsed):
+        ReplicaMiddleware(lambda request: None)
+    assert ReplicaRouter().db_for_read(Title) is None
+
+
+@pytest.mark.django_db(databases=DATABASES)
+@pytest.mark.usefixtures('replica')
+class TestReplicaRouting:
+
+    def test_safe_requests_read_replica(self, catalogue):
+        response = new_client().get('/api/v1/titles/')
+        assert response.status_code == 200
+        assert response.json()['count'] == 0, (
+            'Проверьте, что списки читаются с реплики'
+        )
+        assert Title.objects.count() == len(catalogue), (
+            'Вне запросов API чтение идёт из основной БД'
+        )
+
+    def test_writes_go_to_primary(self, admin, catalogue):
+        response = new_client(admin).post(
+            f'/api/v1/titles/{catalogue[0].id}/reviews/',
+            {'text': 'Отзыв', 'score': 7})
+        assert response.status_code == 201
+        assert Review.objects.using('default').count() == 1
+        assert Review.objects.using('replica').count() == 0
+
+    def test_read_your_writes(self, admin, catalogue):
+        client = new_client(admin)
+        url = f'/api/v1/titles/{catalogue[0].id}/reviews/'
+        client.post(url, {'text': 'Отзыв', 'score': 7})
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.json()['count'] == 1, (
+            'Проверьте, что после записи клиент читает из основной БД'
+        )
+        assert new_client().get(url).json()['count'] == 0, (
+            'Проверьте, что другие клиенты по-прежнему читают с реплики'
+        )
+
+    def test_sticky_window_expires(self, settings, admin, catalogue):
+        settings.REPLICA_STICKY_SECONDS = 0
+        # Пользователь уже есть на реплике, отзыв туда ещё не дошёл.
+        admin.save(using='replica')
+        client = new_client(admin)
+        url = f'/api/v1/titles/{catalogue[0].id}/reviews/'
+        client.post(url, {'text': 'Отзыв', 'score': 7})
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.json()['count'] == 0
+
+    def test_one_replica_per_request(self, monkeypatch, catalogue):
+        choices = []
+
+        def choice(replicas):
+            choices.append(replicas)
+            return 'replica'
+
+        monkeypatch.setattr(replicas.random, 'choice', choice)
+        response = new_client().get('/api/v1/titles/?genre=drama&year=1995')
+        assert response.status_code == 200
+        assert len(choices) == 1, (
+            'Проверьте, что реплика выбирается один раз на запрос, а не на '
+            'каждый SQL-запрос'
+        )
+
+    def test_list_cache_filled_from_primary(self, catalogue):
+        response = new_client().get('/api/v1/categories/')
+        assert response.status_code == 200
+        assert response.json()['count'] == 2, (
+            'Проверьте, что кэш списков заполняется из основной БД'
+        )
+
+    def test_fresh_version_reads_primary(self, catalogue):
+        bump_version('genres')
+        response = new_client().get('/api/v1/titles/')
+        assert response.json()['count'] == len(catalogue), (
+            'Проверьте, что сразу после сдвига версии запрос читает '
+            'основную БД'
+        )
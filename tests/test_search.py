@@ -0,0 +1,62 @@
+import pytest
+from reviews.models import Title
+
+
+@pytest.fixture
+def library(db):
+    return [
+        Title.objects.create(name='Властелин колец', year=1954,
+                             description='Эпическое фэнтези о кольце'),
+        Title.objects.create(name='Хоббит', year=1937,
+                             description='Сказка, предыстория колец '
+                                         'и приключение хоббита'),
+        Title.objects.create(name='Кольцо Нибелунга', year=1876,
+                             description=None),
+        Title.objects.create(name='Мастер и Маргарита', year=1967,
+                             description='Роман о Москве'),
+    ]
+
+
+def search(client, query):
+    response = client.get('/api/v1/titles/', {'search': query})
+    assert response.status_code == 200
+    return [item['name'] for item in response.json()['results']]
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    def test_search_name_and_description_case_insensitive(self, library,
+                                                          anon_client):
+        assert search(anon_client, 'москве') == ['Мастер и Маргарита']
+        assert search(anon_client, 'ХОББИТ') == ['Хоббит']
+
+    def test_search_ranked_by_relevance(self, library, anon_client):
+        names = search(anon_client, 'колец')
+        assert {'Властелин колец', 'Хоббит'} <= set(names)
+        assert 'Мастер и Маргарита' not in names
+        assert names[0] == 'Властелин колец', (
+            'Проверьте, что результаты поиска упорядочены по релевантности'
+        )
+
+    def test_search_follows_title_changes(self, library, anon_client):
+        title = library[3]
+        title.description = 'Роман о Воланде'
+        title.save()
+        assert search(anon_client, 'москве') == []
+        assert search(anon_client, 'воланде') == ['Мастер и Маргарита']
+        title.delete()
+        assert search(anon_client, 'воланде') == []
+
+    def test_search_ignores_query_syntax(self, library, anon_client):
+        assert search(anon_client, '"NEAR(') == []
+        assert search(anon_client, '***') == []
+
+    def test_name_filter_unchanged(self, library, anon_client):
+        response = anon_client.get('/api/v1/titles/', {'name': 'Хобб'})
+        assert [item['name'] for item in response.json()['results']] == [
+            'Хоббит']
+        response = anon_client.get('/api/v1/titles/', {'name': 'хобб'})
+        assert response.json()['count'] == 0, (
+            'Проверьте, что фильтр name остался регистрозависимым'
+        )
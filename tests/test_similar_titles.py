@@ -0,0 +1,104 @@
+import pytest
+from django.core.management import CommandError, call_command
+from reviews.models import Review, SimilarTitle
+
+# Оценки трёх пользователей: произведения 0 и 1 нравятся одним и тем же.
+SCORES = {
+    0: (10, 9, 2),
+    1: (10, 9, 3),
+    2: (1, 2, 9),
+}
+
+
+@pytest.fixture
+def scored(catalogue, django_user_model):
+    users = [django_user_model.objects.create(
+        username=f'critic{number}', email=f'critic{number}@yamdb.fake')
+        for number in range(3)]
+    for index, scores in SCORES.items():
+        for author, score in zip(users, scores):
+            Review.objects.create(title=catalogue[index], author=author,
+                                  text='Отзыв', score=score)
+    return catalogue
+
+
+def neighbours(title):
+    return list(SimilarTitle.objects.filter(title=title).order_by(
+        '-score', 'similar_id').values_list('similar_id', 'score'))
+
+
+@pytest.mark.django_db
+class TestSimilarEndpoint:
+
+    def test_ordered_by_score(self, anon_client, catalogue,
+                              django_assert_num_queries):
+        title = catalogue[0]
+        for similar, score in ((catalogue[3], 0.4), (catalogue[1], 0.9)):
+            SimilarTitle.objects.create(title=title, similar=similar,
+                                        score=score)
+        with django_assert_num_queries(2):
+            response = anon_client.get(f'/api/v1/titles/{title.id}/similar/')
+        assert response.status_code == 200
+        assert [item['id'] for item in response.json()] == [
+            catalogue[1].id, catalogue[3].id]
+        assert response.json()[0]['genre'] == [
+            {'name': 'Драма', 'slug': 'drama'}]
+
+    def test_without_neighbours(self, anon_client, catalogue):
+        response = anon_client.get(
+            f'/api/v1/titles/{catalogue[5].id}/similar/')
+        assert response.status_code == 200
+        assert response.json() == []
+        assert anon_client.get(
+            '/api/v1/titles/999999/similar/').status_code == 404
+        assert anon_client.get(
+            '/api/v1/titles/abc/similar/').status_code == 404
+
+
+@pytest.mark.django_db
+class TestBuildSimilarTitles:
+
+    @pytest.fixture(autouse=True)
+    def scientific_stack(self):
+        pytest.importorskip('numpy')
+        pytest.importorskip('scipy')
+
+    def test_rating_neighbours(self, scored):
+        call_command('build_similar_titles', '--workers', '1',
+                     '--neighbours', '3')
+        first = neighbours(scored[0])
+        assert first[0][0] == scored[1].id, (
+            'Проверьте, что соседи по оценкам идут первыми'
+        )
+        assert len(first) == 3
+        assert scored[2].id not in [pk for pk, _ in first], (
+            'Проверьте, что противоположно оценённые произведения не '
+            'попадают в соседи'
+        )
+        # Без отзывов соседи находятся по жанрам.
+        assert neighbours(scored[3])[0][0] in (scored[0].id, scored[6].id,
+                                               scored[9].id)
+
+    def test_genre_weight(self, scored):
+        call_command('build_similar_titles', '--workers', '1',
+                     '--genre-weight', '0')
+        assert [pk for pk, _ in neighbours(scored[0])] == [scored[1].id]
+        assert neighbours(scored[3]) == []
+
+    def test_parallel_chunks_match(self, scored):
+        call_command('build_similar_titles', '--workers', '1')
+        expected = {title.id: neighbours(title) for title in scored}
+        call_command('build_similar_titles', '--workers', '2',
+                     '--chunk-size', '5')
+        assert {title.id: neighbours(title)
+                for title in scored} == expected, (
+            'Проверьте, что результат не зависит от числа процессов'
+        )
+        assert SimilarTitle.objects.count() == sum(map(len,
+                                                       expected.values()))
+
+    def test_invalid_options(self, scored):
+        with pytest.raises(CommandError):
+            call_command('build_similar_titles', '--genre-weight', '2')
+        with pytest.raises(CommandError):
+            call_command('build_similar_titles', '--neighbours', '0')
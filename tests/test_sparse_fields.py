@@ -0,0 +1,111 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Comments, Review
+
+
+@pytest.fixture
+def discussion(catalogue, user, another_user):
+    title = catalogue[0]
+    review = Review.objects.create(title=title, author=user, text='Отзыв',
+                                   score=8)
+    Review.objects.create(title=title, author=another_user, text='Отзыв',
+                          score=4)
+    for number in range(3):
+        Comments.objects.create(review_id=review, author=another_user,
+                                text=f'Комментарий {number}')
+    return title, review
+
+
+def select_sql(context):
+    return [query['sql'] for query in context.captured_queries
+            if query['sql'].lstrip().upper().startswith('SELECT')]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('fast', [True, False])
+class TestSparseFields:
+
+    def test_titles_list(self, anon_client, settings, discussion, fast):
+        settings.FAST_LIST_RESPONSES = fast
+        with CaptureQueriesContext(connection) as context:
+            response = anon_client.get(
+                '/api/v1/titles/?fields=rating,id,name')
+        assert response.status_code == 200
+        result = response.json()['results'][0]
+        assert list(result) == ['id', 'name', 'rating'], (
+            'Проверьте, что ответ содержит только запрошенные поля '
+            'в порядке сериализатора'
+        )
+        assert result['rating'] == 6
+        sql = select_sql(context)
+        assert len(sql) == 2
+        assert not any('description' in query or 'reviews_genres' in query
+                       or 'reviews_categories' in query for query in sql), (
+            'Проверьте, что невыбранные поля и связи не читаются из БД'
+        )
+
+    def test_titles_category_only(self, anon_client, settings, discussion,
+                                  fast):
+        settings.FAST_LIST_RESPONSES = fast
+        response = anon_client.get('/api/v1/titles/?fields=category')
+        assert response.json()['results'][0] == {
+            'category': {'name': 'Книга', 'slug': 'book'}}
+
+    def test_titles_genre_with_cursor(self, anon_client, settings,
+                                      discussion, fast):
+        settings.FAST_LIST_RESPONSES = fast
+        response = anon_client.get('/api/v1/titles/?fields=genre&cursor=')
+        data = response.json()
+        assert data['results'][0] == {'genre': [
+            {'name': 'Драма', 'slug': 'drama'},
+            {'name': 'Комедия', 'slug': 'comedy'}]}
+        assert anon_client.get(data['next']).status_code == 200
+
+    def test_reviews_with_cursor(self, anon_client, settings, discussion,
+                                 fast):
+        settings.FAST_LIST_RESPONSES = fast
+        title, _ = discussion
+        url = f'/api/v1/titles/{title.id}/reviews/?fields=author&cursor='
+        with CaptureQueriesContext(connection) as context:
+            response = anon_client.get(url)
+        assert response.json()['results'] == [
+            {'author': 'TestUser'}, {'author': 'TestUserAnother'}]
+        # Первый запрос читает время изменения произведения для ETag.
+        queries = [sql for sql in select_sql(context)
+                   if 'reviews_review' in sql]
+        assert len(queries) == 1
+        assert 'text' not in queries[0]
+
+    def test_comments(self, anon_client, settings, discussion, fast):
+        settings.FAST_LIST_RESPONSES = fast
+        title, review = discussion
+        response = anon_client.get(
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+            '?fields=text')
+        assert response.json()['results'][0] == {'text': 'Комментарий 0'}
+
+
+@pytest.mark.django_db
+class TestSparseFieldsRetrieve:
+
+    def test_title_retrieve(self, anon_client, discussion):
+        title, _ = discussion
+        with CaptureQueriesContext(connection) as context:
+            response = anon_client.get(
+                f'/api/v1/titles/{title.id}/?fields=name,year')
+        assert response.json() == {'name': title.name, 'year': title.year}
+        assert len(select_sql(context)) == 1
+        assert 'description' not in select_sql(context)[0]
+
+    def test_unknown_field_400(self, anon_client, discussion):
+        response = anon_client.get('/api/v1/titles/?fields=id,secret')
+        assert response.status_code == 400
+        assert 'fields' in response.json()
+
+    def test_ignored_on_write(self, admin_client, discussion):
+        title, _ = discussion
+        response = admin_client.patch(
+            f'/api/v1/titles/{title.id}/?fields=name', {'year': 1999})
+        assert response.status_code == 200
+        assert response.json()['year'] == 1999
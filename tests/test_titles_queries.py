@@ -0,0 +1,30 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestTitlesQueries:
+
+    def test_list_query_count(self, catalogue, anon_client,
+                              django_assert_num_queries):
+        # COUNT(*) страницы, сама страница с категориями, жанры страницы.
+        with django_assert_num_queries(3):
+            response = anon_client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert len(results) == 10
+        assert results[0]['category'] == {'name': 'Книга', 'slug': 'book'}
+        assert {'name': 'Драма', 'slug': 'drama'} in results[0]['genre'], (
+            'Проверьте, что жанры произведений попадают в ответ'
+        )
+
+    def test_list_query_count_does_not_grow(self, catalogue, anon_client,
+                                            django_assert_num_queries):
+        with django_assert_num_queries(3):
+            anon_client.get('/api/v1/titles/?page=2')
+
+    def test_retrieve_query_count(self, catalogue, anon_client,
+                                  django_assert_num_queries):
+        with django_assert_num_queries(2):
+            response = anon_client.get(f'/api/v1/titles/{catalogue[0].id}/')
+        assert response.status_code == 200
+        assert len(response.json()['genre']) == 2
@@ -0,0 +1,97 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Comments, Review
+
+
+def statements(context, prefix):
+    return [query['sql'] for query in context.captured_queries
+            if query['sql'].lstrip().upper().startswith(prefix)]
+
+
+@pytest.mark.django_db
+class TestReviewWritePath:
+
+    def test_create_single_insert(self, user_client, catalogue):
+        title = catalogue[0]
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(
+                f'/api/v1/titles/{title.id}/reviews/',
+                {'text': 'Отзыв', 'score': 8})
+        assert response.status_code == 201
+        assert response.json()['author'] == 'TestUser'
+        reads = [sql for sql in statements(context, 'SELECT')
+                 if 'users_customuser' not in sql]
+        assert not reads, (
+            'Проверьте, что при создании отзыва не читаются произведение и '
+            'существующие отзывы'
+        )
+        # Кроме отзыва вставляются только строки ленты автора.
+        assert len(statements(context, 'INSERT INTO "REVIEWS_REVIEW"')) == 1
+        assert len(statements(context, 'INSERT')) == 3
+
+    def test_duplicate_review_400(self, user_client, catalogue):
+        url = f'/api/v1/titles/{catalogue[0].id}/reviews/'
+        user_client.post(url, {'text': 'Отзыв', 'score': 8})
+        response = user_client.post(url, {'text': 'Ещё отзыв', 'score': 2})
+        assert response.status_code == 400
+        assert response.json() == {
+            'non_field_errors': ['Ревью уже существует!']}
+        assert Review.objects.count() == 1
+        catalogue[0].refresh_from_db()
+        assert catalogue[0].rating == 8, (
+            'Проверьте, что отклонённый отзыв не меняет рейтинг'
+        )
+
+    def test_update_keeps_working(self, user_client, catalogue):
+        url = f'/api/v1/titles/{catalogue[0].id}/reviews/'
+        review_id = user_client.post(
+            url, {'text': 'Отзыв', 'score': 8}).json()['id']
+        response = user_client.patch(f'{url}{review_id}/', {'score': 3})
+        assert response.status_code == 200
+        assert response.json()['score'] == 3
+
+
+@pytest.mark.django_db
+class TestCommentWritePath:
+
+    def test_create_single_insert(self, user, user_client, catalogue):
+        title = catalogue[0]
+        review = Review.objects.create(title=title, author=user, text='Отзыв',
+                                       score=5)
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(
+                f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/',
+                {'text': 'Комментарий'})
+        assert response.status_code == 201
+        reads = [sql for sql in statements(context, 'SELECT')
+                 if 'users_customuser' not in sql]
+        assert not reads, (
+            'Проверьте, что при создании комментария не читается отзыв'
+        )
+        assert Comments.objects.get().review_id_id == review.id
+
+
+# Внешние ключи проверяются при фиксации транзакции: transaction=True —
+# настоящая фиксация, без него обёртка теста — внешняя транзакция, как при
+# ATOMIC_REQUESTS, и ошибка должна появиться до выхода из точки
+# сохранения.
+@pytest.mark.parametrize('mode', [
+    pytest.param('commit', marks=pytest.mark.django_db(transaction=True)),
+    pytest.param('nested', marks=pytest.mark.django_db),
+])
+class TestMissingParent:
+
+    def test_review_for_missing_title_404(self, user_client, mode):
+        response = user_client.post('/api/v1/titles/999/reviews/',
+                                    {'text': 'Отзыв', 'score': 8})
+        assert response.status_code == 404
+        assert not Review.objects.exists()
+
+    def test_comment_for_missing_review_404(self, user_client, catalogue,
+                                            mode):
+        response = user_client.post(
+            f'/api/v1/titles/{catalogue[0].id}/reviews/999/comments/',
+            {'text': 'Комментарий'})
+        assert response.status_code == 404
+        assert not Comments.objects.exists()